@@ -0,0 +1 @@
+"""Shared numeric core for the Applied Optimization scripts."""
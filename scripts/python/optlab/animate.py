@@ -0,0 +1,236 @@
+"""Animation of optimizer trajectories over the Part A contour plots.
+
+The contour figure of a problem (``contour_figure()`` in its
+plot_optimal_points script) is drawn once, and the axes are kept as a pixel
+buffer. Each frame restores that buffer and draws only the moving artists,
+the iterates and their trails, on top of it (blitting). The frames are
+streamed to the encoder as they are made, so memory does not grow with the
+number of frames:
+
+- ffmpeg, when it is on PATH, for .mp4 and other video formats (and .gif)
+- otherwise a GIF writer built on Pillow, which stores only the part of
+  each frame that changed since the previous one
+
+The trajectories are the iterates of optlab.nlp.solve (one per inner BFGS
+step), resampled to the requested number of frames.
+
+    python -m optlab.animate func1 --output func1.gif [--frames 1000] [--maximize]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import time
+
+import numpy as np
+
+from . import settings
+from .trace import span, traced
+
+SCRIPTS = {
+    "func1": "partA/func1/plot_optimal_points_func_1.py",
+    "func2": "partA/func2/plot_optimal_points_func_2.py",
+    "func3": "partA/func3/plot_optimal_points_func_3.py",
+}
+TRAIL_COLOUR = "black"
+POINT_COLOUR = "red"
+
+
+def record(problem, starts=8, maximize=False, seed=0, **kwargs):
+    """Iterates of a multi-start nlp.solve, shape (steps + 1, starts, 2)."""
+    from .nlp import objective_gradient, sample_starts, solve
+
+    X = sample_starts(problem.bounds, starts, seed) if np.isscalar(starts) else \
+        np.array(starts, dtype=float, ndmin=2)
+    sign = -1.0 if maximize else 1.0
+    kwargs.setdefault("gradient", objective_gradient(problem, sign))
+    current = X.copy()
+    steps = [current.copy()]
+
+    def callback(index, points):
+        current[index] = points
+        steps.append(current.copy())
+
+    def objective(*z):
+        return sign * problem.objective(*z)
+
+    solve(objective, X, problem.inequalities, problem.equalities, callback=callback, **kwargs)
+    return np.array(steps)
+
+
+def resample(trajectory, frames):
+    """``frames`` points per start, evenly spaced in step number (linear in between)."""
+    t = np.linspace(0.0, len(trajectory) - 1, frames)
+    i = np.minimum(t.astype(int), len(trajectory) - 2) if len(trajectory) > 1 else \
+        np.zeros(frames, dtype=int)
+    w = (t - i)[:, None, None]
+    upper = np.minimum(i + 1, len(trajectory) - 1)
+    return (1 - w) * trajectory[i] + w * trajectory[upper]
+
+
+# -- encoders -------------------------------------------------------------
+class FFmpegWriter:
+    """Raw RGBA frames piped to ffmpeg."""
+
+    def __init__(self, path, width, height, fps):
+        args = [shutil.which("ffmpeg"), "-loglevel", "error", "-y", "-f", "rawvideo",
+                "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-"]
+        if not path.lower().endswith(".gif"):
+            # yuv420p needs even sizes
+            args += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p"]
+        self._proc = subprocess.Popen(args + [path], stdin=subprocess.PIPE)
+
+    def write(self, rgba):
+        self._proc.stdin.write(memoryview(np.ascontiguousarray(rgba)).cast("B"))
+
+    def close(self):
+        self._proc.stdin.close()
+        if self._proc.wait():
+            raise RuntimeError(f"ffmpeg exited with status {self._proc.returncode}")
+
+
+class GifWriter:
+    """Streaming GIF: one palette from the first frame, then changed regions only."""
+
+    def __init__(self, path, width, height, fps, colours=()):
+        self._fh = open(path, "wb")
+        self._duration = max(20, int(round(1000 / fps)))   # GIF delays are in 10 ms units
+        self._previous = None
+        self._palette = None
+        self._extra = [tuple(int(255 * c) for c in rgb) for rgb in colours]
+
+    def _quantize(self, image):
+        from PIL import Image
+
+        return image.quantize(palette=self._palette, dither=Image.Dither.NONE)
+
+    def write(self, rgba):
+        from PIL import GifImagePlugin, Image
+
+        # One uint32 per pixel makes the comparison with the previous frame cheap
+        packed = np.ascontiguousarray(rgba).view(np.uint32)[..., 0]
+        if self._previous is None:
+            # Palette from the background, with room kept for the artist colours
+            rgb = np.ascontiguousarray(rgba[..., :3])
+            palette = Image.fromarray(rgb).quantize(255 - len(self._extra),
+                                                    method=Image.Quantize.MEDIANCUT)
+            values = palette.getpalette()[:3 * (255 - len(self._extra))]
+            for colour in self._extra:
+                values += list(colour)
+            palette.putpalette(values)
+            self._palette = palette
+            first = self._quantize(Image.fromarray(rgb))
+            header, _ = GifImagePlugin.getheader(first, info={"loop": 0})
+            for part in header:
+                self._fh.write(part)
+            self._frame(first, (0, 0))
+        else:
+            changed = packed != self._previous
+            rows = np.flatnonzero(changed.any(axis=1))
+            if rows.size:
+                cols = np.flatnonzero(changed[rows[0]:rows[-1] + 1].any(axis=0))
+                box = (cols[0], rows[0], cols[-1] + 1, rows[-1] + 1)
+            else:
+                box = (0, 0, 1, 1)     # still a frame, to keep the timing
+            region = np.ascontiguousarray(rgba[box[1]:box[3], box[0]:box[2], :3])
+            self._frame(self._quantize(Image.fromarray(region)), box[:2])
+        self._previous = packed.copy()
+
+    def _frame(self, image, offset):
+        from PIL import GifImagePlugin
+
+        for part in GifImagePlugin.getdata(image, offset, duration=self._duration):
+            self._fh.write(part)
+
+    def close(self):
+        self._fh.write(b";")
+        self._fh.close()
+
+
+def _writer(path, width, height, fps):
+    if shutil.which("ffmpeg"):
+        return FFmpegWriter(path, width, height, fps)
+    if not path.lower().endswith(".gif"):
+        raise RuntimeError(f"{path}: only .gif can be written without ffmpeg on PATH")
+    from matplotlib.colors import to_rgb
+
+    return GifWriter(path, width, height, fps, colours=(to_rgb(TRAIL_COLOUR),
+                                                        to_rgb(POINT_COLOUR)))
+
+
+# -- animation ------------------------------------------------------------
+@traced("draw")
+def animate(fig, trajectory, save_path, fps=30, dpi=100, trail=None):
+    """Write one frame per row of ``trajectory`` (frames, starts, 2) over ``fig``.
+
+    The figure is drawn once, and each frame only redraws the trails (the
+    last ``trail`` positions, or all of them) and the current points. The
+    first axes of ``fig`` is used. Returns the number of frames written.
+    """
+    import matplotlib.pyplot as plt
+
+    ax = fig.axes[0]
+    fig.set_dpi(dpi)
+    # All trails are one line, separated by NaN, so a frame is two draw calls
+    trails, = ax.plot([], [], color=TRAIL_COLOUR, linewidth=1.0, animated=True)
+    gap = np.full((trajectory.shape[1], 1, 2), np.nan)
+    points, = ax.plot([], [], "o", color=POINT_COLOUR, markersize=5, animated=True)
+
+    canvas = fig.canvas
+    with span("draw", part="background"):
+        canvas.draw()
+        background = canvas.copy_from_bbox(ax.bbox)
+    width, height = canvas.get_width_height()
+    writer = _writer(save_path, width, height, fps)
+    try:
+        for k in range(len(trajectory)):
+            canvas.restore_region(background)
+            start = 0 if trail is None else max(0, k + 1 - trail)
+            path = np.concatenate([trajectory[start:k + 1].swapaxes(0, 1), gap], axis=1)
+            trails.set_data(path[..., 0].ravel(), path[..., 1].ravel())
+            ax.draw_artist(trails)
+            points.set_data(trajectory[k, :, 0], trajectory[k, :, 1])
+            ax.draw_artist(points)
+            with span("encode"):
+                writer.write(np.asarray(canvas.buffer_rgba()))
+    finally:
+        writer.close()
+        plt.close(fig)
+    return len(trajectory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("problem", choices=sorted(SCRIPTS))
+    parser.add_argument("--output", help="video or .gif file (default <problem>_trajectory.gif)")
+    parser.add_argument("--starts", type=int, default=8)
+    parser.add_argument("--maximize", action="store_true")
+    parser.add_argument("--frames", type=int, default=300,
+                        help="resample the iterates to this many frames (0: one per step)")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--trail", type=int, default=None, help="trail length in frames")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    import matplotlib
+    matplotlib.use("Agg")
+    from .pipeline import load_script
+    from .problems import PROBLEMS
+
+    output = args.output or f"{args.problem}_trajectory.gif"
+    t0 = time.perf_counter()
+    trajectory = record(PROBLEMS[args.problem], args.starts, args.maximize, args.seed)
+    steps = len(trajectory) - 1
+    if args.frames:
+        trajectory = resample(trajectory, args.frames)
+    fig = load_script(str(settings.SCRIPTS_DIR / SCRIPTS[args.problem])).contour_figure()
+    t1 = time.perf_counter()
+    count = animate(fig, trajectory, output, fps=args.fps, dpi=args.dpi, trail=args.trail)
+    t2 = time.perf_counter()
+    print(f"{args.problem}: {steps} solver steps, {count} frames in {t2 - t1:.1f} s "
+          f"(setup {t1 - t0:.1f} s) -> {output} ({os.path.getsize(output) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
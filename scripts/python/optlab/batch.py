@@ -0,0 +1,245 @@
+"""Headless batch solves of problem specs, streamed as JSON lines.
+
+Each spec file (optlab.spec) is solved in a process pool, and one JSON line
+per spec is written as soon as it finishes, in completion order:
+
+    {"spec": "specs/func1.toml", "name": "func1", "method": "kkt", "status": "ok",
+     "seconds": 0.01, "results": [{"kind": "minimum", "x": [...], "f": ...,
+     "status": "optimal", "multipliers": {"lam": [...], "mu": [...]}}, ...]}
+
+A spec that fails gets "status": "error" and the message, and the run goes
+on. Nothing here imports Matplotlib. The solver comes from solver.method:
+
+- kkt: exact global optima (optlab.kkt), 2 variables, quadratic objective
+  and constraints, at most two equalities
+- nlp: multi-start augmented Lagrangian (optlab.nlp) from random starts in
+  the bounds, with the exact gradient from optlab.kernels
+- stationary: unconstrained stationary points and their classification
+  (optlab.stationary)
+- auto: stationary without constraints, else kkt where it applies, else nlp
+
+Result statuses: optimal (certified global optimum), unbounded, not_found
+and uncertified (kkt); converged and not_converged (nlp); the Hessian
+classification (stationary, with "isolated": false for a point that stands
+for a whole affine set of stationary points). Non-finite numbers are
+written as null.
+
+    python -m optlab.batch specs/ [more.toml ...] [--workers 8] [--output out.jsonl] [--store]
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from .spec import find_specs, load_spec
+from .trace import traced
+
+
+def _value(v):
+    """JSON-ready value: lists for arrays, None for NaN and inf."""
+    if isinstance(v, dict):
+        return {k: _value(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple, np.ndarray)):
+        return [_value(x) for x in np.asarray(v).tolist()]
+    if isinstance(v, (bool, np.bool_)):
+        return bool(v)
+    if isinstance(v, (float, np.floating)):
+        return float(v) if np.isfinite(v) else None
+    if isinstance(v, np.integer):
+        return int(v)
+    return v
+
+
+def _goals(spec):
+    goal = spec.solver["goal"]
+    return {"minimize": ("minimum",), "maximize": ("maximum",)}.get(goal, ("minimum", "maximum"))
+
+
+def _is_quadratic(exprs, symbols):
+    from .quadratic import quadratic_coefficients
+
+    return all(quadratic_coefficients(expr, symbols) is not None for expr in exprs)
+
+
+def resolve_method(spec, exprs=None):
+    """The solver for ``spec``, with "auto" decided from its expressions."""
+    method = spec.solver["method"]
+    f, g, h, symbols = exprs or spec.expressions()
+    if method == "auto":
+        if not (g or h):
+            return "stationary"
+        if len(symbols) == 2 and len(h) <= 2 and _is_quadratic((f, *g, *h), symbols):
+            return "kkt"
+        return "nlp"
+    if method == "kkt" and not (len(symbols) == 2 and len(h) <= 2
+                                and _is_quadratic((f, *g, *h), symbols)):
+        raise ValueError(f"{spec.name}: kkt needs 2 variables, quadratic functions "
+                         f"and at most two equalities")
+    if method == "stationary" and (g or h):
+        raise ValueError(f"{spec.name}: stationary is for unconstrained problems")
+    return method
+
+
+def _solve_kkt(spec, problem):
+    from .kkt import solve_family_values
+
+    res = solve_family_values(problem.objective, problem.equalities, problem.inequalities)
+    out = []
+    for kind in _goals(spec):
+        end = kind[:3]
+        x, f = getattr(res, f"x_{end}"), float(getattr(res, f"f_{end}"))
+        if np.isinf(f):
+            status = "unbounded"
+        elif not np.isfinite(x).all():
+            # No KKT point of this kind: an empty feasible set, or an
+            # optimum that does not exist but is not proven unbounded
+            status = "not_found"
+        else:
+            status = "optimal" if getattr(res, f"certified_{end}") else "uncertified"
+        out.append({"kind": kind, "x": x, "f": f, "status": status,
+                    "multipliers": {"lam": getattr(res, f"lam_{end}"),
+                                    "mu": getattr(res, f"mu_{end}")}})
+    return out
+
+
+def _solve_nlp(spec, problem, exprs):
+    from .kernels import fused_kernel
+    from .nlp import sample_starts, solve
+
+    f, _, _, symbols = exprs
+    kernel = fused_kernel(f, symbols, order=1)
+    options = {k: spec.solver[k] for k in ("tol", "maxiter") if k in spec.solver}
+    x0 = sample_starts(problem.bounds, int(spec.solver["starts"]), int(spec.solver["seed"]))
+    out = []
+    for kind in _goals(spec):
+        sign = -1.0 if kind == "maximum" else 1.0
+
+        def objective(*z, sign=sign):
+            return sign * problem.objective(*z)
+
+        def gradient(*z, sign=sign):
+            return sign * kernel(*z)[1]
+
+        res = solve(objective, x0, problem.inequalities, problem.equalities,
+                    gradient=gradient, **options).unique()
+        if not len(res.f):
+            out.append({"kind": kind, "x": None, "f": None, "status": "not_converged"})
+            continue
+        out.append({"kind": kind, "x": res.x[0], "f": sign * res.f[0], "status": "converged",
+                    "multipliers": {"lam": sign * res.lam[0], "mu": sign * res.mu[0]},
+                    "starts": int(res.count[0]), "iterations": res.iterations})
+    return out
+
+
+def _solve_stationary(spec, problem, exprs):
+    from .stationary import analyze
+
+    f, _, _, symbols = exprs
+    lo, hi = min(problem.bounds[0::2]), max(problem.bounds[1::2])
+    res = analyze(f, symbols, starts=int(spec.solver["starts"]), bounds=(lo, hi),
+                  seed=int(spec.solver["seed"]))
+    return [{"kind": "stationary", "x": x, "f": value, "status": str(label), "eigenvalues": w,
+             "isolated": isolated}
+            for x, value, w, label, isolated in zip(res.points, res.values, res.eigenvalues,
+                                                    res.classification, res.isolated)]
+
+
+@traced("optimize")
+def solve_spec(spec):
+    """(method, results) of one ProblemSpec; results are dicts as in the JSON lines."""
+    exprs = spec.expressions()
+    method = resolve_method(spec, exprs)
+    problem = spec.problem()
+    if method == "kkt":
+        return method, _solve_kkt(spec, problem)
+    if method == "nlp":
+        return method, _solve_nlp(spec, problem, exprs)
+    return method, _solve_stationary(spec, problem, exprs)
+
+
+def _store_results(spec, method, results, seconds):
+    from .store import record
+
+    problem = spec.problem()
+    for i, r in enumerate(results):
+        stationary = method == "stationary"
+        record(problem, r["kind"], r.get("x"), r.get("f"), point=i if stationary else 0,
+               solver=method, multipliers=r.get("multipliers"),
+               classification=r["status"] if stationary else None,
+               stats={"status": r["status"]}, seconds=seconds)
+
+
+def run_spec(path, store=False):
+    """Solve one spec file; returns its JSON line as a dict (never raises for bad specs)."""
+    start = time.perf_counter()
+    line = {"spec": str(path)}
+    try:
+        spec = load_spec(path)
+        line["name"] = spec.name
+        method, results = solve_spec(spec)
+        seconds = time.perf_counter() - start
+        if store:
+            _store_results(spec, method, results, seconds)
+        line.update(method=method, status="ok", seconds=seconds, results=_value(results))
+    except (ValueError, TypeError, ArithmeticError, OSError, np.linalg.LinAlgError) as exc:
+        line.update(status="error", seconds=time.perf_counter() - start,
+                    error=f"{type(exc).__name__}: {exc}")
+    line["pid"] = os.getpid()
+    return line
+
+
+def run(paths, out, workers=None, store=False):
+    """Solve the specs in ``paths`` and write a JSON line per spec to ``out``
+    as each finishes; returns (count, errors)."""
+    specs = find_specs(paths)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(specs) or 1))
+    count = errors = 0
+
+    def emit(line):
+        nonlocal count, errors
+        count += 1
+        errors += line["status"] == "error"
+        out.write(json.dumps(line, allow_nan=False) + "\n")
+        out.flush()
+
+    if workers == 1:
+        for path in specs:
+            emit(run_spec(path, store))
+        return count, errors
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_spec, path, store) for path in specs]
+        for fut in as_completed(futures):
+            emit(fut.result())
+    return count, errors
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="spec files or directories of them")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument("--output", help="JSONL file (default: standard output)")
+    parser.add_argument("--store", action="store_true",
+                        help="also record the results in the result store (optlab.store)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    t0 = time.perf_counter()
+    try:
+        count, errors = run(args.paths, out, args.workers, args.store)
+    finally:
+        if args.output:
+            out.close()
+    print(f"{count} specs in {time.perf_counter() - t0:.1f} s, {errors} errors", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,459 @@
+"""Benchmarks for grid evaluation, masks, optimizers, symbolic analysis and savefig.
+
+Usage (from scripts/python):
+    python -m optlab.bench [--sizes 100,500,1000] [--only PATTERN] [--repeat N]
+                           [--output results.json] [--baseline baseline.json]
+                           [--threshold 0.1] [--list]
+
+Each case is timed after one warm-up run, with the garbage collector off,
+and reported as the minimum and median of the timed runs. Peak memory is
+measured in a separate run under tracemalloc. With --baseline, the results
+are compared with an earlier --output file and the exit status is 1 if any
+case got slower (or needs more memory) by more than the threshold.
+"""
+import argparse
+import contextlib
+import fnmatch
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from importlib import metadata
+
+import numpy as np
+
+from . import settings
+from .gridcache import GridCache
+from .problems import PROBLEMS
+
+DEFAULT_SIZES = (100, 250, 500, 1000, 2000, 4000)
+
+# Regressions smaller than this are timer noise, whatever the ratio.
+MIN_DELTA = 1e-4
+
+
+@dataclass
+class Case:
+    """``setup()`` returns the callable that is timed."""
+    name: str
+    setup: object
+    size: int = None
+
+
+def _script(relpath):
+    from .pipeline import load_script
+    return load_script(str(settings.SCRIPTS_DIR / relpath))
+
+
+def _quiet(fn):
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+
+# -- grid cases -----------------------------------------------------------
+_uncached = GridCache(maxsize=0)
+
+
+def _grid(problem, n, dtype=np.float64):
+    return _uncached._evaluate(problem, problem.bounds, n, dtype)
+
+
+def _eval_case(problem, n, dtype=np.float64):
+    return lambda: lambda: _grid(problem, n, dtype)
+
+
+def _kernel_case(problem, n):
+    # f, gradient and Hessian in one fused pass, on broadcast grid axes
+    def setup():
+        from .kernels import problem_kernel
+
+        kernel = problem_kernel(problem, order=2)
+        xmin, xmax, ymin, ymax = problem.bounds
+        x = np.linspace(xmin, xmax, n)[np.newaxis, :]
+        y = np.linspace(ymin, ymax, n)[:, np.newaxis]
+        return lambda: kernel(x, y)
+    return setup
+
+
+def _tile_case(problem, layer):
+    # One uncached tile at zoom 2, rendered and PNG-encoded
+    def setup():
+        from .tiles import TileService
+
+        service = TileService()
+        service.render(problem.name, layer, 0, 0, 0)     # window range, optima
+        return lambda: service.render(problem.name, layer, 2, 1, 1)
+    return setup
+
+
+def _mask_case(problem, n):
+    def setup():
+        grid = _grid(problem, n)
+        X, Y = grid.X, grid.Y
+        return lambda: problem.constraints(X, Y)
+    return setup
+
+
+def _savefig_case(problem, n, kind):
+    def setup():
+        import matplotlib.pyplot as plt
+        from .render import figure_dpi, plot_surface_lod
+
+        grid = _grid(problem, n)
+        X, Y, F = grid.X, grid.Y, grid.F
+
+        def run():
+            fig = plt.figure(figsize=(8, 6))
+            if kind == "contour":
+                ax = fig.add_subplot(111)
+                ax.contour(X, Y, F, 30, linewidths=1.2)
+                ax.plot(*problem.feasible_path(), color="green", linewidth=5, alpha=0.35)
+            else:
+                ax = fig.add_subplot(111, projection="3d")
+                plot_surface_lod(ax, X, Y, F, cmap="turbo", edgecolor="none", alpha=0.9)
+            fig.savefig(io.BytesIO(), format="png", dpi=figure_dpi(), bbox_inches="tight")
+            plt.close(fig)
+        return run
+    return setup
+
+
+# -- optimizer cases ------------------------------------------------------
+def _script_case(relpath, func):
+    return lambda: _quiet(getattr(_script(relpath), func))
+
+
+def _sphere_batch(count=10000):
+    def setup():
+        from .trust_region import solve_sphere_quadratic
+
+        rng = np.random.default_rng(0)
+        A = rng.standard_normal((count, 3, 3))
+        Q = A + A.transpose(0, 2, 1)
+        c = rng.standard_normal((count, 3))
+        return lambda: solve_sphere_quadratic(Q, c, center=np.zeros(3), radius=1.0)
+    return setup
+
+
+def _animate_case(name, frames):
+    # Blitted trajectory frames streamed to a GIF (background drawn in setup)
+    def setup():
+        import tempfile
+        from . import animate
+        from .problems import PROBLEMS
+
+        trajectory = animate.resample(animate.record(PROBLEMS[name]), frames)
+        path = os.path.join(tempfile.mkdtemp(), "trajectory.gif")
+        script = _script(animate.SCRIPTS[name])
+        return lambda: animate.animate(script.contour_figure(), trajectory, path)
+    return setup
+
+
+def _layers_case(relpath, variants):
+    # One base contour raster, then annotated variants composited over it
+    def setup():
+        from . import layers
+
+        script = _script(relpath)
+        points = np.random.default_rng(0).uniform(-1, 1, (variants, 2))
+
+        def overlay(point):
+            def draw(ax):
+                ax.scatter(*point, color="purple", s=80, label="Point")
+                ax.set_title(f"({point[0]:.3f}, {point[1]:.3f})")
+                ax.legend()
+            return draw
+
+        def run():
+            layers.clear()
+            layer = script.contour_layer()
+            for point in points:
+                layers.compose(layer, overlay(point))
+        return run
+    return setup
+
+
+def _sparse_case(name, n):
+    # A Part B quadratic chained over n variables, solved by the sparse path
+    def setup():
+        from .quadratic import quadratic_coefficients
+        from .sparse import analyze_sparse, chain_quadratic
+
+        f, x1, x2 = _partB_expr(name)
+        H, b, c = chain_quadratic(*quadratic_coefficients(f, (x1, x2)), n)
+        return lambda: analyze_sparse(H, b + 1.0, c, maxiter=2000)
+    return setup
+
+
+def _kkt_case(name, n):
+    # Exact optima of a family over n parameter values (the coefficients are
+    # traced once, outside the timing)
+    def setup():
+        from .kkt import solve_family_values
+        from .problems import FAMILIES
+
+        family = FAMILIES[name]
+        values = tuple(np.linspace(0.5 * d, 1.5 * d, n) for d in family.defaults)
+        solve_family_values(family.problem.objective, family.equalities,
+                            family.inequalities, family.params, tuple(v[:1] for v in values))
+        return lambda: solve_family_values(family.problem.objective, family.equalities,
+                                           family.inequalities, family.params, values)
+    return setup
+
+
+def _batch_case():
+    # The example specs, solved in this process (parsing, tracing and solving)
+    def setup():
+        from .batch import run_spec
+        from .spec import find_specs
+
+        paths = find_specs([settings.SCRIPTS_DIR / "specs"])
+        return lambda: [run_spec(path) for path in paths]
+    return setup
+
+
+# -- symbolic cases -------------------------------------------------------
+def _partB_expr(name):
+    return _script("partB/plot_points.py").FUNCTIONS[name]()
+
+
+def _cold(fn):
+    # SymPy caches results across calls; clearing the cache in the timed
+    # body measures the cold cost a script pays on its single call
+    from sympy.core.cache import clear_cache
+
+    def run():
+        clear_cache()
+        return fn()
+    return run
+
+
+def _coefficients_case(name):
+    def setup():
+        from .quadratic import quadratic_coefficients
+
+        f, x1, x2 = _partB_expr(name)
+        return _cold(lambda: quadratic_coefficients(f, (x1, x2)))
+    return setup
+
+
+def _analyze_case(name):
+    def setup():
+        f, x1, x2 = _partB_expr(name)
+        analyze = _script("partB/plot_points.py").analyze_function
+        return _quiet(_cold(lambda: analyze(f, x1, x2)))
+    return setup
+
+
+def _solve_case(name):
+    # The generic sympy path that analyze_function uses for non-quadratics
+    def setup():
+        import sympy as sp
+
+        f, x1, x2 = _partB_expr(name)
+        return _cold(lambda: sp.solve([sp.diff(f, x1), sp.diff(f, x2)], (x1, x2), dict=True))
+    return setup
+
+
+def cases(sizes=DEFAULT_SIZES):
+    out = []
+    for pname, problem in PROBLEMS.items():
+        for n in sizes:
+            out.append(Case(f"eval/{pname}/{n}", _eval_case(problem, n), n))
+            out.append(Case(f"eval32/{pname}/{n}", _eval_case(problem, n, np.float32), n))
+            out.append(Case(f"mask/{pname}/{n}", _mask_case(problem, n), n))
+            out.append(Case(f"kernel/{pname}/{n}", _kernel_case(problem, n), n))
+            for kind in ("contour", "surface"):
+                out.append(Case(f"savefig/{pname}/{kind}/{n}",
+                                _savefig_case(problem, n, kind), n))
+
+    for pname, problem in PROBLEMS.items():
+        for layer in ("contour", "feasible", "optima"):
+            out.append(Case(f"tile/{pname}/{layer}", _tile_case(problem, layer)))
+
+    out += [
+        Case("opt/func1/find_optimal_points",
+             _script_case("partA/func1/plot_optimal_points_func_1.py", "find_optimal_points")),
+        Case("opt/func2/find_min_on_constraint",
+             _script_case("partA/func2/plot_optimal_points_func_2.py", "find_min_on_constraint")),
+        Case("opt/func3/find_optimal_points",
+             _script_case("partA/func3/plot_optimal_points_func_3.py", "find_optimal_points")),
+        Case("opt/sphere_batch/10000", _sphere_batch(10000)),
+        Case("draw/animate/func1/300", _animate_case("func1", 300)),
+        Case("draw/layers/func1/1",
+             _layers_case("partA/func1/plot_and_visualize_func_1.py", 1)),
+        Case("draw/layers/func1/16",
+             _layers_case("partA/func1/plot_and_visualize_func_1.py", 16)),
+        Case("opt/sparse/func1/100000", _sparse_case("func1", 100000)),
+        Case("opt/sparse/func2/10001", _sparse_case("func2", 10001)),
+        Case("opt/kkt/func1/100000", _kkt_case("func1", 100000), 100000),
+        Case("opt/kkt/func3/10000", _kkt_case("func3", 10000), 10000),
+        Case("opt/batch/specs", _batch_case()),
+    ]
+    for name in ("func1", "func2"):
+        out += [
+            Case(f"symbolic/{name}/coefficients", _coefficients_case(name)),
+            Case(f"symbolic/{name}/analyze", _analyze_case(name)),
+            Case(f"symbolic/{name}/sympy_solve", _solve_case(name)),
+        ]
+    return out
+
+
+# -- measurement ----------------------------------------------------------
+def _steady_allocator():
+    """Keep freed memory in the process (glibc only).
+
+    By default glibc returns large freed blocks to the OS and adapts its
+    mmap threshold to earlier allocations, so a case pays page faults or
+    not depending on which cases ran before it. Fixing both thresholds
+    makes timings independent of the order of cases.
+    """
+    import ctypes
+    import ctypes.util
+
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"))
+        M_TRIM_THRESHOLD, M_MMAP_THRESHOLD = -1, -3
+        return bool(libc.mallopt(M_MMAP_THRESHOLD, 1 << 30)
+                    and libc.mallopt(M_TRIM_THRESHOLD, 1 << 30))
+    except (OSError, AttributeError):
+        return False
+
+
+def measure(case, repeat=5, max_time=2.0):
+    """Timings and peak traced memory of one case.
+
+    Runs ``repeat`` times, but stops early once ``max_time`` seconds have
+    been spent, so the largest grids are timed fewer times.
+    """
+    run = case.setup()
+    run()  # warm-up: imports, caches, first-touch page faults
+
+    times = []
+    gc.collect()
+    gc.disable()
+    try:
+        spent = 0.0
+        while len(times) < repeat and (not times or spent < max_time):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+            spent += times[-1]
+    finally:
+        gc.enable()
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    run()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    return {"size": case.size, "min": min(times), "median": statistics.median(times),
+            "runs": len(times), "peak_bytes": int(peak)}
+
+
+def environment(steady_allocator=False):
+    versions = {}
+    for name in ("numpy", "matplotlib", "sympy"):
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    from .render import quality
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "quality": os.environ.get("OPTLAB_QUALITY", "report"),
+        "dpi": quality().dpi,
+        "steady_allocator": steady_allocator,
+        **versions,
+    }
+
+
+def compare(results, baseline, threshold=0.1):
+    """Print new vs baseline for shared cases; returns the regressed case names."""
+    regressions = []
+    print(f"\n{'case':44s} {'base':>10s} {'new':>10s} {'ratio':>6s} "
+          f"{'base MB':>8s} {'new MB':>8s}")
+    for name, new in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ratio = new["min"] / old["min"] if old["min"] > 0 else float("inf")
+        mem_ratio = (new["peak_bytes"] / old["peak_bytes"]) if old["peak_bytes"] else 1.0
+        slower = ratio > 1 + threshold and new["min"] - old["min"] > MIN_DELTA
+        bigger = mem_ratio > 1 + threshold and new["peak_bytes"] - old["peak_bytes"] > 2**20
+        flag = " <- slower" if slower else " <- memory" if bigger else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:44s} {old['min'] * 1e3:8.2f}ms {new['min'] * 1e3:8.2f}ms "
+              f"{ratio:6.2f} {old['peak_bytes'] / 2**20:8.1f} "
+              f"{new['peak_bytes'] / 2**20:8.1f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="grid points per axis, comma separated")
+    parser.add_argument("--only", action="append", default=[],
+                        help="glob on case names, e.g. 'eval/*' (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--max-time", type=float, default=2.0,
+                        help="stop repeating a case after this many seconds")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown reported as a regression")
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    args = parser.parse_args(argv)
+
+    # Measure the computation itself, not the on-disk caches.
+    os.environ.pop("OPTLAB_CACHE_DIR", None)
+    from .pipeline import _init_worker
+    _init_worker()
+    steady = _steady_allocator()
+
+    selected = cases(tuple(int(s) for s in args.sizes.split(",")))
+    if args.only:
+        selected = [c for c in selected if any(fnmatch.fnmatch(c.name, p) for p in args.only)]
+    if args.list:
+        for case in selected:
+            print(case.name)
+        return 0
+
+    results = {}
+    for case in selected:
+        results[case.name] = r = measure(case, args.repeat, args.max_time)
+        print(f"{case.name:44s} min {r['min'] * 1e3:10.3f}ms  median "
+              f"{r['median'] * 1e3:10.3f}ms  x{r['runs']}  peak "
+              f"{r['peak_bytes'] / 2**20:8.1f}MB", flush=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump({"environment": environment(steady), "results": results}, fh, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
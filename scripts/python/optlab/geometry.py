@@ -0,0 +1,247 @@
+"""Analytic constraint sets in the plane.
+
+Every set offers a vectorized signed distance (negative inside), exact
+sampling of its boundary curve at a requested density and projection onto
+it. Sampled pieces are joined with NaN separators, so a feasible set made
+of several arcs or segments is drawn as a single path.
+"""
+import numpy as np
+
+TWO_PI = 2 * np.pi
+
+
+def _join(pieces):
+    """Concatenate (x, y) pieces with NaN separators."""
+    if not pieces:
+        return np.empty(0), np.empty(0)
+    xs, ys = [], []
+    for x, y in pieces:
+        xs += [x, [np.nan]]
+        ys += [y, [np.nan]]
+    return np.concatenate(xs[:-1]), np.concatenate(ys[:-1])
+
+
+def _count(length, density, n):
+    return max(int(np.ceil(length * density)) + 1, 2) if n is None else n
+
+
+def _intersect(intervals, others):
+    """Intersection of two sorted lists of closed intervals."""
+    out = []
+    for lo1, hi1 in intervals:
+        for lo2, hi2 in others:
+            lo, hi = max(lo1, lo2), min(hi1, hi2)
+            if lo <= hi:
+                out.append((lo, hi))
+    return sorted(out)
+
+
+class HalfPlane:
+    """{p : normal . p + offset <= 0}"""
+
+    def __init__(self, normal, offset=0.0):
+        self.normal = np.asarray(normal, dtype=float)
+        self.offset = float(offset)
+
+    def signed_distance(self, x, y):
+        n = self.normal
+        return (n[0] * x + n[1] * y + self.offset) / np.hypot(*n)
+
+    def contains(self, x, y, tol=0.0):
+        return self.signed_distance(x, y) <= tol
+
+    def project(self, x, y):
+        d = np.maximum(self.signed_distance(x, y), 0.0)
+        u = self.normal / np.hypot(*self.normal)
+        return x - d * u[0], y - d * u[1]
+
+    def __repr__(self):
+        return f"HalfPlane({self.normal.tolist()}, {self.offset})"
+
+
+class Line:
+    """{p : normal . p + offset = 0}, parametrized as p0 + t * direction."""
+
+    def __init__(self, normal, offset=0.0):
+        self.normal = np.asarray(normal, dtype=float)
+        self.offset = float(offset)
+        unit = self.normal / np.hypot(*self.normal)
+        self.point = -self.offset * unit / np.hypot(*self.normal)
+        self.direction = np.array([-unit[1], unit[0]])
+
+    def signed_distance(self, x, y):
+        n = self.normal
+        return (n[0] * x + n[1] * y + self.offset) / np.hypot(*n)
+
+    def project(self, x, y):
+        d = self.signed_distance(x, y)
+        u = self.normal / np.hypot(*self.normal)
+        return x - d * u[0], y - d * u[1]
+
+    def point_at(self, t):
+        t = np.asarray(t, dtype=float)
+        return self.point[0] + t * self.direction[0], self.point[1] + t * self.direction[1]
+
+    def parameter(self, x, y):
+        return (x - self.point[0]) * self.direction[0] + (y - self.point[1]) * self.direction[1]
+
+    def intervals(self, bounds):
+        """Parameter interval of the segment inside the box ``bounds``."""
+        lo, hi = -np.inf, np.inf
+        box = ((bounds[0], bounds[1]), (bounds[2], bounds[3]))
+        for k, (bmin, bmax) in enumerate(box):
+            p, d = self.point[k], self.direction[k]
+            if abs(d) < 1e-15:
+                if not bmin <= p <= bmax:
+                    return []
+                continue
+            t1, t2 = (bmin - p) / d, (bmax - p) / d
+            lo, hi = max(lo, min(t1, t2)), min(hi, max(t1, t2))
+        return [(lo, hi)] if lo <= hi else []
+
+    def restrict(self, halfplane):
+        """Parameter intervals of the line where ``halfplane`` holds."""
+        a = float(halfplane.normal @ self.direction)
+        b = float(halfplane.normal @ self.point) + halfplane.offset
+        # a * t + b <= 0
+        if abs(a) < 1e-15:
+            return [(-np.inf, np.inf)] if b <= 0 else []
+        return [(-np.inf, -b / a)] if a > 0 else [(-b / a, np.inf)]
+
+    def sample(self, density=100.0, bounds=None, n=None, intervals=None):
+        if intervals is None:
+            if bounds is None:
+                raise ValueError("sampling a line needs bounds")
+            intervals = self.intervals(bounds)
+        pieces = []
+        for lo, hi in intervals:
+            t = np.linspace(lo, hi, _count(hi - lo, density, n))
+            pieces.append(self.point_at(t))
+        return _join(pieces)
+
+    def __repr__(self):
+        return f"Line({self.normal.tolist()}, {self.offset})"
+
+
+class Circle:
+    """{p : |p - center| = radius}, parametrized by the angle theta."""
+
+    def __init__(self, center, radius):
+        self.center = np.asarray(center, dtype=float)
+        self.radius = float(radius)
+
+    def signed_distance(self, x, y):
+        return np.hypot(x - self.center[0], y - self.center[1]) - self.radius
+
+    def project(self, x, y):
+        dx, dy = x - self.center[0], y - self.center[1]
+        r = np.hypot(dx, dy)
+        # The center projects to an arbitrary point of the circle.
+        dx = np.where(r > 0, dx, 1.0)
+        r = np.where(r > 0, r, 1.0)
+        return (self.center[0] + self.radius * dx / r,
+                self.center[1] + self.radius * dy / r)
+
+    def point_at(self, theta):
+        theta = np.asarray(theta, dtype=float)
+        return (self.center[0] + self.radius * np.cos(theta),
+                self.center[1] + self.radius * np.sin(theta))
+
+    def parameter(self, x, y):
+        return np.mod(np.arctan2(y - self.center[1], x - self.center[0]), TWO_PI)
+
+    def intervals(self, bounds=None):
+        return [(0.0, TWO_PI)]
+
+    @staticmethod
+    def merge_seam(intervals):
+        """Join arcs that meet at angle 0 = 2 pi into one arc (hi may exceed 2 pi)."""
+        if len(intervals) > 1 and intervals[0][0] == 0.0 and intervals[-1][1] == TWO_PI:
+            return [(intervals[-1][0], intervals[0][1] + TWO_PI)] + intervals[1:-1]
+        return intervals
+
+    def restrict(self, halfplane):
+        """Angle intervals (within [0, 2 pi]) where ``halfplane`` holds."""
+        n = halfplane.normal
+        # n . (c + r (cos t, sin t)) + offset <= 0  <=>  R cos(t - phi) <= C
+        R = self.radius * np.hypot(*n)
+        C = -(float(n @ self.center) + halfplane.offset)
+        if C >= R:
+            return [(0.0, TWO_PI)]
+        if C < -R:
+            return []
+        phi = np.arctan2(n[1], n[0])
+        alpha = np.arccos(C / R)
+        lo = np.mod(phi + alpha, TWO_PI)
+        hi = lo + TWO_PI - 2 * alpha
+        if hi <= TWO_PI:
+            return [(lo, hi)]
+        return [(0.0, hi - TWO_PI), (lo, TWO_PI)]
+
+    def sample(self, density=100.0, bounds=None, n=None, intervals=None):
+        intervals = self.intervals() if intervals is None else intervals
+        pieces = []
+        for lo, hi in self.merge_seam(intervals):
+            t = np.linspace(lo, hi, _count(self.radius * (hi - lo), density, n))
+            pieces.append(self.point_at(t))
+        return _join(pieces)
+
+    def __repr__(self):
+        return f"Circle({self.center.tolist()}, {self.radius})"
+
+
+class Intersection:
+    """A curve (Line or Circle) cut by half-planes, e.g. an arc or a segment."""
+
+    def __init__(self, curve, *halfplanes):
+        self.curve = curve
+        self.halfplanes = halfplanes
+
+    def intervals(self, bounds=None):
+        if isinstance(self.curve, Line):
+            if bounds is None:
+                raise ValueError("sampling a line needs bounds")
+            out = self.curve.intervals(bounds)
+        else:
+            out = self.curve.intervals()
+        for hp in self.halfplanes:
+            out = _intersect(out, self.curve.restrict(hp))
+        return [(lo, hi) for lo, hi in out if hi > lo]
+
+    def signed_distance(self, x, y):
+        # Standard bound for intersections: max of the member distances.
+        d = np.abs(self.curve.signed_distance(x, y))
+        for hp in self.halfplanes:
+            d = np.maximum(d, hp.signed_distance(x, y))
+        return d
+
+    def endpoints(self, bounds=None):
+        intervals = self.intervals(bounds)
+        if isinstance(self.curve, Circle):
+            if intervals == [(0.0, TWO_PI)]:
+                return np.empty(0), np.empty(0)
+            intervals = Circle.merge_seam(intervals)
+        ends = [t for iv in intervals for t in iv if np.isfinite(t)]
+        return self.curve.point_at(np.array(ends))
+
+    def project(self, x, y, bounds=None):
+        """Closest point of the set: the projection onto the curve if it is
+        feasible, otherwise the nearest endpoint of a feasible piece."""
+        px, py = self.curve.project(x, y)
+        ok = np.ones(np.shape(px), dtype=bool)
+        for hp in self.halfplanes:
+            ok &= hp.contains(px, py, tol=1e-12)
+        ex, ey = self.endpoints(bounds)
+        if ex.size == 0:
+            return px, py
+        dist = np.hypot(np.subtract.outer(x, ex), np.subtract.outer(y, ey))
+        k = np.argmin(dist, axis=-1)
+        return np.where(ok, px, ex[k]), np.where(ok, py, ey[k])
+
+    def sample(self, density=100.0, bounds=None, n=None):
+        return self.curve.sample(density, bounds=bounds, n=n,
+                                 intervals=self.intervals(bounds))
+
+    def __repr__(self):
+        parts = ", ".join(repr(s) for s in (self.curve, *self.halfplanes))
+        return f"Intersection({parts})"
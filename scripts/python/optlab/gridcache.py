@@ -0,0 +1,142 @@
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+
+from . import lowmem, settings
+from .trace import span
+
+
+@dataclass
+class Grid:
+    """Objective values of a problem on a rectangular grid."""
+    x: np.ndarray
+    y: np.ndarray
+    F: np.ndarray
+    problem: object = None
+
+    # Dense-looking coordinates for plotting: read-only broadcast views of
+    # the 1-D axes, so they take no memory.
+    @cached_property
+    def X(self):
+        return np.broadcast_to(self.x[np.newaxis, :], self.F.shape)
+
+    @cached_property
+    def Y(self):
+        return np.broadcast_to(self.y[:, np.newaxis], self.F.shape)
+
+    # Tolerance-band feasibility mask; plots use problem.feasible_path() instead.
+    @cached_property
+    def feasible(self):
+        return self.problem.constraints(self.X, self.Y)[2]
+
+
+def _resolution(resolution):
+    if np.isscalar(resolution):
+        return int(resolution), int(resolution)
+    nx, ny = resolution
+    return int(nx), int(ny)
+
+
+class GridCache:
+    """LRU cache of evaluated grids with an optional .npy tier on disk.
+
+    Entries are keyed by (problem, bounds, resolution, dtype). Arrays loaded
+    from disk are memory-mapped read-only, so they are shared between runs
+    without being copied into memory.
+    """
+
+    def __init__(self, maxsize=8, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, problem, bounds, resolution, dtype):
+        bounds = tuple(float(b) for b in bounds)
+        return (problem.fingerprint(), bounds, _resolution(resolution),
+                np.dtype(dtype).str)
+
+    def get(self, problem, resolution, bounds=None, dtype=np.float64):
+        bounds = problem.bounds if bounds is None else bounds
+        key = self.key(problem, bounds, resolution, dtype)
+
+        grid = self._entries.get(key)
+        if grid is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return grid
+
+        self.misses += 1
+        grid = self._load(key, problem)
+        if grid is None:
+            grid = self._evaluate(problem, bounds, resolution, dtype)
+            self._store(key, grid)
+
+        self._entries[key] = grid
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return grid
+
+    def clear(self):
+        self._entries.clear()
+
+    @staticmethod
+    def _axes(bounds, resolution, dtype):
+        nx, ny = _resolution(resolution)
+        x = np.linspace(bounds[0], bounds[1], nx, dtype=dtype)
+        y = np.linspace(bounds[2], bounds[3], ny, dtype=dtype)
+        return x, y
+
+    def _evaluate(self, problem, bounds, resolution, dtype):
+        with span("grid", resolution=resolution):
+            x, y = self._axes(bounds, resolution, dtype)
+        with span("eval", problem=problem.name, points=x.size * y.size):
+            F = lowmem.evaluate(problem, x, y, dtype=dtype)
+        return Grid(x, y, F, problem)
+
+    # -- disk tier --------------------------------------------------------
+    def _path(self, key):
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, "grids", name + "-F.npy")
+
+    def _load(self, key, problem):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        _, bounds, resolution, dtype = key
+        x, y = self._axes(bounds, resolution, dtype)
+        return Grid(x, y, np.load(path, mmap_mode="r"), problem)
+
+    def _store(self, key, grid):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary name first so a concurrent reader never sees a
+        # half-written file.
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            np.save(fh, grid.F)
+        os.replace(tmp, path)
+
+
+_default_cache = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = GridCache(directory=settings.cache_dir())
+    return _default_cache
+
+
+def evaluate_grid(problem, resolution, bounds=None, dtype=np.float64):
+    """Grid of ``problem`` from the process-wide cache."""
+    return default_cache().get(problem, resolution, bounds=bounds, dtype=dtype)
@@ -0,0 +1,307 @@
+"""Fused kernels for f, its gradient and its Hessian, generated from SymPy.
+
+One generated function returns f, the gradient and the Hessian together.
+Common subexpressions are eliminated across all of them, so shared products
+are computed once, and only the upper triangle of the Hessian is computed.
+Kernels come in three orders: 0 gives f, 1 gives f and the gradient, and 2
+adds the Hessian. The same source generator serves three backends:
+
+- numpy: one array expression per subexpression (always available)
+- numexpr: one numexpr.evaluate per output over its whole expression, run
+  in cache-sized blocks on several threads without full-size temporaries.
+  Subexpressions shared between outputs are computed once per output, as
+  splitting them out would make each one a full array again
+- numba: one compiled loop over the points, with every subexpression kept
+  in registers
+
+The first time a kernel is needed, each available backend runs it on the
+same sample. The fastest one that agrees with numpy is kept. When
+OPTLAB_CACHE_DIR is set, the choice and the generated source are stored
+there too. OPTLAB_KERNEL_BACKEND forces a backend.
+"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from . import settings
+from .trace import traced
+
+BACKENDS = ("numpy", "numexpr", "numba")
+# Points per argument in the selection benchmark
+SAMPLE_SIZE = 1 << 16
+
+_kernels = {}
+
+
+@dataclass
+class FusedKernel:
+    """``kernel(*args)`` returns (f,), (f, gradient) or (f, gradient, hessian).
+
+    The gradient has shape (n, ...) and the Hessian (n, n, ...), where ``...``
+    is the broadcast shape of the arguments.
+    """
+    key: str
+    order: int
+    n: int
+    backend: str
+    source: str
+    raw: object
+
+    def __call__(self, *args):
+        args = [np.asarray(a, dtype=float) for a in args]
+        shape = np.broadcast_shapes(*(a.shape for a in args))
+        if self.backend == "numba":
+            flat = [np.ascontiguousarray(np.broadcast_to(a, shape)).reshape(-1) for a in args]
+            out = np.empty((_output_count(self.n, self.order), flat[0].size))
+            self.raw(*flat, out)
+            values = [row.reshape(shape) for row in out]
+        else:
+            values = [_broadcast(v, shape) for v in self.raw(*args)]
+        return _assemble(values, self.n, self.order, shape)
+
+
+def _broadcast(value, shape):
+    value = np.asarray(value, dtype=float)
+    return value if value.shape == shape else np.broadcast_to(value, shape)
+
+
+def _output_count(n, order):
+    return 1 + (n if order >= 1 else 0) + (n * (n + 1) // 2 if order >= 2 else 0)
+
+
+def _assemble(values, n, order, shape):
+    out = [values[0]]
+    if order >= 1:
+        out.append(np.stack(values[1:1 + n]))
+    if order >= 2:
+        hess = np.empty((n, n) + shape)
+        upper = iter(values[1 + n:])
+        for j in range(n):
+            for k in range(j, n):
+                hess[j, k] = next(upper)
+                hess[k, j] = hess[j, k]
+        out.append(hess)
+    return tuple(out)
+
+
+def kernel_key(expr, symbols, order):
+    import sympy as sp
+
+    text = f"{sp.srepr(expr)}|{sp.srepr(tuple(symbols))}|{order}"
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _expressions(expr, symbols, order):
+    """f, the gradient and the Hessian's upper triangle, on generic argument names."""
+    import sympy as sp
+
+    names = sp.symbols(f"_a0:{len(symbols)}")
+    expr = sp.sympify(expr).xreplace(dict(zip(symbols, names)))
+    out = [expr]
+    if order >= 1:
+        grad = [sp.diff(expr, s) for s in names]
+        out += grad
+    if order >= 2:
+        out += [sp.diff(grad[j], names[k]) for j in range(len(names))
+                for k in range(j, len(names))]
+    return names, out
+
+
+@traced("symbolic")
+def generate_source(expr, symbols, order, backend):
+    """Source of ``_kernel`` for one backend, with CSE over all outputs
+    (except for numexpr, see the module docstring)."""
+    import sympy as sp
+    from sympy.printing.lambdarepr import NumExprPrinter
+    from sympy.printing.numpy import NumPyPrinter
+    from sympy.printing.pycode import PythonCodePrinter
+
+    names, exprs = _expressions(expr, symbols, order)
+    args = ", ".join(str(a) for a in names)
+
+    if backend == "numexpr":
+        printer = NumExprPrinter()
+        local = ", ".join(f"'{a}': {a}" for a in names)
+        outputs = [repr(float(value)) if not value.free_symbols
+                   else f"_evaluate({printer._print(value)!r}, _local)" for value in exprs]
+        return (f"def _kernel({args}):\n    _local = {{{local}}}\n"
+                f"    return ({', '.join(outputs)},)\n")
+
+    replacements, reduced = sp.cse(exprs, symbols=sp.numbered_symbols("_c"))
+
+    if backend == "numba":
+        printer = PythonCodePrinter()
+        lines = [f"def _kernel({args}, _out):", "    for _i in range(_out.shape[1]):"]
+        lines += [f"        _{a} = {a}[_i]" for a in names]
+        scalar = {a: sp.Symbol(f"_{a}") for a in names}
+        for sym, value in replacements:
+            lines.append(f"        {sym} = {printer.doprint(value.xreplace(scalar))}")
+        for i, value in enumerate(reduced):
+            lines.append(f"        _out[{i}, _i] = {printer.doprint(value.xreplace(scalar))}")
+        return "\n".join(lines) + "\n"
+
+    printer = NumPyPrinter()
+    lines = [f"def _kernel({args}):"]
+    for sym, value in replacements:
+        lines.append(f"    {sym} = {printer.doprint(value)}")
+    lines.append(f"    return ({', '.join(printer.doprint(v) for v in reduced)},)")
+    return "\n".join(lines) + "\n"
+
+
+def _namespace(backend):
+    if backend == "numexpr":
+        import numexpr
+
+        return {"_evaluate": numexpr.evaluate}
+    if backend == "numba":
+        import math
+
+        return {"math": math}
+    return {"numpy": np}
+
+
+def _build(source, backend, key):
+    namespace = _namespace(backend)
+    exec(compile(source, f"<kernel {backend} {key[:12]}>", "exec"), namespace)
+    raw = namespace["_kernel"]
+    if backend == "numba":
+        import numba
+
+        raw = numba.njit(fastmath=False)(raw)
+    return raw
+
+
+def _importable(backend):
+    if backend == "numpy":
+        return True
+    try:
+        __import__(backend)
+    except ImportError:
+        return False
+    return True
+
+
+def available_backends():
+    """Backends whose optional dependency can be imported."""
+    return [name for name in BACKENDS if _importable(name)]
+
+
+def _cache_path(key, name):
+    directory = settings.cache_dir()
+    if directory is None:
+        return None
+    return os.path.join(directory, "kernels", f"{key}.{name}")
+
+
+def _read(path):
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return fh.read()
+
+
+def _write(path, text):
+    if path is None:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+def _make(expression, key, order, n, backend):
+    path = _cache_path(key, f"{backend}.py")
+    source = _read(path)
+    if source is None:
+        source = generate_source(*expression(), order, backend)
+        _write(path, source)
+    return FusedKernel(key=key, order=order, n=n, backend=backend,
+                       source=source, raw=_build(source, backend, key))
+
+
+def _time(kernel, sample, repeat=3):
+    kernel(*sample)     # warm-up (and JIT compilation for numba)
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        kernel(*sample)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+@traced("symbolic")
+def _select(expression, key, order, n):
+    """Benchmark every available backend and return the fastest correct kernel."""
+    rng = np.random.default_rng(0)
+    sample = [rng.uniform(-1.0, 1.0, SAMPLE_SIZE) for _ in range(n)]
+    reference = _make(expression, key, order, n, "numpy")
+    expected = reference(*sample)
+    best, best_time = reference, _time(reference, sample)
+    for backend in available_backends()[1:]:
+        try:
+            kernel = _make(expression, key, order, n, backend)
+            seconds = _time(kernel, sample)
+            got = kernel(*sample)
+        except Exception:   # an optional backend that cannot handle expr is skipped
+            continue
+        if all(np.allclose(g, e, rtol=1e-9, atol=1e-12, equal_nan=True)
+               for g, e in zip(got, expected)) and seconds < best_time:
+            best, best_time = kernel, seconds
+    return best
+
+
+def _get(expression, key, order, n, backend):
+    """Kernel from memory, from the disk cache, or generated (``expression`` is lazy)."""
+    backend = backend or os.environ.get("OPTLAB_KERNEL_BACKEND", "").strip() or None
+    kernel = _kernels.get((key, backend))
+    if kernel is not None:
+        return kernel
+
+    if backend is not None:
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown kernel backend {backend!r}, expected one of {BACKENDS}")
+        kernel = _make(expression, key, order, n, backend)
+    else:
+        choice_path = _cache_path(key, "choice.json")
+        choice = _read(choice_path)
+        chosen = json.loads(choice)["backend"] if choice else None
+        if chosen in BACKENDS and _importable(chosen):
+            kernel = _make(expression, key, order, n, chosen)
+        else:
+            kernel = _select(expression, key, order, n)
+            _write(choice_path, json.dumps({"backend": kernel.backend}))
+    _kernels[(key, backend)] = kernel
+    return kernel
+
+
+def fused_kernel(expr, symbols, order=2, backend=None):
+    """The fused kernel of ``expr`` up to ``order``, built once per process.
+
+    ``backend`` (or OPTLAB_KERNEL_BACKEND) forces one of BACKENDS; otherwise
+    the fastest available backend is chosen by a benchmark at first use.
+    """
+    symbols = tuple(symbols)
+    return _get(lambda: (expr, symbols), kernel_key(expr, symbols, order), order,
+                len(symbols), backend)
+
+
+def problem_kernel(problem, order=2, backend=None):
+    """Fused kernel of an optlab.problems.Problem objective in (x, y).
+
+    The objectives are plain arithmetic, so calling them on SymPy symbols
+    gives their expression. Kernels are keyed by the problem fingerprint, so
+    with a disk cache SymPy is not even imported.
+    """
+    def expression():
+        import sympy as sp
+
+        x, y = sp.symbols("x y", real=True)
+        return problem.objective(x, y), (x, y)
+
+    key = hashlib.sha256(f"{problem.fingerprint()}|{order}".encode()).hexdigest()
+    return _get(expression, key, order, 2, backend)
@@ -0,0 +1,592 @@
+"""Exact global extrema of 2-D quadratic problems by active-set enumeration.
+
+    min / max  f(x) = 1/2 x^T H x + b^T x + c
+    subject to g_i(x) = 1/2 x^T A_i x + a_i^T x + alpha_i <= 0,  h_j(x) = 0 (same form)
+
+Every optimum is a KKT point of some active set (the equalities plus a
+subset of the inequalities, at most two constraints in 2-D), so all of them
+are enumerated and solved exactly:
+
+- no active constraint: H x = -b
+- one active constraint: (H + lam A) x = -(b + lam a). With x(lam) from the
+  adjugate of H + lam A, the constraint becomes a quartic in lam (a linear
+  system for a linear constraint); where H + lam A is singular, x is the
+  least-squares point plus a multiple of the null vector (the hard case)
+- two active constraints: their intersection points, from the resultant of
+  the two conics (a quartic in one coordinate, in a rotated frame so that no
+  two intersections share it), and the multipliers from grad f
+
+Roots of all instances are found together from companion matrices and
+refined by Newton's method on the KKT system. Candidates that are
+infeasible, or whose inequality multipliers have the wrong sign (mu >= 0
+at a minimum, mu <= 0 at a maximum), are dropped, and the best remaining
+one is the global optimum. The answer is certified when an optimum exists:
+the feasible set is bounded (an ellipse among the equalities, or among the
+inequalities with A positive definite), or f is coercive on the equality
+constraints (linear constraints only).
+
+Everything is vectorized over instances; coefficients of problems and
+families come from optlab.quadratic.coefficient_function.
+
+    python -m optlab.kkt func1 [radius=0.5:3:1000000]
+"""
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from .trace import traced
+
+# Rotation for the elimination of two constraints (any angle that does not
+# align intersection points with the axes of the problems would do)
+_ROTATION = 0.6154797
+
+
+@dataclass
+class KKTResult:
+    """Global minimum and maximum, one entry per instance.
+
+    The multipliers follow L = f + lam . h + mu . g, so mu >= 0 at the
+    minimum and mu <= 0 at the maximum. Where an optimum is unbounded, f is
+    -inf or +inf and x is NaN; where there is no feasible candidate, f is NaN.
+    """
+    x_min: np.ndarray             # (..., 2)
+    f_min: np.ndarray             # (...)
+    lam_min: np.ndarray           # (..., n_eq)
+    mu_min: np.ndarray            # (..., n_ineq)
+    x_max: np.ndarray
+    f_max: np.ndarray
+    lam_max: np.ndarray
+    mu_max: np.ndarray
+    certified_min: np.ndarray     # True where f_min is the proven global minimum
+    certified_max: np.ndarray
+    candidates: np.ndarray        # number of feasible KKT points
+
+
+@dataclass
+class _Quadratic:
+    """Stacked 1/2 x^T A x + a^T x + alpha, shapes (N, 2, 2), (N, 2), (N,)."""
+    A: np.ndarray
+    a: np.ndarray
+    alpha: np.ndarray
+
+    @property
+    def linear(self):
+        return bool(np.all(np.abs(self.A) <= 1e-14 * (1.0 + np.abs(self.a).max())))
+
+    def value(self, x):
+        # Written out for 2x2: einsum over many tiny matrices is slow
+        A, a = self.A[:, None], self.a[:, None]
+        x0, x1 = x[..., 0], x[..., 1]
+        return (x0 * (0.5 * A[..., 0, 0] * x0 + A[..., 0, 1] * x1 + a[..., 0])
+                + x1 * (0.5 * A[..., 1, 1] * x1 + a[..., 1]) + self.alpha[:, None])
+
+    def gradient(self, x):
+        return (self.A[:, None] @ x[..., None])[..., 0] + self.a[:, None]
+
+    def scale(self):
+        return 1.0 + np.maximum(np.abs(self.A).max(axis=(-1, -2)),
+                                np.maximum(np.abs(self.a).max(axis=-1), np.abs(self.alpha)))
+
+
+# -- polynomials (coefficients low to high, stacked over instances) -------
+def _pmul(p, q):
+    out = np.zeros(p.shape[:-1] + (p.shape[-1] + q.shape[-1] - 1,))
+    for i in range(p.shape[-1]):
+        out[..., i:i + q.shape[-1]] += p[..., i:i + 1] * q
+    return out
+
+
+def _padd(*polys):
+    out = np.zeros(polys[0].shape[:-1] + (max(p.shape[-1] for p in polys),))
+    for p in polys:
+        out[..., :p.shape[-1]] += p
+    return out
+
+
+def _peval(p, t):
+    """Stacked polynomials (N, d + 1) at points t (N, k)."""
+    return sum(p[:, k, None] * t**k for k in range(p.shape[-1]))
+
+
+def _real_roots(coeffs, rtol=1e-12):
+    """Real roots of stacked polynomials (N, d + 1), NaN-padded to (N, d).
+
+    The degree of each polynomial is its highest coefficient above
+    rtol * max |coefficient|; each degree is one batched eigvals call on
+    companion matrices.
+    """
+    coeffs = np.asarray(coeffs, dtype=float)
+    n, d = coeffs.shape[0], coeffs.shape[1] - 1
+    roots = np.full((n, d), np.nan)
+    big = np.abs(coeffs) > rtol * np.abs(coeffs).max(axis=-1, keepdims=True)
+    degree = np.where(big.any(axis=-1), d - np.argmax(big[:, ::-1], axis=-1), 0)
+    for k in range(1, d + 1):
+        index = np.flatnonzero(degree == k)
+        if not index.size:
+            continue
+        c = coeffs[index, :k + 1]
+        companion = np.zeros((index.size, k, k))
+        companion[:, 1:, :-1] = np.eye(k - 1)
+        companion[:, :, -1] = -c[:, :k] / c[:, k:]
+        z = np.linalg.eigvals(companion)
+        real = np.abs(z.imag) <= 1e-6 * (1.0 + np.abs(z.real))
+        roots[index, :k] = np.where(real, z.real, np.nan)
+    return roots
+
+
+# -- candidates per active set --------------------------------------------
+def _interior(H, b):
+    from .quadratic import stationary_points
+
+    x, _ = stationary_points(H, b)
+    return x[:, None]
+
+
+def _one_linear(H, b, con):
+    # [[H, a], [a^T, 0]] [x; lam] = [-b; -alpha]
+    n = len(H)
+    K = np.zeros((n, 3, 3))
+    K[:, :2, :2] = H
+    K[:, :2, 2] = K[:, 2, :2] = con.a
+    rhs = np.concatenate([-b, -con.alpha[:, None]], axis=-1)
+    ok = np.abs(np.linalg.det(K)) > 1e-12 * np.abs(K).max(axis=(-1, -2)) ** 3
+    sol = np.linalg.solve(np.where(ok[:, None, None], K, np.eye(3)), rhs[..., None])[..., 0]
+    sol = np.where(ok[:, None], sol, np.nan)
+    return sol[:, None, :2], sol[:, None, 2:]
+
+
+def _one_quadratic(H, b, con):
+    # Entries of M(lam) = H + lam A and r(lam) = -(b + lam a), degree 1 in lam
+    M = np.stack([H, con.A], axis=-1)                  # (N, 2, 2, 2)
+    r = -np.stack([b, con.a], axis=-1)                 # (N, 2, 2)
+    det = _padd(_pmul(M[:, 0, 0], M[:, 1, 1]), -_pmul(M[:, 0, 1], M[:, 1, 0]))
+    # x(lam) = adj(M) r / det(M)
+    num = np.stack([_padd(_pmul(M[:, 1, 1], r[:, 0]), -_pmul(M[:, 0, 1], r[:, 1])),
+                    _padd(_pmul(M[:, 0, 0], r[:, 1]), -_pmul(M[:, 1, 0], r[:, 0]))], axis=1)
+    A, a, alpha = con.A, con.a, con.alpha
+    quad = _padd(0.5 * A[:, 0, 0, None] * _pmul(num[:, 0], num[:, 0]),
+                 A[:, 0, 1, None] * _pmul(num[:, 0], num[:, 1]),
+                 0.5 * A[:, 1, 1, None] * _pmul(num[:, 1], num[:, 1]))
+    lin = _padd(a[:, 0, None] * num[:, 0], a[:, 1, None] * num[:, 1])
+    quartic = _padd(quad, _pmul(det, lin), alpha[:, None] * _pmul(det, det))
+
+    lam = _real_roots(quartic)                                     # (N, 4)
+    D = _peval(det, lam)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X = np.stack([_peval(num[:, i], lam) for i in range(2)], axis=-1) / D[..., None]
+    X = np.where(np.abs(D[..., None]) > 1e-12 * np.abs(det).max(axis=-1)[:, None, None],
+                 X, np.nan)
+
+    # Hard case: lam with H + lam A singular, x = x_p + t v on the constraint
+    lam_h = _real_roots(det)                                       # (N, 2)
+    Mh = H[:, None] + lam_h[..., None, None] * A[:, None]
+    rh = -(b[:, None] + lam_h[..., None] * a[:, None])
+    U, s, Vt = np.linalg.svd(np.nan_to_num(Mh))
+    rank1 = (s[..., 1] <= 1e-10 * s[..., 0]) & (s[..., 0] > 0) & np.isfinite(lam_h)
+    xp = Vt[..., 0, :] * (np.einsum("nki,nki->nk", U[..., :, 0], rh)
+                          / np.where(rank1, s[..., 0], 1.0))[..., None]
+    consistent = np.linalg.norm(np.einsum("nkij,nkj->nki", Mh, xp) - rh, axis=-1) \
+        <= 1e-9 * (1.0 + np.linalg.norm(rh, axis=-1))
+    v = Vt[..., 1, :]
+    Av = np.einsum("nij,nkj->nki", A, v)
+    t = _real_roots(np.stack([
+        0.5 * np.einsum("nki,nkij,nkj->nk", xp, np.broadcast_to(A[:, None], Mh.shape), xp)
+        + np.sum(a[:, None] * xp, axis=-1) + alpha[:, None],
+        np.sum(xp * Av, axis=-1) + np.sum(a[:, None] * v, axis=-1),
+        0.5 * np.sum(v * Av, axis=-1)], axis=-1).reshape(-1, 3)).reshape(len(H), 2, 2)
+    Xh = xp[:, :, None] + t[..., None] * v[:, :, None]
+    Xh = np.where((rank1 & consistent)[..., None, None], Xh, np.nan).reshape(len(H), 4, 2)
+    lam_hard = np.repeat(lam_h, 2, axis=-1)
+
+    # H + lam A = 0 and b + lam a = 0: f is constant on the whole conic, so
+    # any of its points will do (on lines through its center)
+    flat = (s[..., 0] <= 1e-12 * (1.0 + np.abs(H).max(axis=(-1, -2)))[:, None]) \
+        & (np.linalg.norm(rh, axis=-1) <= 1e-12 * (1.0 + np.abs(b).max(axis=-1))[:, None]) \
+        & np.isfinite(lam_h)
+    Xf = _conic_points(con)
+    Xf = np.where(flat.any(axis=-1)[:, None, None], Xf, np.nan)
+    return (np.concatenate([X, Xh, Xf], axis=1),
+            np.concatenate([lam, lam_hard, np.full(Xf.shape[:2], np.nan)], axis=1)[..., None])
+
+
+def _conic_points(con):
+    """Up to 8 points of a central conic, on 4 lines through its center, (N, 8, 2)."""
+    A, a, alpha = con.A, con.a, con.alpha
+    ok = np.abs(np.linalg.det(A)) > 1e-12 * (1.0 + np.abs(A).max(axis=(-1, -2))) ** 2
+    center = np.linalg.solve(np.where(ok[:, None, None], A, np.eye(2)), -a[..., None])[..., 0]
+    value = 0.5 * np.einsum("ni,nij,nj->n", center, A, center) + np.sum(a * center, axis=-1) \
+        + alpha
+    points = []
+    for d in np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0], [1.0, -1.0]]):
+        # c(center + t d) = 1/2 d^T A d t^2 + c(center), the gradient vanishes at the center
+        t = _real_roots(np.stack([value, np.zeros_like(value), 0.5 * (A @ d) @ d], axis=-1))
+        points.append(center[:, None] + t[..., None] * d)
+    return np.where(ok[:, None, None], np.concatenate(points, axis=1), np.nan)
+
+
+def _two(H, b, c1, c2):
+    """Intersections of two constraints, with multipliers from grad f."""
+    if c1.linear and c2.linear:
+        G = np.stack([c1.a, c2.a], axis=1)
+        ok = np.abs(np.linalg.det(G)) > 1e-12 * (np.abs(G).max(axis=(-1, -2)) ** 2)
+        x = np.linalg.solve(np.where(ok[:, None, None], G, np.eye(2)),
+                            -np.stack([c1.alpha, c2.alpha], axis=-1)[..., None])[..., 0]
+        X = np.where(ok[:, None], x, np.nan)[:, None]
+    else:
+        X = _intersections(c1, c2)
+    # grad f + lam1 grad c1 + lam2 grad c2 = 0
+    G = np.stack([c1.gradient(X), c2.gradient(X)], axis=-1)       # (N, K, 2, 2)
+    grad = np.einsum("nij,nkj->nki", H, X) + b[:, None]
+    ok = np.abs(np.linalg.det(np.nan_to_num(G))) > 1e-12 * (1.0 + np.abs(np.nan_to_num(G)).max(
+        axis=(-1, -2))) ** 2
+    lam = np.linalg.solve(np.where(ok[..., None, None], np.nan_to_num(G), np.eye(2)),
+                          -np.nan_to_num(grad)[..., None])[..., 0]
+    # Where the gradients are parallel (LICQ fails) the point is kept with
+    # unknown multipliers
+    return X, np.where(ok[..., None], lam, np.nan)
+
+
+def _rotated(con, R):
+    return _Quadratic(np.einsum("ji,njk,kl->nil", R, con.A, R), con.a @ R, con.alpha)
+
+
+def _in_y(con):
+    """c as p2 y^2 + p1(x) y + p0(x), polynomials in x."""
+    A, a, alpha = con.A, con.a, con.alpha
+    p2 = 0.5 * A[:, 1, 1, None]
+    p1 = np.stack([a[:, 1], A[:, 0, 1]], axis=-1)
+    p0 = np.stack([alpha, a[:, 0], 0.5 * A[:, 0, 0]], axis=-1)
+    return p2, p1, p0
+
+
+def _intersections(c1, c2):
+    """Up to 4 intersection points of two conics (or a conic and a line), (N, 8, 2)."""
+    theta = _ROTATION
+    R = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+    r1, r2 = _rotated(c1, R), _rotated(c2, R)
+    p2, p1, p0 = _in_y(r1)
+    q2, q1, q0 = _in_y(r2)
+    # Sylvester resultant of the two quadratics in y
+    s = _padd(p2 * q0, -q2 * p0)
+    resultant = _padd(_pmul(s, s), -_pmul(_padd(p2 * q1, -q2 * p1),
+                                          _padd(_pmul(p1, q0), -_pmul(q1, p0))))
+    xs = _real_roots(resultant)                                    # (N, 4)
+    # y from whichever constraint is quadratic (or linear) in y, both roots
+    points = []
+    for pa, pb, pc in ((p2, p1, p0), (q2, q1, q0)):
+        A2 = np.broadcast_to(pa, xs.shape)
+        B1, C0 = _peval(pb, xs), _peval(pc, xs)
+        ys = _real_roots(np.stack([C0, B1, A2], axis=-1).reshape(-1, 3)).reshape(xs.shape + (2,))
+        points.append(np.stack([np.broadcast_to(xs[..., None], ys.shape), ys], axis=-1))
+    P = np.concatenate(points, axis=2).reshape(len(xs), -1, 2)     # rotated frame
+    # Keep the points on both constraints (to be polished by Newton)
+    scale = (1.0 + np.nan_to_num(np.abs(P)).max(axis=-1)) ** 2
+    on = (np.abs(r1.value(P)) <= 1e-6 * r1.scale()[:, None] * scale) & \
+         (np.abs(r2.value(P)) <= 1e-6 * r2.scale()[:, None] * scale)
+    P = np.where(on[..., None], P, np.nan)
+    return P @ R.T
+
+
+# -- refinement and selection ---------------------------------------------
+def _polish(H, b, active, X, lam, steps=3):
+    """Newton steps on grad f + sum lam_i grad c_i = 0, c_i = 0 for the active constraints."""
+    m = len(active)
+    ok = np.isfinite(X).all(axis=-1)
+    if not m or not ok.any():
+        return X, lam
+    # Only the finite candidates, flattened to (M, ...)
+    n, k = np.nonzero(ok)
+    x = X[n, k]
+    lm = np.nan_to_num(lam[n, k], nan=0.0, posinf=0.0, neginf=0.0)
+    Hs, bs = H[n], b[n]
+    As = np.stack([c.A[n] for c in active], axis=1)                     # (M, m, 2, 2)
+    gs = np.stack([c.a[n] for c in active], axis=1)                     # (M, m, 2)
+    alphas = np.stack([c.alpha[n] for c in active], axis=1)             # (M, m)
+    eye = np.eye(2 + m)
+    for _ in range(steps):
+        Ax = (As @ x[:, None, :, None])[..., 0]                         # (M, m, 2)
+        grads = Ax + gs
+        W = Hs + np.sum(lm[:, :, None, None] * As, axis=1)
+        values = np.sum((0.5 * Ax + gs) * x[:, None], axis=-1) + alphas
+        F = np.concatenate([(Hs @ x[..., None])[..., 0] + bs
+                            + np.sum(lm[..., None] * grads, axis=1), values], axis=-1)
+        J = np.zeros((len(x), 2 + m, 2 + m))
+        J[:, :2, :2] = W
+        J[:, :2, 2:] = np.swapaxes(grads, -1, -2)
+        J[:, 2:, :2] = grads
+        good = np.abs(np.linalg.det(J)) > 1e-300
+        step = np.linalg.solve(np.where(good[:, None, None], J, eye),
+                               -np.where(good[:, None], F, 0.0)[..., None])[..., 0]
+        step = np.where(good[:, None] & np.isfinite(step), step, 0.0)
+        x = x + step[:, :2]
+        lm = lm + step[:, 2:]
+    X = np.full(X.shape, np.nan)
+    X[n, k] = x
+    lam = np.where(np.isfinite(lam), lam, 0.0)
+    lam[n, k] = lm
+    return X, lam
+
+
+def _select(f, usable, minimize):
+    key = np.where(usable, f if minimize else -f, np.inf)
+    best = np.argmin(key, axis=-1)
+    found = np.take_along_axis(usable, best[:, None], axis=-1)[:, 0]
+    return best, found
+
+
+def _certify(H, b, equalities, inequalities):
+    """Whether the minimum and the maximum are attained, per instance."""
+    n = len(H)
+    compact = np.zeros(n, dtype=bool)
+    for con in equalities:
+        w = np.linalg.eigvalsh(con.A)
+        compact |= (w[:, 0] > 0) | (w[:, 1] < 0)
+    for con in inequalities:
+        compact |= np.linalg.eigvalsh(con.A)[:, 0] > 0
+    has_min, has_max = compact.copy(), compact.copy()
+    if all(con.linear for con in (*equalities, *inequalities)):
+        # f on the affine set of the equalities, x = x0 + Z y
+        Z = np.broadcast_to(np.eye(2), (n, 2, 2))
+        if equalities:
+            normals = np.stack([con.a for con in equalities], axis=1)
+            _, s, Vt = np.linalg.svd(normals, full_matrices=True)
+            rank = np.sum(s > 1e-12 * s[:, :1], axis=-1)
+            if np.all(rank == rank[0]):
+                Z = np.swapaxes(Vt[:, rank[0]:], -1, -2)
+            else:
+                return has_min, has_max, has_min, has_max
+        if Z.shape[-1] == 0:
+            return np.ones(n, bool), np.ones(n, bool), np.zeros(n, bool), np.zeros(n, bool)
+        w = np.linalg.eigvalsh(np.einsum("nji,njk,nkl->nil", Z, H, Z))
+        tol = 1e-12 * (1.0 + np.abs(w).max(axis=-1))
+        has_min |= w[:, 0] > tol
+        has_max |= w[:, -1] < -tol
+        if not inequalities:
+            # A direction of negative (positive) curvature makes f unbounded
+            return has_min, has_max, w[:, 0] < -tol, w[:, -1] > tol
+    return has_min, has_max, np.zeros(n, bool), np.zeros(n, bool)
+
+
+def _solve(H, b, c, eqs, ineqs, tol):
+    """Best candidates of flat instances, as a dict of KKTResult fields."""
+    from itertools import combinations
+
+    N, n_eq = len(H), len(eqs)
+    Xs, LAMs, MUs = [], [], []
+    # Active sets: all equalities plus up to 2 - n_eq inequalities
+    for size in range(max(0, 2 - n_eq) + 1):
+        for extra in combinations(range(len(ineqs)), size):
+            active = eqs + [ineqs[i] for i in extra]
+            if not active:
+                X, lam = _interior(H, b), np.zeros((N, 1, 0))
+            elif len(active) == 1:
+                X, lam = (_one_linear if active[0].linear else _one_quadratic)(H, b, active[0])
+            else:
+                X, lam = _two(H, b, *active)
+            X, lam = _polish(H, b, active, X, lam)
+            mu = np.zeros(X.shape[:2] + (len(ineqs),))
+            for j, i in enumerate(extra):
+                mu[..., i] = lam[..., n_eq + j]
+            Xs.append(X)
+            LAMs.append(lam[..., :n_eq])
+            MUs.append(mu)
+
+    X = np.concatenate(Xs, axis=1)
+    lam = np.concatenate(LAMs, axis=1)
+    mu = np.concatenate(MUs, axis=1)
+    finite = np.isfinite(X).all(axis=-1)
+    x = np.where(finite[..., None], X, 0.0)
+    size = (1.0 + np.abs(x).max(axis=-1)) ** 2
+    feasible = finite.copy()
+    for con in eqs:
+        feasible &= np.abs(con.value(x)) <= tol * con.scale()[:, None] * size
+    for con in ineqs:
+        feasible &= con.value(x) <= tol * con.scale()[:, None] * size
+    f = 0.5 * np.einsum("nki,nij,nkj->nk", x, H, x) + np.sum(b[:, None] * x, axis=-1) + c[:, None]
+    # Inequality multipliers: NaN (LICQ fails) is accepted for both
+    sign_tol = 1e-7 * (1.0 + np.abs(np.nan_to_num(mu)).max(axis=-1, initial=0.0))
+    mu_min_ok = ~(np.nan_to_num(mu, nan=0.0) < -sign_tol[..., None]).any(axis=-1)
+    mu_max_ok = ~(np.nan_to_num(mu, nan=0.0) > sign_tol[..., None]).any(axis=-1)
+
+    has_min, has_max, unbounded_min, unbounded_max = _certify(H, b, eqs, ineqs)
+    out = {"candidates": feasible.sum(axis=-1)}
+    for name, ok, minimize, has, unbounded in (
+            ("min", mu_min_ok, True, has_min, unbounded_min),
+            ("max", mu_max_ok, False, has_max, unbounded_max)):
+        best, found = _select(f, feasible & ok, minimize)
+        take = best[:, None]
+        xb = np.where(found[:, None], np.take_along_axis(X, take[..., None], axis=1)[:, 0], np.nan)
+        fb = np.where(found, np.take_along_axis(f, take, axis=1)[:, 0], np.nan)
+        lb = np.take_along_axis(lam, take[..., None], axis=1)[:, 0]
+        mb = np.take_along_axis(mu, take[..., None], axis=1)[:, 0]
+        missing = (~found | unbounded)[:, None]
+        out[f"x_{name}"] = np.where(unbounded[:, None], np.nan, xb)
+        out[f"f_{name}"] = np.where(unbounded, -np.inf if minimize else np.inf, fb)
+        out[f"lam_{name}"] = np.where(missing, np.nan, lb)
+        out[f"mu_{name}"] = np.where(missing, np.nan, mb)
+        out[f"certified_{name}"] = (has & found) | unbounded
+    return out
+
+
+@traced("optimize")
+def solve_kkt(H, b, c=0.0, equalities=(), inequalities=(), tol=1e-9, chunk_size=65536):
+    """Global min and max of stacked 2-D quadratic problems (see module docstring).
+
+    ``H``, ``b``, ``c`` describe f = 1/2 x^T H x + b^T x + c, and each
+    constraint is a tuple (A, a, alpha) of the same form. All arrays
+    broadcast over leading batch dimensions; instances are solved
+    ``chunk_size`` at a time to bound memory. Returns a KKTResult.
+    """
+    if len(equalities) > 2:
+        raise ValueError("more than two equality constraints in 2-D")
+    H = np.asarray(H, dtype=float)
+    b = np.asarray(b, dtype=float)
+    c = np.asarray(c, dtype=float)
+    cons = [tuple(np.asarray(v, dtype=float) for v in con) for con in (*equalities, *inequalities)]
+    batch = np.broadcast_shapes(H.shape[:-2], b.shape[:-1], c.shape,
+                                *(s for A, a, alpha in cons
+                                  for s in (A.shape[:-2], a.shape[:-1], alpha.shape)))
+    N = int(np.prod(batch))
+
+    def flat(v, tail):
+        return np.broadcast_to(v, batch + tail).reshape((N,) + tail)
+
+    H, b, c = flat(0.5 * (H + np.swapaxes(H, -1, -2)), (2, 2)), flat(b, (2,)), flat(c, ())
+    cons = [(flat(0.5 * (A + np.swapaxes(A, -1, -2)), (2, 2)), flat(a, (2,)), flat(alpha, ()))
+            for A, a, alpha in cons]
+    n_eq = len(equalities)
+
+    parts = []
+    for start in range(0, N, chunk_size):
+        s = slice(start, start + chunk_size)
+        chunk = [_Quadratic(A[s], a[s], alpha[s]) for A, a, alpha in cons]
+        parts.append(_solve(H[s], b[s], c[s], chunk[:n_eq], chunk[n_eq:], tol))
+    out = {}
+    for name, value in parts[0].items():
+        value = np.concatenate([p[name] for p in parts])
+        out[name] = value.reshape(batch + value.shape[1:])
+    return KKTResult(**out)
+
+
+# -- problems and families ------------------------------------------------
+_traced = {}
+
+
+def _coefficients(fn, params=()):
+    """coefficient_function of fn(x, y, *params), traced with SymPy once per function."""
+    key = (fn, tuple(params))
+    if key not in _traced:
+        _traced[key] = _trace(fn, params)
+    return _traced[key]
+
+
+def _trace(fn, params):
+    import sympy as sp
+
+    from .quadratic import coefficient_function
+
+    x, y = sp.symbols("x y", real=True)
+    symbols = sp.symbols(" ".join(params), real=True) if params else ()
+    symbols = (symbols,) if isinstance(symbols, sp.Symbol) else tuple(symbols)
+    return coefficient_function(fn(x, y, *symbols), (x, y), symbols)
+
+
+def solve_problem(problem):
+    """Exact global min and max of an optlab.problems.Problem (2-D, quadratic),
+    recorded in the result store (optlab.store) when it is enabled."""
+    from .store import record
+
+    t0 = time.perf_counter()
+    res = solve_family_values(problem.objective, problem.equalities, problem.inequalities)
+    seconds = time.perf_counter() - t0
+    for name in ("minimum", "maximum"):
+        end = name[:3]
+        record(problem, name, getattr(res, f"x_{end}"), getattr(res, f"f_{end}"), solver="kkt",
+               multipliers={"lam": getattr(res, f"lam_{end}"), "mu": getattr(res, f"mu_{end}")},
+               stats={"certified": bool(getattr(res, f"certified_{end}")),
+                      "candidates": int(res.candidates)}, seconds=seconds)
+    return res
+
+
+def solve_family(family, values):
+    """Exact optima of a problems.Family for every value of its parameters.
+
+    ``family`` is a Family or its name and ``values`` maps parameter names
+    to arrays that broadcast together (missing names stay at their
+    defaults), as in optlab.sweep. The result has their broadcast shape.
+    """
+    from .problems import FAMILIES
+
+    if isinstance(family, str):
+        family = FAMILIES[family]
+    unknown = set(values) - set(family.params)
+    if unknown:
+        raise ValueError(f"{family.problem.name}: unknown parameters {sorted(unknown)}, "
+                         f"expected {family.params}")
+    arrays = [np.asarray(values.get(name, default), dtype=float)
+              for name, default in zip(family.params, family.defaults)]
+    return solve_family_values(family.problem.objective, family.equalities,
+                               family.inequalities, family.params, arrays)
+
+
+def solve_family_values(objective, equalities, inequalities, params=(), values=()):
+    H, b, c = _coefficients(objective)()
+    shape = np.broadcast_shapes(*(np.shape(v) for v in values))
+
+    def constraint(fn):
+        A, a, alpha = _coefficients(fn, params)(*values)
+        return (np.broadcast_to(A, shape + (2, 2)), np.broadcast_to(a, shape + (2,)),
+                np.broadcast_to(alpha, shape))
+
+    return solve_kkt(H, b, c, [constraint(fn) for fn in equalities],
+                     [constraint(fn) for fn in inequalities])
+
+
+def main(argv=None):
+    import argparse
+
+    from .problems import FAMILIES
+    from .sweep import _parse_value
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("problem", choices=sorted(FAMILIES))
+    parser.add_argument("values", nargs="*", metavar="NAME=VALUE",
+                        help="a number or start:stop:count; ranges are zipped")
+    parser.add_argument("--store", action="store_true",
+                        help="record the run in the result store (optlab.store)")
+    args = parser.parse_args(argv)
+
+    family = FAMILIES[args.problem]
+    values, spec = {}, {}
+    for item in args.values:
+        name, _, text = item.partition("=")
+        values[name] = _parse_value(text)
+        spec[name] = text
+
+    t0 = time.perf_counter()
+    res = solve_family(family, values)
+    seconds = time.perf_counter() - t0
+    count = res.f_min.size
+    if args.store:
+        from dataclasses import asdict
+
+        from .store import record
+
+        arrays = asdict(res)
+        arrays.update({f"param_{name}": np.asarray(v) for name, v in values.items()})
+        record(family.problem, "family", solver="kkt", params=spec, arrays=arrays,
+               stats={"instances": count,
+                      "uncertified_min": int((~res.certified_min).sum()),
+                      "uncertified_max": int((~res.certified_max).sum())},
+               seconds=seconds)
+    print(f"{args.problem}: {count} instances in {seconds:.2f} s, "
+          f"{int((~res.certified_min).sum())} minima and "
+          f"{int((~res.certified_max).sum())} maxima not certified")
+    for name in ("min", "max"):
+        x, f = getattr(res, f"x_{name}").reshape(-1, 2), getattr(res, f"f_{name}").reshape(-1)
+        print(f"{name} (last): x=({x[-1, 0]:.12g}, {x[-1, 1]:.12g})  f={f[-1]:.12g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Layered 2-D figures: a cached base raster with cheap overlays on top.
+
+The contour figures of Part A share an expensive base (contours, constraint
+curves, feasible set) and differ only in a title, a legend and a few
+markers. ``base_layer`` renders the base once per key and keeps the pixels
+and the axes geometry; ``compose`` draws an overlay on an empty, transparent
+axes with the same position and limits, blends it over the base and crops
+the result like ``savefig(bbox_inches="tight")``. N annotated variants of a
+figure therefore cost one base render plus N overlays.
+
+Layers are cached in memory (LRU) and, when OPTLAB_CACHE_DIR is set, as
+.npz files under layers/, so figure jobs in other processes reuse them. The
+key covers the caller's key, the figure size and dpi, the source file of
+the drawing function and the Matplotlib version. A stored layer also
+records the hashes of the optlab modules loaded when it was drawn (see
+optlab.manifest; problems.py included, since the base draws the problem's
+curves), and it is drawn again when any of them has changed.
+
+The labelled lines of the base are kept as undrawn stand-ins in the
+overlay axes, so ``ax.legend()`` lists them and places itself around them
+as it would on the full figure.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from . import settings
+from .trace import span
+
+MAX_LAYERS = 4
+_LINE_PROPS = ("color", "linewidth", "linestyle", "alpha", "solid_capstyle", "marker",
+               "markersize", "zorder", "label")
+
+
+@dataclass
+class Layer:
+    """Pixels and geometry of a rendered base figure."""
+    key: str
+    rgba: np.ndarray            # (height, width, 4) uint8, the whole figure
+    dpi: float
+    figsize: tuple
+    position: tuple             # axes (x0, y0, width, height) in figure coordinates
+    xlim: tuple
+    ylim: tuple
+    tight: tuple                # tight bounding box (x0, y0, x1, y1) in inches
+    lines: list = field(default_factory=list)   # [(x, y, props)] of labelled lines
+    sources: dict = field(default_factory=dict)  # {optlab module file: hash} when drawn
+
+
+_layers = OrderedDict()
+
+
+def _key(key, draw, figsize, dpi):
+    import inspect
+
+    import matplotlib
+
+    from .manifest import file_hash
+
+    digest = hashlib.sha1(repr((key, tuple(figsize), float(dpi))).encode())
+    digest.update(matplotlib.__version__.encode())
+    try:
+        digest.update(file_hash(inspect.getsourcefile(draw)).encode())
+    except (TypeError, OSError):
+        digest.update(getattr(draw, "__qualname__", repr(draw)).encode())
+    return digest.hexdigest()
+
+
+def _sources():
+    """Hashes of the optlab modules loaded so far, problems.py included."""
+    from .manifest import module_hashes, used_modules
+
+    return module_hashes(sorted(set(used_modules()) | {"problems.py"}))
+
+
+def _current(sources):
+    """Whether none of the modules recorded by _sources has changed since."""
+    from .manifest import module_hashes
+
+    return bool(sources) and module_hashes(sources) == sources
+
+
+def _path(key):
+    directory = settings.cache_dir()
+    if directory is None:
+        return None
+    directory = directory / "layers"
+    directory.mkdir(exist_ok=True)
+    return directory / f"{key}.npz"
+
+
+def _load(key):
+    path = _path(key)
+    if path is None or not path.exists():
+        return None
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        if not _current(meta.get("sources")):
+            return None
+        lines = [(data[f"x{i}"], data[f"y{i}"], props) for i, props in enumerate(meta.pop("lines"))]
+        return Layer(key=key, rgba=data["rgba"], lines=lines,
+                     **{k: tuple(v) if isinstance(v, list) else v for k, v in meta.items()})
+
+
+def _store(layer):
+    path = _path(layer.key)
+    if path is None:
+        return
+    meta = {"dpi": layer.dpi, "figsize": layer.figsize, "position": layer.position,
+            "xlim": layer.xlim, "ylim": layer.ylim, "tight": layer.tight,
+            "lines": [props for _, _, props in layer.lines], "sources": layer.sources}
+    arrays = {f"{c}{i}": v for i, (x, y, _) in enumerate(layer.lines)
+              for c, v in (("x", x), ("y", y))}
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez_compressed(tmp, rgba=layer.rgba, meta=json.dumps(meta), **arrays)
+    os.replace(tmp, path)
+
+
+def _render(key, draw, figsize, dpi):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.colors import to_rgba
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    draw(ax)
+    canvas.draw()
+    lines = []
+    for line in ax.get_lines():
+        if line.get_label().startswith("_"):
+            continue
+        props = {name: getattr(line, f"get_{name}")() for name in _LINE_PROPS}
+        props["color"] = list(to_rgba(props["color"]))
+        lines.append((np.asarray(line.get_xdata(), dtype=float),
+                      np.asarray(line.get_ydata(), dtype=float), props))
+    tight = fig.get_tightbbox(canvas.get_renderer())
+    return Layer(key=key, rgba=np.array(canvas.buffer_rgba()), dpi=float(dpi),
+                 figsize=tuple(figsize), position=tuple(ax.get_position().bounds),
+                 xlim=tuple(ax.get_xlim()), ylim=tuple(ax.get_ylim()),
+                 tight=(tight.x0, tight.y0, tight.x1, tight.y1), lines=lines,
+                 sources=_sources())
+
+
+def base_layer(key, draw, figsize=(8, 6), dpi=None):
+    """The base ``draw(ax)`` rendered once per ``key`` (a tuple of its inputs)."""
+    from .render import figure_dpi
+
+    dpi = figure_dpi() if dpi is None else dpi
+    digest = _key(key, draw, figsize, dpi)
+    layer = _layers.get(digest)
+    if layer is not None:
+        _layers.move_to_end(digest)
+        return layer
+    layer = _load(digest)
+    if layer is None:
+        with span("draw", part="base"):
+            layer = _render(digest, draw, figsize, dpi)
+        _store(layer)
+    _layers[digest] = layer
+    while len(_layers) > MAX_LAYERS:
+        _layers.popitem(last=False)
+    return layer
+
+
+def clear():
+    _layers.clear()
+
+
+def _stand_ins(ax, layer):
+    from matplotlib.lines import Line2D
+
+    for x, y, props in layer.lines:
+        # Animated artists are skipped by canvas.draw() but still count for
+        # the legend (entries and "best" placement)
+        ax.add_line(Line2D(x, y, animated=True, **props))
+
+
+def compose(layer, overlay, save_path=None):
+    """``overlay(ax)`` blended over ``layer``; the cropped RGBA image, also
+    written to ``save_path`` (PNG) when given."""
+    import matplotlib
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.transforms import Bbox
+
+    with span("draw", part="overlay"):
+        fig = Figure(figsize=layer.figsize, dpi=layer.dpi)
+        fig.patch.set_alpha(0.0)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_axes(layer.position)
+        ax.set_axis_off()
+        ax.set_xlim(layer.xlim)
+        ax.set_ylim(layer.ylim)
+        ax.set_autoscale_on(False)
+        _stand_ins(ax, layer)
+        overlay(ax)
+        canvas.draw()
+        top = np.asarray(canvas.buffer_rgba())
+        rgba = layer.rgba.copy()
+
+        # Straight (unpremultiplied) alpha over an opaque base, only in the
+        # rows and columns the overlay touched
+        covered = top[..., 3] > 0
+        rows = np.flatnonzero(covered.any(axis=1))
+        if rows.size:
+            cols = np.flatnonzero(covered[rows[0]:rows[-1] + 1].any(axis=0))
+            box = np.s_[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+            over, under = top[box], rgba[box]
+            alpha = over[..., 3:].astype(np.uint16)
+            under[..., :3] = (over[..., :3] * alpha + under[..., :3] * (255 - alpha) + 127) // 255
+
+        bbox = Bbox.union([Bbox.from_extents(*layer.tight),
+                           fig.get_tightbbox(canvas.get_renderer())])
+        image = _crop(rgba, bbox.padded(matplotlib.rcParams["savefig.pad_inches"]), layer.dpi)
+    if save_path is not None:
+        with span("encode"):
+            _write_png(save_path, image, layer.dpi)
+    return image
+
+
+def _crop(rgba, bbox, dpi):
+    """Pixels inside ``bbox`` (inches from the bottom left), padded with white.
+
+    Sized like savefig: the width and height in pixels are truncated and the
+    box is anchored at its bottom left corner.
+    """
+    height, width = rgba.shape[:2]
+    x0 = int(round(bbox.x0 * dpi))
+    x1 = x0 + int(bbox.width * dpi)
+    bottom = height - int(round(bbox.y0 * dpi))
+    top = bottom - int(bbox.height * dpi)
+    out = np.full((bottom - top, x1 - x0, 4), 255, dtype=np.uint8)
+    src = rgba[max(top, 0):min(bottom, height), max(x0, 0):min(x1, width)]
+    r, c = max(-top, 0), max(-x0, 0)
+    out[r:r + src.shape[0], c:c + src.shape[1]] = src
+    return out
+
+
+def _write_png(path, image, dpi):
+    from PIL import Image
+
+    Image.fromarray(image).save(path, format="png", dpi=(dpi, dpi))
+
+
+def layer_figure(draw, overlay, figsize=(8, 6)):
+    """A pyplot figure with the base drawn as vectors and the overlay on top
+    (for code that needs live axes, such as the trajectory animation)."""
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=figsize)
+    ax = fig.add_subplot(111)
+    draw(ax)
+    overlay(ax)
+    return fig
@@ -0,0 +1,162 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .trace import traced
+
+GOLD = 1.618033988749895        # golden ratio, bracket expansion factor
+CGOLD = 0.3819660112501051      # 2 - golden ratio, golden-section step
+ZEPS = 1e-300
+
+
+@dataclass
+class LineSearchResult:
+    """Minimizers of a batch of 1-D problems, one entry per instance."""
+    t: np.ndarray
+    f: np.ndarray
+    nfev: np.ndarray          # objective evaluations spent on each instance
+    converged: np.ndarray
+    iterations: int
+
+
+def _call(fun, t):
+    return np.asarray(fun(t), dtype=float) * np.ones_like(t)
+
+
+def bracket(fun, t0=0.0, t1=1.0, maxiter=60):
+    """Expand [t0, t1] downhill until a < b < c (or c < b < a) with f(b) below f(a), f(c).
+
+    ``fun`` maps an array of parameters to an array of values, so every
+    instance of the batch advances in lockstep. Returns (a, b, c, fb, ok, nfev);
+    ``ok`` is False where no bracket was found (e.g. unbounded below).
+    """
+    t0, t1 = np.broadcast_arrays(np.asarray(t0, dtype=float), np.asarray(t1, dtype=float))
+    a, b = t0.copy(), t1.copy()
+    fa, fb = _call(fun, a), _call(fun, b)
+    swap = fb > fa
+    a, b = np.where(swap, b, a), np.where(swap, a, b)
+    fa, fb = np.where(swap, fb, fa), np.where(swap, fa, fb)
+
+    c = b + GOLD * (b - a)
+    fc = _call(fun, c)
+    nfev = np.full(a.shape, 3)
+    active = fc < fb
+    for _ in range(maxiter):
+        if not active.any():
+            break
+        c_new = c + GOLD * (c - b)
+        fc_new = _call(fun, c_new)
+        a, fa = np.where(active, b, a), np.where(active, fb, fa)
+        b, fb = np.where(active, c, b), np.where(active, fc, fb)
+        c, fc = np.where(active, c_new, c), np.where(active, fc_new, fc)
+        nfev += active
+        active &= fc < fb
+    ok = ~active & np.isfinite(fb)
+    return a, b, c, fb, ok, nfev
+
+
+def brent(fun, a, b, x=None, fx=None, tol=1e-12, maxiter=200, derivative=None):
+    """Vectorized Brent minimization on the brackets [a, b].
+
+    Parabolic interpolation with golden-section fallback. When ``derivative``
+    is given (a callable returning (f', f'') at t), a Newton step is tried
+    first and kept only if it stays inside the bracket and shrinks faster
+    than the step before last.
+    """
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    a, b = np.minimum(a, b), np.maximum(a, b)
+    nfev = np.zeros(a.shape, dtype=int)
+    if x is None:
+        x = a + CGOLD * (b - a)
+        fx = _call(fun, x)
+        nfev += 1
+    x = np.broadcast_to(np.asarray(x, dtype=float), a.shape).copy()
+    fx = np.broadcast_to(np.asarray(fx, dtype=float), a.shape).copy()
+    w, v, fw, fv = x.copy(), x.copy(), fx.copy(), fx.copy()
+    d = np.zeros_like(x)
+    e = np.zeros_like(x)
+
+    active = np.ones(x.shape, dtype=bool)
+    it = 0
+    for it in range(1, maxiter + 1):
+        xm = 0.5 * (a + b)
+        tol1 = tol * np.abs(x) + ZEPS
+        tol2 = 2.0 * tol1
+        active &= np.abs(x - xm) > tol2 - 0.5 * (b - a)
+        if not active.any():
+            break
+
+        # Golden-section step, used wherever no interpolation step is accepted
+        e_gold = np.where(x >= xm, a - x, b - x)
+        d_new, e_new = CGOLD * e_gold, e_gold
+        taken = np.zeros(x.shape, dtype=bool)
+
+        if derivative is not None:
+            df, d2f = derivative(x)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                step = -df / d2f
+            u = x + step
+            ok = (d2f > 0) & (u > a) & (u < b) & (np.abs(step) < 0.5 * np.abs(e))
+            ok |= (d2f > 0) & (u > a) & (u < b) & (e == 0)
+            active &= ~((d2f > 0) & (np.abs(step) <= tol1))
+            d_new, e_new = np.where(ok, step, d_new), np.where(ok, d, e_new)
+            taken |= ok
+
+        # Parabolic interpolation through x, w, v
+        r = (x - w) * (fx - fv)
+        q = (x - v) * (fx - fw)
+        p = (x - v) * q - (x - w) * r
+        q = 2.0 * (q - r)
+        p = np.where(q > 0, -p, p)
+        q = np.abs(q)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = p / q
+        ok = (~taken & (np.abs(e) > tol1) & (np.abs(p) < np.abs(0.5 * q * e))
+              & (p > q * (a - x)) & (p < q * (b - x)))
+        u = x + step
+        near_end = (u - a < tol2) | (b - u < tol2)
+        step = np.where(near_end, np.copysign(tol1, xm - x), step)
+        d_new, e_new = np.where(ok, step, d_new), np.where(ok, d, e_new)
+
+        d = np.where(active, d_new, d)
+        e = np.where(active, e_new, e)
+        u = np.where(np.abs(d) >= tol1, x + d, x + np.copysign(tol1, d))
+        u = np.where(active, u, x)
+        fu = _call(fun, u)
+        nfev += active
+
+        better = active & (fu <= fx)
+        worse = active & ~better
+        a = np.where(better & (u >= x), x, np.where(worse & (u < x), u, a))
+        b = np.where(better & (u < x), x, np.where(worse & (u >= x), u, b))
+
+        to_w = worse & ((fu <= fw) | (w == x))
+        to_v = worse & ~to_w & ((fu <= fv) | (v == x) | (v == w))
+        v_new = np.where(better | to_w, w, np.where(to_v, u, v))
+        fv_new = np.where(better | to_w, fw, np.where(to_v, fu, fv))
+        w_new = np.where(better, x, np.where(to_w, u, w))
+        fw_new = np.where(better, fx, np.where(to_w, fu, fw))
+        x, fx = np.where(better, u, x), np.where(better, fu, fx)
+        v, fv, w, fw = v_new, fv_new, w_new, fw_new
+
+    return LineSearchResult(t=x, f=fx, nfev=nfev, converged=~active, iterations=it)
+
+
+@traced("optimize")
+def minimize_on_curve(f, curve, t0=0.0, t1=1.0, tol=1e-12, maxiter=200, derivative=None):
+    """Minimize f(*curve(t)) over the curve parameter t.
+
+    ``curve`` maps an array of parameters to coordinate arrays. Batches of
+    curves or objectives are solved in lockstep by letting ``curve`` and ``f``
+    broadcast over the batch shape of ``t0``.
+    """
+    def fun(t):
+        return f(*curve(t))
+
+    a, b, c, fb, ok, nfev = bracket(fun, t0, t1)
+    res = brent(fun, np.minimum(a, c), np.maximum(a, c), x=b, fx=fb,
+                tol=tol, maxiter=maxiter, derivative=derivative)
+    res.nfev = res.nfev + nfev
+    res.converged = res.converged & ok
+    return res
+
@@ -0,0 +1,80 @@
+"""Grid evaluation with about one output array of peak memory.
+
+The objective is never evaluated on dense meshgrid arrays. Quadratics are
+written into a preallocated ``out`` buffer in three in-place passes:
+
+    f = y * (2 q01 x) + (q00 x^2 + c0 x) + (q11 y^2 + c1 y + k)
+
+Only the first term needs a full-size product; the other two are a row and
+a column that broadcast. Any other objective is evaluated on broadcast
+(sparse) coordinates one block of rows at a time, so its temporaries are
+bounded by the block size instead of the grid size.
+"""
+import numpy as np
+
+# Elements per block for objectives without a fused kernel (8 MB in float64)
+BLOCK_ELEMENTS = 1 << 20
+
+
+def sparse_axes(x, y):
+    """Row x of shape (1, nx) and column y of shape (ny, 1), like meshgrid(sparse=True)."""
+    return np.asarray(x)[np.newaxis, :], np.asarray(y)[:, np.newaxis]
+
+
+def quadratic_into(quadratic, x, y, out):
+    """Fill out[j, i] with z^T Q z + c^T z + k at z = (x[i], y[j])."""
+    (q00, q01), (q10, q11) = quadratic[0]
+    c0, c1 = quadratic[1]
+    k = quadratic[2]
+    xr, yc = sparse_axes(x, y)
+    dtype = out.dtype
+
+    # Row and column terms are O(n); only the cross term touches out.
+    row = ((q00 * xr + c0) * xr).astype(dtype, copy=False)
+    col = ((q11 * yc + c1) * yc + k).astype(dtype, copy=False)
+    np.multiply(yc, ((q01 + q10) * xr).astype(dtype, copy=False), out=out)
+    np.add(out, row, out=out)
+    np.add(out, col, out=out)
+    return out
+
+
+def blocked_into(fn, x, y, out, block_elements=BLOCK_ELEMENTS):
+    """Fill out with fn on broadcast coordinates, a block of rows at a time."""
+    xr, yc = sparse_axes(x, y)
+    rows = max(1, block_elements // max(xr.shape[1], 1))
+    for start in range(0, yc.shape[0], rows):
+        stop = start + rows
+        out[start:stop] = fn(xr, yc[start:stop])
+    return out
+
+
+_checked = set()
+
+
+def _check_quadratic(problem):
+    """The fused kernel trusts problem.quadratic; make sure it matches the objective."""
+    key = problem.fingerprint()
+    if key in _checked:
+        return
+    pts = np.array([[0.0, 0.0], [1.0, -2.0], [-3.0, 0.5], [2.5, 4.0], [-1.5, -3.5], [0.7, 1.3]])
+    expected = problem.objective(pts[:, 0], pts[:, 1])
+    got = np.array([quadratic_into(problem.quadratic, p[:1], p[1:], np.empty((1, 1)))[0, 0]
+                    for p in pts])
+    if not np.allclose(got, expected, rtol=1e-12, atol=1e-12):
+        raise ValueError(f"{problem.name}: quadratic coefficients do not match the objective")
+    _checked.add(key)
+
+
+def evaluate(problem, x, y, dtype=None, out=None):
+    """Objective of ``problem`` on the grid x by y, written into ``out``.
+
+    ``out`` is allocated with shape (len(y), len(x)) when not given; its
+    dtype (float32 halves the memory) is used for the whole computation.
+    """
+    if out is None:
+        dtype = np.result_type(x, y) if dtype is None else dtype
+        out = np.empty((len(y), len(x)), dtype=dtype)
+    if problem.quadratic is not None:
+        _check_quadratic(problem)
+        return quadratic_into(problem.quadratic, x, y, out)
+    return blocked_into(problem.objective, x, y, out)
@@ -0,0 +1,154 @@
+"""Build manifest for incremental figure rendering.
+
+For every figure the manifest stores a hash of each input that can change
+the picture, and a hash of the file that was written. A job is skipped when
+all inputs are unchanged and the output on disk is still the one recorded:
+
+- script: source of the plotting script (grid sizes, styling, annotations)
+  and of the scripts it loads, e.g. for a shared base layer
+- problems: fingerprints, windows and feasible sets of the problems it uses
+- core: source of the optlab modules the job imported while rendering,
+  recorded after each render (lazy imports included), so new modules that
+  no figure uses never trigger rebuilds
+- render: figure arguments and the active quality preset
+- libraries: Python, NumPy, Matplotlib and SymPy versions
+"""
+import hashlib
+import inspect
+import json
+import os
+import platform
+import sys
+import types
+from dataclasses import asdict
+from importlib import metadata
+
+from . import settings
+
+MANIFEST_PATH = settings.REPO_ROOT / ".figure-manifest.json"
+
+# The build itself; problems.py is covered per problem by the "problems"
+# input instead. Every other optlab module a job imports is an input.
+_BUILD_MODULES = {"manifest.py", "pipeline.py", "problems.py"}
+_LIBRARIES = ("numpy", "matplotlib", "sympy")
+
+
+def _sha1(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    with open(path, "rb") as fh:
+        return hashlib.file_digest(fh, "sha1").hexdigest()
+
+
+def used_modules():
+    """File names of the optlab modules imported in this process so far.
+
+    Recorded after each render, so lazy imports are included. The process
+    has usually loaded other scripts too (job discovery loads them all,
+    and workers inherit that); the superset can only cause extra rebuilds,
+    never stale figures.
+    """
+    package = os.path.realpath(settings.SCRIPTS_DIR / "optlab")
+    names = set()
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and os.path.dirname(os.path.realpath(path)) == package:
+            names.add(os.path.basename(path))
+    return sorted(names - _BUILD_MODULES)
+
+
+def module_hashes(names):
+    """{file name: hash} of optlab modules; None for a module that is gone."""
+    package = settings.SCRIPTS_DIR / "optlab"
+    return {name: file_hash(package / name) if (package / name).exists() else None
+            for name in names}
+
+
+def library_hash():
+    versions = [f"python={platform.python_version()}"]
+    for name in _LIBRARIES:
+        try:
+            versions.append(f"{name}={metadata.version(name)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{name}=missing")
+    return _sha1(*versions)
+
+
+def problems_hash(module):
+    """Hash of every Problem a script module refers to at top level."""
+    from .problems import Problem
+
+    problems = {p.name: p for p in vars(module).values() if isinstance(p, Problem)}
+    parts = [inspect.getsource(Problem)]
+    for name in sorted(problems):
+        p = problems[name]
+        parts.append(f"{p.fingerprint()}|{p.bounds!r}|{p.feasible_set!r}")
+    return _sha1(*parts)
+
+
+def script_hash(path, module):
+    """Hash of a script and of the scripts it keeps as top-level modules."""
+    parts = [file_hash(path)]
+    for name, value in sorted(vars(module).items()):
+        source = getattr(value, "__file__", None) if isinstance(value, types.ModuleType) else None
+        if source and os.path.abspath(source).startswith(str(settings.SCRIPTS_DIR)) \
+                and f"{os.sep}optlab{os.sep}" not in source:
+            parts.append(f"{name}:{file_hash(source)}")
+    return parts[0] if len(parts) == 1 else _sha1(*parts)
+
+
+def job_inputs(job, module):
+    """Hashes of the inputs of one FigureJob, keyed by input kind."""
+    from .render import quality
+
+    return {
+        "script": script_hash(job.script, module),
+        "problems": problems_hash(module),
+        "render": _sha1(job.func, repr(job.args), os.path.basename(job.output),
+                        json.dumps(asdict(quality()), sort_keys=True)),
+        "libraries": library_hash(),
+    }
+
+
+class Manifest:
+    """Recorded inputs and outputs of the last successful build of each figure."""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as fh:
+                self.entries = json.load(fh)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def stale(self, job, inputs):
+        """Reasons ``job`` must be rebuilt; an empty list means it is up to date."""
+        entry = self.entries.get(job.name)
+        if entry is None:
+            return ["new"]
+        if not os.path.exists(job.output):
+            return ["output missing"]
+        reasons = [k for k, v in inputs.items() if entry["inputs"].get(k) != v]
+        core = entry.get("core")
+        if core is None or module_hashes(core) != core:
+            reasons.append("core")
+        if not reasons and file_hash(job.output) != entry["output"]:
+            reasons.append("output modified")
+        return reasons
+
+    def record(self, job, inputs, modules):
+        """Record a rendered job; ``modules`` are the used_modules() of its render."""
+        self.entries[job.name] = {"inputs": inputs, "core": module_hashes(modules),
+                                  "output": file_hash(job.output)}
+
+    def save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.entries, fh, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
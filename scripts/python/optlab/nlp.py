@@ -0,0 +1,379 @@
+"""Batched multi-start augmented Lagrangian solver for smooth constrained problems.
+
+    minimize f(x)  subject to  g_i(x) <= 0,  h_j(x) = 0
+
+f, g_i and h_j take one coordinate array per variable, like the problem
+definitions in optlab.problems (``f(x, y)``), followed by optional extra
+arguments. All starts advance in lockstep as one NumPy iteration: the
+inner problems are solved by batched BFGS with an Armijo backtracking line
+search, and the multipliers and penalties are updated per start (the
+Powell-Hestenes-Rockafellar method). Derivatives are central differences
+unless a gradient callable is given.
+
+The augmented Lagrangian only reaches the KKT conditions to about
+sqrt(tol), which in a curved valley leaves the copies of one optimum
+found from different starts far apart. Converged points are therefore
+polished by a few Newton steps on the KKT system of their active
+constraints before they are compared.
+
+Multipliers follow L = f + lam . h + mu . g with mu >= 0.
+"""
+import functools
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from .trace import traced
+
+
+@dataclass
+class NLPResult:
+    """One entry per start (or per distinct optimum after ``unique()``)."""
+    x: np.ndarray               # (m, n)
+    f: np.ndarray               # (m,)
+    lam: np.ndarray             # (m, n_eq) equality multipliers
+    mu: np.ndarray              # (m, n_ineq) inequality multipliers, >= 0
+    stationarity: np.ndarray    # ||grad L|| / (1 + ||grad f||)
+    feasibility: np.ndarray     # max(|h|, g+)
+    complementarity: np.ndarray # max |mu * g|
+    converged: np.ndarray
+    iterations: int             # outer iterations
+    count: np.ndarray = None    # starts that reached each point (after unique())
+
+    def take(self, index):
+        out = {}
+        for fl in fields(self):
+            v = getattr(self, fl.name)
+            out[fl.name] = v[index] if isinstance(v, np.ndarray) else v
+        return NLPResult(**out)
+
+    def unique(self, tol=1e-6):
+        """Distinct converged points, lowest f first, with how many starts found each."""
+        idx = np.flatnonzero(self.converged)
+        idx = idx[np.argsort(self.f[idx], kind="stable")]
+        reps, counts = [], []
+        scale = 1.0 + np.abs(self.x[idx]).max() if idx.size else 1.0
+        for i in idx:
+            for k, r in enumerate(reps):
+                if np.linalg.norm(self.x[i] - self.x[r]) <= tol * scale:
+                    counts[k] += 1
+                    break
+            else:
+                reps.append(i)
+                counts.append(1)
+        res = self.take(np.array(reps, dtype=int))
+        res.count = np.array(counts, dtype=int)
+        return res
+
+
+def _values(funcs, X, args):
+    """Stack [fn(*coords, *args)] to shape (len(funcs),) + batch."""
+    if not funcs:
+        return np.zeros((0,) + X.shape[:-1])
+    coords = np.moveaxis(X, -1, 0)
+    return np.stack([np.broadcast_to(fn(*coords, *args), X.shape[:-1]) for fn in funcs])
+
+
+def _jacobian(funcs, X, args, step):
+    """Central-difference Jacobian (len(funcs), m, n) with all 2n shifts in one call."""
+    n = X.shape[-1]
+    h = step * np.maximum(1.0, np.abs(X))                     # (m, n)
+    E = np.eye(n)[:, None, :] * h[None, :, :]                 # (n, m, n)
+    shifted = np.concatenate([X[None] + E, X[None] - E])      # (2n, m, n)
+    vals = _values(funcs, shifted, args)                      # (k, 2n, m)
+    diff = (vals[:, :n] - vals[:, n:]) / (2 * np.moveaxis(h, -1, 0))
+    return np.moveaxis(diff, 1, -1)
+
+
+class _Problem:
+    def __init__(self, f, inequalities, equalities, args, gradient, step):
+        self.f = f
+        self.g = tuple(inequalities)
+        self.h = tuple(equalities)
+        self.args = args
+        self.gradient = gradient
+        self.step = step
+
+    def subset(self, index):
+        """The same problem for the starts selected by ``index``."""
+        args = tuple(a[index] if a.ndim else a for a in self.args)
+        return _Problem(self.f, self.g, self.h, args, self.gradient, self.step)
+
+    def evaluate(self, X):
+        return (_values((self.f,), X, self.args)[0],
+                _values(self.g, X, self.args), _values(self.h, X, self.args))
+
+    def derivatives(self, X):
+        if self.gradient is not None:
+            coords = np.moveaxis(X, -1, 0)
+            gf = np.moveaxis(np.asarray(self.gradient(*coords, *self.args), dtype=float), 0, -1)
+            gf = np.broadcast_to(gf, X.shape)
+        else:
+            gf = _jacobian((self.f,), X, self.args, self.step)[0]
+        return gf, _jacobian(self.g, X, self.args, self.step), \
+            _jacobian(self.h, X, self.args, self.step)
+
+
+def _merit(f, g, h, lam, mu, rho):
+    """PHR augmented Lagrangian for the batch."""
+    val = f + np.sum(lam * h, axis=0) + 0.5 * rho * np.sum(h**2, axis=0)
+    shifted = np.maximum(0.0, mu + rho * g)
+    return val + np.sum(shifted**2 - mu**2, axis=0) / (2 * rho)
+
+
+def _merit_gradient(gf, Jg, Jh, g, h, lam, mu, rho):
+    out = gf + np.einsum("kmn,km->mn", Jh, lam + rho * h)
+    return out + np.einsum("kmn,km->mn", Jg, np.maximum(0.0, mu + rho * g))
+
+
+def _bfgs(prob, X, lam, mu, rho, tol, maxiter, max_step, callback=None):
+    """Minimize the augmented Lagrangian of every start (batched BFGS)."""
+    m, n = X.shape
+    Hinv = np.broadcast_to(np.eye(n), (m, n, n)).copy()
+    f, g, h = prob.evaluate(X)
+    L = _merit(f, g, h, lam, mu, rho)
+    G = _merit_gradient(*prob.derivatives(X), g, h, lam, mu, rho)
+    active = np.ones(m, dtype=bool)
+
+    for _ in range(maxiter):
+        active &= np.linalg.norm(G, axis=-1) > tol * (1.0 + np.abs(L))
+        if not active.any():
+            break
+        P = -np.einsum("mij,mj->mi", Hinv, G)
+        slope = np.einsum("mi,mi->m", G, P)
+        reset = slope >= 0
+        P[reset], slope[reset] = -G[reset], -np.sum(G[reset]**2, axis=-1)
+        Hinv[reset] = np.eye(n)
+
+        # Backtracking from a step capped relative to |x|
+        norm = np.linalg.norm(P, axis=-1)
+        t = np.minimum(1.0, max_step * (1.0 + np.linalg.norm(X, axis=-1)) / np.maximum(norm, 1e-300))
+        pending = active.copy()
+        Xn, Ln = X.copy(), L.copy()
+        fn, gn, hn = f.copy(), g.copy(), h.copy()
+        for _ in range(40):
+            if not pending.any():
+                break
+            Xt = X + t[:, None] * P
+            ft, gt, ht = prob.evaluate(Xt)
+            Lt = _merit(ft, gt, ht, lam, mu, rho)
+            # Strict decrease as well: at tiny steps the Armijo test passes on rounding
+            ok = pending & (Lt < L) & (Lt <= L + 1e-4 * t * slope)
+            Xn[ok], Ln[ok], fn[ok] = Xt[ok], Lt[ok], ft[ok]
+            gn[:, ok], hn[:, ok] = gt[:, ok], ht[:, ok]
+            pending &= ~ok
+            t = np.where(pending, 0.5 * t, t)
+        moved = active & ~pending
+        active &= moved
+
+        Gn = G.copy()
+        if moved.any():
+            Gn[moved] = _merit_gradient(*prob.subset(moved).derivatives(Xn[moved]), gn[:, moved],
+                                        hn[:, moved], lam[:, moved], mu[:, moved],
+                                        rho[moved])
+        S, Y = Xn - X, Gn - G
+        sy = np.einsum("mi,mi->m", S, Y)
+        upd = moved & (sy > 1e-12 * np.linalg.norm(S, axis=-1) * np.linalg.norm(Y, axis=-1))
+        if upd.any():
+            r = 1.0 / sy[upd]
+            V = np.eye(n) - r[:, None, None] * np.einsum("mi,mj->mij", S[upd], Y[upd])
+            Hinv[upd] = (np.einsum("mij,mjk,mlk->mil", V, Hinv[upd], V)
+                         + r[:, None, None] * np.einsum("mi,mj->mij", S[upd], S[upd]))
+        X, L, G, f, g, h = Xn, Ln, Gn, fn, gn, hn
+        if callback is not None:
+            callback(X)
+    return X
+
+
+@traced("optimize")
+def solve(f, x0, inequalities=(), equalities=(), args=(), gradient=None, tol=1e-8,
+          maxiter=40, inner_maxiter=200, rho0=10.0, max_step=1.0, fd_step=6e-6,
+          lam0=None, mu0=None, callback=None):
+    """Local solutions of min f s.t. g <= 0, h = 0 from every start in ``x0``.
+
+    ``x0`` has shape (m, n) for m starts in n variables. ``args`` are passed
+    after the coordinates to every function and broadcast against the m
+    starts, so each start can carry its own parameters. ``gradient``, if
+    given, returns the n partial derivatives of f. ``lam0`` (m, n_eq) and
+    ``mu0`` (m, n_ineq) warm-start the multipliers, e.g. from a nearby solve.
+    ``callback(index, X)``, if given, is called after every inner BFGS step
+    with the indices of the starts still iterating and their points.
+    """
+    X = np.array(x0, dtype=float, ndmin=2)
+    m = X.shape[0]
+    # Per-start arguments get a leading axis of length m so they can be subset
+    args = tuple(np.asarray(a, dtype=float) for a in args)
+    args = tuple(np.broadcast_to(a, (m,) + a.shape[1:]) if a.ndim else a for a in args)
+    prob = _Problem(f, inequalities, equalities, args, gradient, fd_step)
+
+    lam = np.zeros((len(prob.h), m))
+    mu = np.zeros((len(prob.g), m))
+    if lam0 is not None:
+        lam[:] = np.asarray(lam0, dtype=float).T
+    if mu0 is not None:
+        mu[:] = np.maximum(0.0, np.asarray(mu0, dtype=float).T)
+    rho = np.full(m, rho0)
+    f_val, g, h = prob.evaluate(X)
+    viol_prev = np.full(m, np.inf)
+    # Starts that meet the tolerances are frozen; only the rest keep iterating
+    todo = np.arange(m)
+    warm = lam0 is not None or mu0 is not None
+    if warm:
+        stationarity, feasibility, complementarity = _kkt(prob, X, f_val, g, h, lam, mu)
+        todo = todo[(np.maximum(stationarity, complementarity) >= np.sqrt(tol))
+                    | (feasibility >= tol)]
+    it = 0
+    while todo.size and it < maxiter:
+        it += 1
+        # Loose inner solves while the multipliers are still rough; warm
+        # multipliers are assumed close already
+        inner_tol = tol if warm else max(tol, 1e-2 / 10**it)
+        sub = prob.subset(todo)
+        lam_t, mu_t, rho_t = lam[:, todo], mu[:, todo], rho[todo]
+        step = None if callback is None else functools.partial(callback, todo)
+        Xt = _bfgs(sub, X[todo], lam_t, mu_t, rho_t, inner_tol, inner_maxiter, max_step, step)
+        ft, gt, ht = sub.evaluate(Xt)
+
+        viol = np.maximum(np.abs(ht).max(axis=0, initial=0.0),
+                          np.abs(np.maximum(gt, -mu_t / rho_t)).max(axis=0, initial=0.0))
+        lam_t = lam_t + rho_t * ht
+        mu_t = np.maximum(0.0, mu_t + rho_t * gt)
+        # Only raise the penalty while still infeasible; raising it on a
+        # rounding-level violation only makes the inner problem stiff
+        rho_t = np.where((viol > 0.25 * viol_prev[todo]) & (viol > tol),
+                         np.minimum(10 * rho_t, 1e8), rho_t)
+
+        X[todo], f_val[todo], g[:, todo], h[:, todo] = Xt, ft, gt, ht
+        lam[:, todo], mu[:, todo], rho[todo], viol_prev[todo] = lam_t, mu_t, rho_t, viol
+
+        res = _kkt(sub, Xt, ft, gt, ht, lam_t, mu_t)
+        todo = todo[(np.maximum.reduce(res) >= np.sqrt(tol)) | (viol >= tol)]
+
+    stationarity, feasibility, complementarity = _kkt(prob, X, f_val, g, h, lam, mu)
+    converged = (stationarity < np.sqrt(tol)) & (feasibility < np.sqrt(tol)) \
+        & (complementarity < np.sqrt(tol))
+    if converged.any():
+        idx = np.flatnonzero(converged)
+        sub = prob.subset(idx)
+        Xp, lam_p, mu_p = _polish(sub, X[idx], lam[:, idx], mu[:, idx], np.sqrt(tol))
+        X[idx], lam[:, idx], mu[:, idx] = Xp, lam_p, mu_p
+        f_val[idx], g[:, idx], h[:, idx] = sub.evaluate(Xp)
+        stationarity, feasibility, complementarity = _kkt(prob, X, f_val, g, h, lam, mu)
+    return NLPResult(x=X, f=f_val, lam=lam.T, mu=mu.T, stationarity=stationarity,
+                     feasibility=feasibility, complementarity=complementarity,
+                     converged=converged, iterations=it)
+
+
+def _kkt(prob, X, f, g, h, lam, mu):
+    gf, Jg, Jh = prob.derivatives(X)
+    grad_L = gf + np.einsum("kmn,km->mn", Jh, lam) + np.einsum("kmn,km->mn", Jg, mu)
+    stationarity = np.linalg.norm(grad_L, axis=-1) / (1.0 + np.linalg.norm(gf, axis=-1))
+    feasibility = np.maximum(np.abs(h).max(axis=0, initial=0.0),
+                             np.maximum(g, 0.0).max(axis=0, initial=0.0))
+    complementarity = np.abs(mu * g).max(axis=0, initial=0.0)
+    return stationarity, feasibility, complementarity
+
+
+def _kkt_error(prob, X, lam, mu):
+    f, g, h = prob.evaluate(X)
+    return np.maximum.reduce(_kkt(prob, X, f, g, h, lam, mu))
+
+
+def _polish(prob, X, lam, mu, active_tol, steps=3):
+    """Newton steps on the KKT conditions of the constraints active at X.
+
+    Equalities and the inequalities with mu > 0 or g > -active_tol are
+    held at zero; the other multipliers stay zero. The Hessian of the
+    Lagrangian comes from central differences of its gradient. A step is
+    kept only where it lowers the largest KKT residual and leaves mu >= 0,
+    so a wrong guess of the active set just leaves that point as it was.
+    """
+    m, n = X.shape
+    k_eq, k_in = lam.shape[0], mu.shape[0]
+    size = n + k_eq + k_in
+    error = _kkt_error(prob, X, lam, mu)
+    for _ in range(steps):
+        f, g, h = prob.evaluate(X)
+        gf, Jg, Jh = prob.derivatives(X)
+        active = (mu > 0) | (g > -active_tol)                   # (k_in, m)
+
+        def grad_L(Z):
+            gz, Jgz, Jhz = prob.derivatives(Z)
+            return gz + np.einsum("kmn,km->mn", Jhz, lam) + np.einsum("kmn,km->mn", Jgz, mu)
+
+        step = 1e-4 * np.maximum(1.0, np.abs(X))
+        W = np.empty((m, n, n))
+        for i in range(n):
+            E = np.zeros_like(X)
+            E[:, i] = step[:, i]
+            W[:, :, i] = (grad_L(X + E) - grad_L(X - E)) / (2 * step[:, i:i + 1])
+        W = 0.5 * (W + np.swapaxes(W, 1, 2))
+
+        # [[W, Jh^T, Jg^T], [Jh, 0, 0], [Jg, 0, 0]] with inactive rows of Jg
+        # replaced by d(mu_i) = 0
+        K = np.zeros((m, size, size))
+        K[:, :n, :n] = W
+        K[:, :n, n:n + k_eq] = np.moveaxis(Jh, 0, -1)
+        K[:, n:n + k_eq, :n] = np.moveaxis(Jh, 0, 1)
+        Jg_act = np.where(active[:, :, None], Jg, 0.0)
+        K[:, :n, n + k_eq:] = np.moveaxis(Jg_act, 0, -1)
+        K[:, n + k_eq:, :n] = np.moveaxis(Jg_act, 0, 1)
+        K[:, n + k_eq:, n + k_eq:] = np.eye(k_in) * (~active).T[:, None, :]
+        rhs = -np.concatenate([grad_L(X), h.T, np.where(active, g, 0.0).T], axis=-1)
+        d = np.einsum("mij,mj->mi", np.linalg.pinv(K, rcond=1e-12), rhs)
+
+        Xn = X + d[:, :n]
+        lam_n = lam + d[:, n:n + k_eq].T
+        mu_n = np.where(active, mu + d[:, n + k_eq:].T, 0.0)
+        error_n = _kkt_error(prob, Xn, lam_n, mu_n)
+        ok = (error_n < error) & np.all(mu_n >= 0, axis=0)
+        if not ok.any():
+            break
+        X, error = np.where(ok[:, None], Xn, X), np.where(ok, error_n, error)
+        lam, mu = np.where(ok, lam_n, lam), np.where(ok, mu_n, mu)
+    return X, lam, mu
+
+
+def sample_starts(bounds, count, seed=0):
+    """``count`` uniformly random starts in the box (xmin, xmax, ymin, ymax, ...)."""
+    lo = np.asarray(bounds[0::2], dtype=float)
+    hi = np.asarray(bounds[1::2], dtype=float)
+    return np.random.default_rng(seed).uniform(lo, hi, size=(count, len(lo)))
+
+
+def objective_gradient(problem, sign=1.0):
+    """Exact gradient of sign * objective from its fused kernel (optlab.kernels).
+
+    Extra solver arguments are accepted and ignored. Returns None, meaning
+    central differences, when the objective cannot be traced symbolically.
+    """
+    from .kernels import problem_kernel
+
+    try:
+        kernel = problem_kernel(problem, order=1)
+    except (TypeError, AttributeError):
+        return None
+
+    def gradient(x, y, *args):
+        return sign * kernel(x, y)[1]
+    return gradient
+
+
+def solve_problem(problem, starts=64, maximize=False, seed=0, **kwargs):
+    """Multi-start solve of an optlab.problems.Problem within its plotting window.
+
+    Returns the distinct converged points (see NLPResult.unique), best first.
+    With ``maximize`` the objective is negated for the solve and f is reported
+    for the original objective. The gradient of the objective is exact, from
+    objective_gradient, unless one is passed.
+    """
+    x0 = sample_starts(problem.bounds, starts, seed) if np.isscalar(starts) else starts
+    sign = -1.0 if maximize else 1.0
+    kwargs.setdefault("gradient", objective_gradient(problem, sign))
+
+    def objective(*z):
+        return sign * problem.objective(*z)
+
+    res = solve(objective, x0, problem.inequalities, problem.equalities, **kwargs).unique()
+    res.f = sign * res.f
+    return res
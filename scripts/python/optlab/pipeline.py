@@ -0,0 +1,174 @@
+"""Render every figure of the project in a process pool.
+
+Usage (from scripts/python):
+    python -m optlab.pipeline [--workers N] [--quality draft|report]
+                              [--only PATTERN] [--force] [--list]
+
+Figures whose inputs are unchanged since the last build are skipped (see
+optlab.manifest); --force renders them anyway.
+"""
+import argparse
+import fnmatch
+import importlib.util
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from . import settings, trace
+from .manifest import Manifest, job_inputs, used_modules
+from .render import QUALITY_PRESETS
+
+# Scripts that define FIGURES, relative to scripts/python
+FIGURE_SCRIPTS = (
+    "partA/func*/plot_*.py",
+    "partB/plot_points.py",
+)
+
+
+@dataclass(frozen=True)
+class FigureJob:
+    """One figure: ``func(*args, output)`` from the script at ``script``."""
+    name: str
+    script: str
+    func: str
+    args: tuple
+    output: str
+
+
+def figure_jobs(script, out_dir, figures, prefix):
+    """Jobs for a script's FIGURES mapping {file name: (renderer, args)}."""
+    return [
+        FigureJob(name=f"{prefix}/{fname}", script=os.path.abspath(script),
+                  func=fn.__name__, args=tuple(args),
+                  output=os.path.join(out_dir, fname))
+        for fname, (fn, args) in figures.items()
+    ]
+
+
+_modules = {}
+
+
+def load_script(path):
+    """Import a script by path once per process."""
+    module = _modules.get(path)
+    if module is None:
+        name = "optlab_script_" + os.path.relpath(path, settings.SCRIPTS_DIR) \
+            .replace(os.sep, "_").removesuffix(".py")
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[path] = module
+    return module
+
+
+def discover_jobs():
+    jobs = []
+    for pattern in FIGURE_SCRIPTS:
+        for path in sorted(settings.SCRIPTS_DIR.glob(pattern)):
+            module = load_script(str(path))
+            if hasattr(module, "figure_jobs"):
+                jobs.extend(module.figure_jobs())
+    return jobs
+
+
+def _init_worker():
+    os.environ["MPLBACKEND"] = "Agg"
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def run_job(job):
+    """Render one figure; returns (name, seconds, pid, trace events, optlab modules used)."""
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(job.output), exist_ok=True)
+    module = load_script(job.script)
+    with trace.span("figure", job=job.name):
+        getattr(module, job.func)(*job.args, job.output)
+    return job.name, time.perf_counter() - start, os.getpid(), trace.drain(), used_modules()
+
+
+def run_jobs(jobs, workers=None, done=None):
+    """Render ``jobs`` in a process pool and return {name: seconds}.
+
+    ``done(job, modules)`` is called in this process after each figure is
+    written, with the optlab modules its render imported.
+    """
+    workers = workers or os.cpu_count() or 1
+    timings = {}
+    if workers == 1:
+        _init_worker()
+        for job in jobs:
+            name, seconds, _, events, modules = run_job(job)
+            trace.extend(events)
+            timings[name] = seconds
+            print(f"[{seconds:7.2f}s] {name}")
+            if done:
+                done(job, modules)
+        return timings
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(run_job, job): job for job in jobs}
+        for fut in as_completed(futures):
+            name, seconds, pid, events, modules = fut.result()
+            trace.extend(events)
+            timings[name] = seconds
+            print(f"[{seconds:7.2f}s] {name} (pid {pid})")
+            if done:
+                done(futures[fut], modules)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument("--only", action="append", default=[],
+                        help="glob on job names, e.g. 'func1/*' (repeatable)")
+    parser.add_argument("--quality", choices=sorted(QUALITY_PRESETS), default=None,
+                        help="rendering preset (default: $OPTLAB_QUALITY or report)")
+    parser.add_argument("--force", action="store_true",
+                        help="render every selected figure, even if up to date")
+    parser.add_argument("--list", action="store_true", help="list jobs and exit")
+    args = parser.parse_args(argv)
+    if args.quality:
+        # Inherited by the worker processes
+        os.environ["OPTLAB_QUALITY"] = args.quality
+
+    _init_worker()
+    jobs = discover_jobs()
+    if args.only:
+        jobs = [j for j in jobs if any(fnmatch.fnmatch(j.name, p) for p in args.only)]
+
+    if args.list:
+        for job in jobs:
+            print(f"{job.name:40s} {os.path.relpath(job.output, settings.REPO_ROOT)}")
+        return
+
+    manifest = Manifest()
+    inputs = {job.name: job_inputs(job, load_script(job.script)) for job in jobs}
+    todo = []
+    for job in jobs:
+        reasons = ["forced"] if args.force else manifest.stale(job, inputs[job.name])
+        if reasons:
+            todo.append(job)
+            print(f"[rebuild] {job.name} ({', '.join(reasons)})")
+        else:
+            print(f"[skip]    {job.name}")
+    skipped = len(jobs) - len(todo)
+
+    def done(job, modules):
+        manifest.record(job, inputs[job.name], modules)
+
+    start = time.perf_counter()
+    try:
+        timings = run_jobs(todo, args.workers, done=done)
+    finally:
+        manifest.save()
+    wall = time.perf_counter() - start
+    print(f"\n{len(timings)} figures rebuilt, {skipped} up to date; {wall:.2f}s wall, "
+          f"{sum(timings.values()):.2f}s summed over jobs")
+
+
+if __name__ == "__main__":
+    main()
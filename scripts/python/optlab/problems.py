@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .geometry import Circle, HalfPlane, Intersection, Line
+from .trace import span
+
+
+@dataclass(frozen=True)
+class Problem:
+    """Objective, constraints and plotting window of one 2-D problem."""
+    name: str
+    objective: object
+    inequalities: tuple = ()     # g(x, y) <= 0
+    equalities: tuple = ()       # h(x, y) = 0
+    bounds: tuple = (-2.0, 2.0, -2.0, 2.0)   # (x_min, x_max, y_min, y_max)
+    tol: float = 0.05            # band |h| < tol used to draw equalities on a grid
+    quadratic: tuple = None      # (Q, c, k) with f = z^T Q z + c^T z + k, if quadratic
+    feasible_set: object = None  # analytic feasible set from optlab.geometry
+
+    def constraints(self, X, Y):
+        with span("mask", problem=self.name):
+            g = [gi(X, Y) for gi in self.inequalities]
+            h = [hi(X, Y) for hi in self.equalities]
+            feasible = np.ones(np.broadcast(X, Y).shape, dtype=bool)
+            for gi in g:
+                feasible &= gi <= 0
+            for hi in h:
+                feasible &= np.abs(hi) < self.tol
+        return g, h, feasible
+
+    def fingerprint(self):
+        """Stable hash of the definitions, used as a cache key across runs."""
+        import hashlib
+        import inspect
+
+        digest = hashlib.sha1(f"{self.name}|{self.tol!r}|{self.quadratic!r}".encode())
+        for fn in (self.objective, *self.inequalities, *self.equalities):
+            digest.update(inspect.getsource(fn).encode())
+        return digest.hexdigest()
+
+    def feasible_path(self, density=200.0):
+        """Exactly sampled feasible set inside the window, as one (x, y) path."""
+        return self.feasible_set.sample(density, bounds=self.bounds)
+
+
+@dataclass(frozen=True)
+class Family:
+    """A Problem whose constraint constants are parameters (see optlab.sweep).
+
+    The constraints take (x, y, *params); at ``defaults`` they are the
+    constraints of ``problem``.
+    """
+    problem: Problem
+    params: tuple                # parameter names
+    defaults: tuple
+    inequalities: tuple = ()     # g(x, y, *params) <= 0
+    equalities: tuple = ()       # h(x, y, *params) = 0
+
+
+# FUNC1
+# f(x,y) = 2x^2 + y^2 - 2xy - 3x - 2y
+# y - x <= 0        (g1)
+# x^2 + y^2 - 1 = 0 (circle boundary)
+def func1_objective(x, y):
+    return 2*x**2 + y**2 - 2*x*y - 3*x - 2*y
+
+
+def func1_g1(x, y):
+    return y - x
+
+
+def func1_h1(x, y):
+    return x**2 + y**2 - 1
+
+
+# FUNC2
+# f(x, y) = 4x^2 + 3y^2 - 5xy - 8x
+# x + y = 4
+def func2_objective(x, y):
+    return 4*x**2 + 3*y**2 - 5*x*y - 8*x
+
+
+def func2_h1(x, y):
+    return x + y - 4
+
+
+# FUNC3
+# f(x, y) = 9x^2 + 13y^2 + 18xy - 4
+# (x+1)^2 + y^2 = 17
+def func3_objective(x, y):
+    return 9*x**2 + 13*y**2 + 18*x*y - 4
+
+
+def func3_h1(x, y):
+    return (x + 1)**2 + y**2 - 17
+
+
+FUNC1 = Problem(
+    name="func1",
+    objective=func1_objective,
+    inequalities=(func1_g1,),
+    equalities=(func1_h1,),
+    bounds=(-2.0, 2.0, -2.0, 2.0),
+    tol=0.02,
+    quadratic=(((2.0, -1.0), (-1.0, 1.0)), (-3.0, -2.0), 0.0),
+    feasible_set=Intersection(Circle((0.0, 0.0), 1.0), HalfPlane((-1.0, 1.0), 0.0)),
+)
+
+FUNC2 = Problem(
+    name="func2",
+    objective=func2_objective,
+    equalities=(func2_h1,),
+    bounds=(-2.0, 6.0, -2.0, 6.0),
+    tol=0.05,
+    quadratic=(((4.0, -2.5), (-2.5, 3.0)), (-8.0, 0.0), 0.0),
+    feasible_set=Line((1.0, 1.0), -4.0),
+)
+
+FUNC3 = Problem(
+    name="func3",
+    objective=func3_objective,
+    equalities=(func3_h1,),
+    bounds=(-10.0, 10.0, -10.0, 10.0),
+    tol=0.05,
+    quadratic=(((9.0, 9.0), (9.0, 13.0)), (0.0, 0.0), -4.0),
+    feasible_set=Circle((-1.0, 0.0), np.sqrt(17)),
+)
+
+PROBLEMS = {p.name: p for p in (FUNC1, FUNC2, FUNC3)}
+
+
+# Parametric families: func1 on a circle of any radius, func2 on x + y = rhs,
+# func3 on a circle of radius^2 radius_sq centered at (center, 0)
+def func1_g1_family(x, y, radius):
+    return y - x
+
+
+def func1_h1_family(x, y, radius):
+    return x**2 + y**2 - radius**2
+
+
+def func2_h1_family(x, y, rhs):
+    return x + y - rhs
+
+
+def func3_h1_family(x, y, center, radius_sq):
+    return (x - center)**2 + y**2 - radius_sq
+
+
+FAMILIES = {f.problem.name: f for f in (
+    Family(FUNC1, ("radius",), (1.0,), inequalities=(func1_g1_family,),
+           equalities=(func1_h1_family,)),
+    Family(FUNC2, ("rhs",), (4.0,), equalities=(func2_h1_family,)),
+    Family(FUNC3, ("center", "radius_sq"), (-1.0, 17.0), equalities=(func3_h1_family,)),
+)}
@@ -0,0 +1,235 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .trace import traced
+
+LOCAL_MIN = "Local Minimum"
+LOCAL_MAX = "Local Maximum"
+SADDLE = "Saddle Point"
+DEGENERATE = "Degenerate / Inflection"
+
+
+@dataclass
+class QuadraticAnalysis:
+    """Stationary points of f = 1/2 x^T H x + b^T x + c, one entry per function."""
+    points: np.ndarray          # (..., n), NaN where there is no stationary point
+    values: np.ndarray          # f at the stationary point
+    classification: np.ndarray  # labels from classify_hessians
+    unique: np.ndarray          # False where there is no unique stationary point
+    degenerate: np.ndarray      # True where H is singular and the stationary points form an
+                                # affine set; points holds its least-norm point
+
+
+def _monomial(term, index, symbols):
+    """(coefficient, variable indices) of a product term, or None if it is not one."""
+    import sympy as sp
+
+    coeff, variables = sp.S.One, []
+    for factor in sp.Mul.make_args(term):
+        base, exp = factor.as_base_exp()
+        if base in index and exp.is_Integer and exp > 0:
+            variables += [index[base]] * int(exp)
+        elif factor.free_symbols & symbols:
+            return None
+        else:
+            coeff *= factor
+    return coeff, variables
+
+
+def _monomials(terms, index):
+    """(coefficient, variable indices) of every term, or None unless all have degree <= 2."""
+    names = set(index)
+    out = []
+    for term in terms:
+        mono = _monomial(term, index, names)
+        if mono is None or len(mono[1]) > 2:
+            return None
+        out.append(mono)
+    return out
+
+
+def quadratic_terms(expr, symbols):
+    """The terms of a quadratic as (coefficient, variable indices), or None.
+
+    The terms are read one at a time. sp.expand is called only when they
+    are not all monomials already. sp.Poly and sp.expand get very slow, or
+    run out of memory, with hundreds of variables.
+    """
+    import sympy as sp
+
+    index = {s: i for i, s in enumerate(symbols)}
+    expr = sp.sympify(expr)
+    terms = _monomials(sp.Add.make_args(expr), index)
+    if terms is None:
+        expanded = sp.expand(expr)
+        if expanded != expr:
+            terms = _monomials(sp.Add.make_args(expanded), index)
+    return terms
+
+
+def _coefficient_exprs(expr, symbols):
+    """Symbolic (H, b, c) of a quadratic, or None if expr is not one."""
+    terms = quadratic_terms(expr, symbols)
+    if terms is None:
+        return None
+    n = len(symbols)
+    H = [[0] * n for _ in range(n)]
+    b = [0] * n
+    c = 0
+    for coeff, variables in terms:
+        if not variables:
+            c += coeff
+        elif len(variables) == 1:
+            b[variables[0]] += coeff
+        else:
+            j, k = sorted(variables)
+            # x_j^2 carries H_jj / 2, x_j x_k carries H_jk
+            if j == k:
+                H[j][j] += 2 * coeff
+            else:
+                H[j][k] += coeff
+                H[k][j] += coeff
+    return H, b, c
+
+
+@traced("symbolic")
+def quadratic_coefficients(expr, symbols):
+    """Numeric (H, b, c) with f = 1/2 x^T H x + b^T x + c, or None.
+
+    Returns None for anything that is not a polynomial of total degree <= 2
+    with numeric coefficients, so callers can fall back to sympy.solve.
+    """
+    coeffs = _coefficient_exprs(expr, symbols)
+    if coeffs is None:
+        return None
+    H, b, c = coeffs
+    try:
+        return (np.array(H, dtype=float), np.array(b, dtype=float), float(c))
+    except TypeError:
+        return None
+
+
+def coefficient_function(expr, symbols, params):
+    """Compile the (H, b, c) of a parametric quadratic family once.
+
+    The returned callable takes one array per parameter symbol and returns
+    the stacked (H, b, c) for every parameter value, ready for
+    analyze_quadratics.
+    """
+    import sympy as sp
+
+    coeffs = _coefficient_exprs(expr, symbols)
+    if coeffs is None:
+        raise ValueError(f"not a quadratic in {symbols}: {expr}")
+    H, b, c = coeffs
+    flat = [e for row in H for e in row] + list(b) + [c]
+    compiled = sp.lambdify(params, flat, "numpy")
+    n = len(symbols)
+
+    def evaluate(*values):
+        shape = np.broadcast(*values).shape if values else ()
+        out = [np.broadcast_to(np.asarray(v, dtype=float), shape)
+               for v in compiled(*values)]
+        H = np.stack(out[:n * n], axis=-1).reshape(shape + (n, n))
+        b = np.stack(out[n * n:n * n + n], axis=-1)
+        return H, b, out[-1]
+
+    return evaluate
+
+
+def inertia(eigenvalues, rtol=1e-12, atol=0.0):
+    """Counts (positive, negative, zero) of stacked eigenvalue vectors, shape (..., 3).
+
+    Eigenvalues within max(atol, rtol * largest |eigenvalue|) of zero count
+    as zero.
+    """
+    w = np.asarray(eigenvalues, dtype=float)
+    tol = np.maximum(atol, rtol * np.abs(w).max(axis=-1, initial=0.0))[..., None]
+    pos = np.count_nonzero(w > tol, axis=-1)
+    neg = np.count_nonzero(w < -tol, axis=-1)
+    return np.stack([pos, neg, w.shape[-1] - pos - neg], axis=-1)
+
+
+def classify_inertia(counts):
+    """Second-derivative test from Hessian inertia (see inertia)."""
+    counts = np.asarray(counts)
+    pos, neg, zero = counts[..., 0], counts[..., 1], counts[..., 2]
+    return np.select(
+        [(neg == 0) & (zero == 0), (pos == 0) & (zero == 0), (pos > 0) & (neg > 0)],
+        [LOCAL_MIN, LOCAL_MAX, SADDLE],
+        default=DEGENERATE,
+    )
+
+
+def classify_hessians(H, rtol=1e-12, atol=0.0):
+    """Second-derivative test for stacked n x n symmetric Hessians.
+
+    One batched eigvalsh call gives the inertia of every matrix: all
+    eigenvalues positive is a minimum, all negative a maximum, both signs a
+    saddle, and anything else (a zero eigenvalue without both signs) is
+    degenerate.
+    """
+    return classify_inertia(inertia(np.linalg.eigvalsh(np.asarray(H, dtype=float)), rtol, atol))
+
+
+def stationary_points(H, b, rtol=1e-12):
+    """Solve H x = -b for a stack of quadratics with one batched call.
+
+    Returns (x, unique); x is NaN where H is singular, i.e. where there is
+    either no stationary point or a whole affine set of them.
+    """
+    H = np.asarray(H, dtype=float)
+    b = np.asarray(b, dtype=float)
+    s = np.linalg.svd(H, compute_uv=False)
+    unique = s[..., -1] > rtol * s[..., 0]
+    eye = np.broadcast_to(np.eye(H.shape[-1]), H.shape)
+    H_safe = np.where(unique[..., None, None], H, eye)
+    x = np.linalg.solve(H_safe, -b[..., None])[..., 0] + 0.0   # + 0.0 drops -0.0
+    x = np.where(unique[..., None], x, np.nan)
+    return x, unique
+
+
+def stationary_sets(H, b, rtol=1e-12):
+    """Least-norm solutions of H x = -b for stacked singular quadratics.
+
+    Returns (x, consistent). Where the system is consistent, the stationary
+    points are the affine set x + null(H) (see null_directions); elsewhere
+    the gradient never vanishes and x is NaN.
+    """
+    H = np.asarray(H, dtype=float)
+    b = np.asarray(b, dtype=float)
+    w, V = np.linalg.eigh(H)
+    scale = np.abs(w).max(axis=-1, keepdims=True)
+    inverse = np.where(np.abs(w) > rtol * scale, 1.0 / np.where(w == 0, 1.0, w), 0.0)
+    Vb = np.einsum("...ji,...j->...i", V, b)
+    x = -np.einsum("...ij,...j->...i", V, inverse * Vb) + 0.0
+    # Residual test: the part of b in the null space of H
+    residual = np.linalg.norm(np.einsum("...ij,...j->...i", H, x) + b, axis=-1)
+    size = np.linalg.norm(b, axis=-1) + scale[..., 0] * np.linalg.norm(x, axis=-1)
+    consistent = residual <= np.sqrt(rtol) * size
+    return np.where(consistent[..., None], x, np.nan), consistent
+
+
+def null_directions(H, rtol=1e-12):
+    """Orthonormal rows spanning the null space of one symmetric H."""
+    w, V = np.linalg.eigh(np.asarray(H, dtype=float))
+    return V[:, np.abs(w) <= rtol * np.abs(w).max(initial=0.0)].T
+
+
+@traced("symbolic")
+def analyze_quadratics(H, b, c):
+    """Stationary points, values and classification of stacked quadratics."""
+    H = np.asarray(H, dtype=float)
+    b = np.asarray(b, dtype=float)
+    x, unique = stationary_points(H, b)
+    degenerate = np.zeros(unique.shape, dtype=bool)
+    if not unique.all():
+        singular = ~unique
+        x_set, consistent = stationary_sets(H[singular], b[singular])
+        x[singular] = x_set
+        degenerate[singular] = consistent
+    # At H x = -b the value is c + 1/2 b^T x (the same on a whole stationary set)
+    values = np.asarray(c, dtype=float) + 0.5 * np.sum(b * x, axis=-1)
+    return QuadraticAnalysis(points=x, values=values, classification=classify_hessians(H),
+                             unique=unique, degenerate=degenerate)
@@ -0,0 +1,85 @@
+"""Quality presets and level-of-detail helpers for the figure scripts.
+
+The preset is taken from OPTLAB_QUALITY ("report" by default, or "draft");
+``python -m optlab.pipeline --quality draft`` sets it for every worker.
+"""
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Quality:
+    dpi: int
+    facet_px: float        # smallest surface facet edge, in output pixels
+    min_count: int         # bounds on surface facets per axis
+    max_count: int
+    curvature_tol: float   # allowed facet error as a fraction of the value range
+    rasterize: bool        # rasterize heavy artists (matters for PDF/SVG output)
+
+
+QUALITY_PRESETS = {
+    # Today's output: 300 dpi and matplotlib's default 50x50 surface facets
+    "report": Quality(dpi=300, facet_px=0.0, min_count=50, max_count=50,
+                      curvature_tol=0.0, rasterize=True),
+    "draft": Quality(dpi=100, facet_px=12.0, min_count=8, max_count=40,
+                     curvature_tol=0.005, rasterize=True),
+}
+
+
+def quality(name=None):
+    name = name or os.environ.get("OPTLAB_QUALITY", "report")
+    try:
+        return QUALITY_PRESETS[name]
+    except KeyError:
+        raise ValueError(f"unknown quality preset {name!r}; "
+                         f"choose from {sorted(QUALITY_PRESETS)}") from None
+
+
+def figure_dpi(name=None):
+    return quality(name).dpi
+
+
+def _curvature_count(F, tol):
+    """Facets per axis keeping the linear-interpolation error below tol * range(F).
+
+    A facet of width h on a surface with second difference d2 is off by about
+    d2 * h^2 / 8, so h = sqrt(8 tol range / d2) in grid steps.
+    """
+    F = np.asarray(F, dtype=float)
+    span = float(np.nanmax(F) - np.nanmin(F))
+    if span == 0 or tol <= 0:
+        return None
+    counts = []
+    for axis in (0, 1):
+        d2 = np.abs(np.diff(F, n=2, axis=axis))
+        peak = float(np.nanmax(d2)) if d2.size else 0.0
+        if peak == 0:
+            counts.append(1)
+            continue
+        step = np.sqrt(8 * tol * span / peak)
+        counts.append(int(np.ceil(F.shape[1 - axis] / step)))
+    return max(counts)
+
+
+def surface_counts(ax, F, q):
+    """Facet counts (rcount, ccount) for the axes' size in pixels and F's curvature."""
+    if q.min_count == q.max_count:
+        return q.min_count, q.min_count
+    bbox = ax.get_window_extent()
+    pixels = max(bbox.width, bbox.height) * q.dpi / ax.figure.dpi
+    count = pixels / q.facet_px
+    curv = _curvature_count(F, q.curvature_tol)
+    if curv is not None:
+        count = min(count, curv)
+    count = int(np.clip(count, q.min_count, q.max_count))
+    return min(count, F.shape[0]), min(count, F.shape[1])
+
+
+def plot_surface_lod(ax, X, Y, F, quality_name=None, **kwargs):
+    """ax.plot_surface with the facet count and rasterization of the preset."""
+    q = quality(quality_name)
+    rcount, ccount = surface_counts(ax, F, q)
+    return ax.plot_surface(X, Y, F, rcount=rcount, ccount=ccount,
+                           rasterized=q.rasterize, **kwargs)
@@ -0,0 +1,30 @@
+import os
+from pathlib import Path
+
+
+# Root of the on-disk caches. Disk caching is off unless OPTLAB_CACHE_DIR is set.
+def cache_dir():
+    path = os.environ.get("OPTLAB_CACHE_DIR", "").strip()
+    if not path:
+        return None
+    path = Path(path).expanduser()
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# Result store (optlab.store): OPTLAB_RESULTS, else results.sqlite in the
+# cache directory. Recording is off when neither is set.
+def results_path():
+    path = os.environ.get("OPTLAB_RESULTS", "").strip()
+    if path:
+        path = Path(path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+    directory = cache_dir()
+    return None if directory is None else directory / "results.sqlite"
+
+
+# Repository layout (scripts/python/optlab/settings.py -> repository root)
+REPO_ROOT = Path(__file__).resolve().parents[3]
+SCRIPTS_DIR = REPO_ROOT / "scripts" / "python"
+FIGURES_DIR = REPO_ROOT / "figures" / "python"
@@ -0,0 +1,183 @@
+"""Declarative problem specs: objective, constraints, bounds and solver options.
+
+A spec is a TOML file (or YAML, when PyYAML is installed) such as
+
+    name = "func1"
+    variables = ["x", "y"]                        # default
+    objective = "2*x**2 + y**2 - 2*x*y - 3*x - 2*y"
+    inequalities = ["y - x"]                      # g <= 0
+    equalities = ["x**2 + y**2 - 1"]              # h = 0
+    bounds = [[-2, 2], [-2, 2]]                   # per variable, for starts and plots
+
+    [solver]
+    method = "auto"       # auto, kkt, nlp or stationary
+    goal = "both"         # minimize, maximize or both
+    starts = 64           # nlp and stationary: random starts in the bounds
+    seed = 0
+    tol = 1e-8
+
+Expressions are parsed with SymPy's sympify, so specs must be trusted.
+``ProblemSpec.problem()`` gives an optlab.problems.Problem whose functions
+evaluate NumPy arrays and, called on SymPy symbols, return the expression,
+like the hand-written problems. Its fingerprint hashes the spec, so caches
+and the result store keep specs apart. Solving specs is optlab.batch.
+"""
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .problems import Problem
+
+METHODS = ("auto", "kkt", "nlp", "stationary")
+GOALS = ("minimize", "maximize", "both")
+_SOLVER_DEFAULTS = {"method": "auto", "goal": "both", "starts": 64, "seed": 0, "tol": 1e-8}
+_KEYS = {"name", "variables", "objective", "inequalities", "equalities", "bounds", "solver"}
+
+
+@dataclass(frozen=True)
+class SpecProblem(Problem):
+    """A Problem built from a spec; the fingerprint covers the spec itself."""
+    variables: tuple = ("x", "y")
+    definition: str = ""         # canonical JSON of the spec
+
+    def fingerprint(self):
+        import hashlib
+
+        return hashlib.sha1(f"{self.name}|{self.tol!r}|{self.definition}".encode()).hexdigest()
+
+
+@dataclass
+class ProblemSpec:
+    """One parsed spec file."""
+    name: str
+    objective: str
+    variables: tuple = ("x", "y")
+    inequalities: tuple = ()
+    equalities: tuple = ()
+    bounds: tuple = ()           # ((lo, hi), ...) per variable
+    solver: dict = field(default_factory=dict)
+    path: str = None
+
+    def canonical(self):
+        return json.dumps({"objective": self.objective, "variables": self.variables,
+                           "inequalities": self.inequalities, "equalities": self.equalities,
+                           "bounds": self.bounds, "solver": self.solver}, sort_keys=True)
+
+    def expressions(self):
+        """(objective, inequalities, equalities, symbols) as SymPy objects."""
+        import sympy as sp
+
+        symbols = tuple(sp.Symbol(v, real=True) for v in self.variables)
+        names = {str(s): s for s in symbols}
+
+        def parse(text):
+            try:
+                expr = sp.sympify(text, locals=names)
+            except (sp.SympifyError, SyntaxError, TypeError) as exc:
+                raise ValueError(f"{self.name}: cannot parse {text!r}: {exc}") from None
+            extra = expr.free_symbols - set(symbols)
+            if extra:
+                raise ValueError(f"{self.name}: {text!r} uses undeclared "
+                                 f"{sorted(map(str, extra))}, variables are {self.variables}")
+            return expr
+
+        return (parse(self.objective), tuple(parse(t) for t in self.inequalities),
+                tuple(parse(t) for t in self.equalities), symbols)
+
+    def problem(self):
+        f, g, h, symbols = self.expressions()
+        bounds = tuple(float(v) for pair in self.bounds for v in pair) or \
+            (-2.0, 2.0) * len(symbols)
+        return SpecProblem(name=self.name, objective=_function(f, symbols),
+                           inequalities=tuple(_function(e, symbols) for e in g),
+                           equalities=tuple(_function(e, symbols) for e in h),
+                           bounds=bounds, variables=self.variables,
+                           definition=self.canonical())
+
+
+def _function(expr, symbols):
+    """expr as f(*coordinates): NumPy for arrays, the expression for SymPy symbols."""
+    import sympy as sp
+
+    numeric = sp.lambdify(symbols, expr, "numpy")
+
+    def fn(*args):
+        if any(isinstance(a, sp.Basic) for a in args):
+            return expr.xreplace(dict(zip(symbols, args)))
+        return numeric(*args)
+    return fn
+
+
+def _read(path):
+    if path.suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"{path}: reading YAML specs needs PyYAML") from None
+        with open(path, encoding="utf-8") as fh:
+            try:
+                return yaml.safe_load(fh) or {}
+            except yaml.YAMLError as exc:
+                raise ValueError(f"{path}: {exc}") from None
+    import tomllib
+
+    with open(path, "rb") as fh:
+        return tomllib.load(fh)
+
+
+def _strings(data, key, name):
+    value = data.get(key, ())
+    value = [value] if isinstance(value, str) else value
+    if not all(isinstance(v, str) for v in value):
+        raise ValueError(f"{name}: {key} must be a list of expressions")
+    return tuple(value)
+
+
+def parse_spec(data, name=None, path=None):
+    """ProblemSpec from a dict (the contents of a spec file); ValueError if invalid."""
+    name = str(data.get("name") or name or "spec")
+    unknown = set(data) - _KEYS
+    if unknown:
+        raise ValueError(f"{name}: unknown keys {sorted(unknown)}, expected {sorted(_KEYS)}")
+    if not isinstance(data.get("objective"), str):
+        raise ValueError(f"{name}: objective must be an expression")
+    variables = _strings(data, "variables", name) or ("x", "y")
+
+    bounds = data.get("bounds", ())
+    if bounds and not isinstance(bounds[0], (list, tuple)):
+        bounds = list(zip(bounds[0::2], bounds[1::2]))    # flat (x_min, x_max, y_min, ...)
+    bounds = tuple((float(lo), float(hi)) for lo, hi in bounds)
+    if bounds and len(bounds) != len(variables):
+        raise ValueError(f"{name}: {len(bounds)} bounds for {len(variables)} variables")
+
+    solver = dict(_SOLVER_DEFAULTS)
+    unknown = set(data.get("solver", {})) - set(solver) - {"maxiter"}
+    if unknown:
+        raise ValueError(f"{name}: unknown solver options {sorted(unknown)}")
+    solver.update(data.get("solver", {}))
+    if solver["method"] not in METHODS:
+        raise ValueError(f"{name}: solver.method must be one of {METHODS}")
+    if solver["goal"] not in GOALS:
+        raise ValueError(f"{name}: solver.goal must be one of {GOALS}")
+    return ProblemSpec(name=name, objective=data["objective"], variables=variables,
+                       inequalities=_strings(data, "inequalities", name),
+                       equalities=_strings(data, "equalities", name),
+                       bounds=bounds, solver=solver, path=None if path is None else str(path))
+
+
+def load_spec(path):
+    """The ProblemSpec in a .toml (or .yaml) file."""
+    path = Path(path)
+    return parse_spec(_read(path), name=path.stem, path=path)
+
+
+def find_specs(paths):
+    """Spec files among ``paths``; directories are searched recursively."""
+    out = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            out.extend(sorted(p for p in path.rglob("*")
+                              if p.suffix in (".toml", ".yaml", ".yml")))
+        else:
+            out.append(path)
+    return out
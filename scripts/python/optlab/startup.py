@@ -0,0 +1,123 @@
+"""Import-time budget of the numeric core, checked in fresh interpreters.
+
+The numeric core (problems, solvers, sweeps) must import quickly and
+without Matplotlib, SymPy or SciPy: those are imported inside the functions
+that draw, derive symbolically or use sparse matrices. Each check runs its
+imports in a new interpreter (``--repeat`` times, best time kept) and fails
+when they take longer than the budget or load a forbidden module:
+
+- core: the numeric modules
+- tools: the spec, batch and result-store modules
+- scripts: discovering the figure jobs of every Part A/B script, as the
+  pipeline does before deciding what is out of date
+
+Every check needs NumPy, which alone takes most of the ~100 ms a core
+import may cost, and whose import time varies several-fold between
+machines. So each check is timed after ``import numpy`` in the same
+interpreter, and its budget is a fraction of that numpy import: machine
+speed cancels out. Bytecode is compiled into a private cache by a warm-up
+run first, so PYTHONDONTWRITEBYTECODE or a fresh checkout does not turn
+the check into a compile-time measurement.
+
+    python -m optlab.startup [--repeat 5] [--scale 1.0]
+
+The exit status is 1 when a check fails, so this can gate CI. ``--scale``
+multiplies every budget.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+
+from . import settings
+
+CORE = ("optlab.problems", "optlab.geometry", "optlab.nlp", "optlab.kkt", "optlab.quadratic",
+        "optlab.stationary", "optlab.linesearch", "optlab.trust_region", "optlab.sparse",
+        "optlab.sweep")
+TOOLS = ("optlab.spec", "optlab.batch", "optlab.store")
+HEAVY = ("matplotlib", "sympy", "scipy")
+
+
+@dataclass
+class Check:
+    name: str
+    code: str                # statements timed in a fresh interpreter
+    budget: float            # fraction of the time ``import numpy`` takes
+    forbidden: tuple = HEAVY
+
+
+# About 0.15, 0.2 and 0.6 of numpy's import time when this was written
+CHECKS = (
+    Check("core", "import " + ", ".join(CORE), 0.4),
+    Check("tools", "import " + ", ".join(TOOLS), 0.5),
+    Check("scripts", "from optlab.pipeline import discover_jobs; discover_jobs()", 1.5,
+          forbidden=("matplotlib", "sympy")),
+)
+
+# Runs in the child: numpy first, then the check, both timed
+_CHILD = """
+import json, sys, time
+t = time.perf_counter()
+import numpy
+numpy_seconds = time.perf_counter() - t
+t = time.perf_counter()
+{code}
+seconds = time.perf_counter() - t
+print(json.dumps({{"numpy": numpy_seconds, "seconds": seconds,
+                  "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(check, repeat=5, cache_dir=None):
+    """(best seconds, best numpy import seconds, forbidden modules loaded) of
+    ``check`` in new interpreters, after an untimed warm-up run that writes
+    bytecode to ``cache_dir``."""
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    if cache_dir is not None:
+        env["PYTHONPYCACHEPREFIX"] = str(cache_dir)
+    code = _CHILD.format(code=check.code, forbidden=check.forbidden)
+    best, numpy_best, loaded = float("inf"), float("inf"), set()
+    for i in range(repeat + 1):
+        out = subprocess.run([sys.executable, "-c", code], cwd=settings.SCRIPTS_DIR, env=env,
+                             capture_output=True, text=True, check=True)
+        if i == 0:
+            continue
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        best = min(best, result["seconds"])
+        numpy_best = min(numpy_best, result["numpy"])
+        loaded.update(result["loaded"])
+    return best, numpy_best, sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="interpreters per check")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget")
+    parser.add_argument("--cache-dir", help="bytecode cache for the timed interpreters "
+                                            "(default: a temporary directory)")
+    parser.add_argument("--only", action="append", default=[], help="check name (repeatable)")
+    args = parser.parse_args(argv)
+
+    failed = []
+    with tempfile.TemporaryDirectory(prefix="optlab-pyc-") as tmp:
+        for check in CHECKS:
+            if args.only and check.name not in args.only:
+                continue
+            seconds, numpy_seconds, loaded = measure(check, args.repeat, args.cache_dir or tmp)
+            budget = check.budget * args.scale * numpy_seconds
+            ok = seconds <= budget and not loaded
+            if not ok:
+                failed.append(check.name)
+            note = f"  loaded {', '.join(loaded)}" if loaded else ""
+            print(f"{check.name:8s} {seconds * 1e3:7.1f} ms  (budget {budget * 1e3:5.1f} ms = "
+                  f"{check.budget * args.scale:g} x import numpy {numpy_seconds * 1e3:.1f} ms)  "
+                  f"{'ok' if ok else 'FAIL'}{note}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Stationary points of functions of any number of variables.
+
+Points are classified by the inertia of their Hessians, which takes one
+batched eigvalsh over all points (see quadratic.classify_hessians). There
+are no symbolic determinants, so this scales to hundreds of variables and
+many points. Quadratics are solved in closed form. For other functions the
+stationary points come from Newton steps on the gradient, taken from many
+starts at once. Derivatives of non-quadratics come from the fused kernels
+in optlab.kernels.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from .quadratic import (analyze_quadratics, classify_inertia, inertia, null_directions,
+                        quadratic_coefficients)
+from .trace import traced
+
+
+@dataclass
+class StationaryAnalysis:
+    """One entry per stationary point."""
+    points: np.ndarray          # (m, n)
+    values: np.ndarray          # (m,)
+    gradient_norm: np.ndarray   # (m,)
+    eigenvalues: np.ndarray     # (m, n) Hessian eigenvalues, ascending
+    inertia: np.ndarray         # (m, 3) positive, negative and zero eigenvalue counts
+    classification: np.ndarray  # (m,) labels from optlab.quadratic
+    isolated: np.ndarray        # (m,) False for a point standing for an affine set of
+                                # stationary points (a quadratic with singular H)
+    directions: np.ndarray      # (m, k, n) orthonormal directions of that set; k = 0
+                                # when every point is isolated
+
+    @property
+    def labels(self):
+        """Classifications as text, with the non-isolated sets marked."""
+        return [str(c) if isolated else f"{c} (non-isolated set)"
+                for c, isolated in zip(self.classification, self.isolated)]
+
+
+def _evaluate(kernel, X):
+    """f (m,), gradients (m, n) and Hessians (m, n, n) at the rows of X."""
+    f, g, H = kernel(*X.T)
+    return f, np.moveaxis(g, 0, -1), np.moveaxis(H, (0, 1), (-2, -1))
+
+
+def classify_points(kernel, points, rtol=1e-9, atol=1e-12):
+    """Classify the rows of ``points`` with an order-2 fused kernel, all at once."""
+    X = np.array(points, dtype=float, ndmin=2)
+    f, g, H = _evaluate(kernel, X)
+    w = np.linalg.eigvalsh(H)
+    counts = inertia(w, rtol, atol)
+    return StationaryAnalysis(points=X, values=f, gradient_norm=np.linalg.norm(g, axis=-1),
+                              eigenvalues=w, inertia=counts,
+                              classification=classify_inertia(counts),
+                              isolated=np.ones(len(X), dtype=bool),
+                              directions=np.zeros((len(X), 0, X.shape[-1])))
+
+
+def _distinct(X, f, tol):
+    """Indices of distinct rows, lowest f first."""
+    order = np.argsort(f, kind="stable")
+    keep = []
+    scale = 1.0 + np.abs(X).max() if len(X) else 1.0
+    for i in order:
+        if all(np.linalg.norm(X[i] - X[k]) > tol * scale for k in keep):
+            keep.append(i)
+    return np.array(keep, dtype=int)
+
+
+@traced("optimize")
+def find_stationary_points(kernel, starts, tol=1e-10, maxiter=100, max_step=1.0):
+    """Distinct points with a vanishing gradient, by batched Newton steps.
+
+    Each start takes pseudo-inverse Newton steps x -= pinv(H) g, capped at
+    ``max_step`` (1 + |x|), until a step is below ``tol`` (1 + |x|). The
+    pseudo-inverse keeps singular Hessians usable, so degenerate points are
+    still approached, if only linearly. The steps are not biased towards
+    minima, so saddles and maxima are found as well.
+    """
+    X = np.array(starts, dtype=float, ndmin=2)
+    todo = np.arange(len(X))
+    for _ in range(maxiter):
+        if not todo.size:
+            break
+        _, g, H = _evaluate(kernel, X[todo])
+        step = -np.einsum("mij,mj->mi", np.linalg.pinv(H, hermitian=True), g)
+        norm = np.linalg.norm(step, axis=-1)
+        size = 1.0 + np.linalg.norm(X[todo], axis=-1)
+        moving = norm > tol * size
+        todo, step, norm, size = todo[moving], step[moving], norm[moving], size[moving]
+        X[todo] += step * np.minimum(1.0, max_step * size / np.maximum(norm, 1e-300))[:, None]
+
+    f, g, _ = _evaluate(kernel, X)
+    found = np.linalg.norm(g, axis=-1) <= np.sqrt(tol) * (1.0 + np.abs(f))
+    X, f = X[found], f[found]
+    return X[_distinct(X, f, 1e-6)]
+
+
+def analyze_quadratic(H, b, c=0.0, rtol=1e-9, atol=1e-12):
+    """Closed-form stationary points of one f = 1/2 x^T H x + b^T x + c.
+
+    The constant Hessian is classified once. There is one entry, or none
+    when H is singular and H x = -b has no solution. When H is singular
+    but the system is consistent, the stationary points form an affine
+    set; the entry is its least-norm point, with ``isolated`` False and
+    the set's directions from quadratic.null_directions.
+    """
+    H = np.asarray(H, dtype=float)
+    n = H.shape[-1]
+    res = analyze_quadratics(H, b, c)
+    count = 1 if res.unique or res.degenerate else 0
+    w = np.broadcast_to(np.linalg.eigvalsh(H), (count, n))
+    counts = inertia(w, rtol, atol)
+    directions = null_directions(H) if res.degenerate else np.zeros((0, n))
+    return StationaryAnalysis(points=res.points.reshape(-1, n)[:count],
+                              values=np.asarray(res.values, dtype=float).reshape(-1)[:count],
+                              gradient_norm=np.zeros(count), eigenvalues=w,
+                              inertia=counts, classification=classify_inertia(counts),
+                              isolated=np.full(count, bool(res.unique)),
+                              directions=np.broadcast_to(directions, (count,) + directions.shape))
+
+
+def analyze(expr, symbols, starts=64, bounds=(-5.0, 5.0), seed=0, rtol=1e-9, atol=1e-12):
+    """Stationary points of ``expr`` in ``symbols`` with their classification.
+
+    Quadratics are solved in closed form by analyze_quadratic. Anything
+    else is searched by find_stationary_points from ``starts`` random
+    points in the box ``bounds`` (the same interval for every variable),
+    or from an (m, n) array of starts.
+    """
+    symbols = tuple(symbols)
+    n = len(symbols)
+    coeffs = quadratic_coefficients(expr, symbols)
+    if coeffs is not None:
+        return analyze_quadratic(*coeffs, rtol=rtol, atol=atol)
+
+    from .kernels import fused_kernel
+
+    kernel = fused_kernel(expr, symbols, order=2)
+    if np.isscalar(starts):
+        starts = np.random.default_rng(seed).uniform(bounds[0], bounds[1], size=(starts, n))
+    return classify_points(kernel, find_stationary_points(kernel, starts), rtol, atol)
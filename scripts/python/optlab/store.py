@@ -0,0 +1,306 @@
+"""Persistent store of solver results: SQLite rows plus .npz array sidecars.
+
+Every solve of the project can be recorded: the Part A optima, the Part B
+stationary points and their classification, and whole family runs of
+optlab.kkt and optlab.sweep. A row holds
+
+    problem, problem_hash, kind, point, solver, params,
+    x, f, multipliers, classification, stats, seconds, created
+
+with x, multipliers, params and solver stats as JSON. Arrays too large for
+a row (a family run over 10^6 parameter values) go to an .npz sidecar in
+<store>.arrays/ next to the database.
+
+A row is identified by (problem_hash, kind, point, solver, params): solving
+the same thing again replaces it, so the store holds the latest result of
+every solve and reports read it instead of recomputing. problem_hash is
+Problem.fingerprint() for the Part A problems and a hash of the SymPy
+expression in Part B, so editing a definition starts new rows.
+
+Recording goes to settings.results_path() (OPTLAB_RESULTS, else
+results.sqlite in OPTLAB_CACHE_DIR) and is off when neither is set. The
+database is in WAL mode, so the pipeline workers can record at once.
+
+    python -m optlab.store [--problem func1] [--kind minimum] [--csv out.csv]
+"""
+import json
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+import numpy as np
+
+from . import settings
+from .trace import span
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    problem TEXT NOT NULL,
+    problem_hash TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    point INTEGER NOT NULL DEFAULT 0,
+    solver TEXT NOT NULL DEFAULT '',
+    params TEXT NOT NULL DEFAULT '{}',
+    x TEXT,
+    f REAL,
+    multipliers TEXT,
+    classification TEXT,
+    stats TEXT,
+    seconds REAL,
+    created REAL NOT NULL,
+    sidecar TEXT,
+    UNIQUE (problem_hash, kind, point, solver, params)
+);
+CREATE INDEX IF NOT EXISTS results_problem ON results (problem, kind);
+"""
+_JSON = ("params", "x", "multipliers", "stats")
+
+
+@dataclass
+class Record:
+    """One stored result (JSON columns decoded)."""
+    id: int
+    problem: str
+    problem_hash: str
+    kind: str                  # minimum, maximum, stationary, family, sweep, ...
+    point: int                 # index among the results of one solve
+    solver: str
+    params: dict
+    x: list
+    f: float
+    multipliers: list
+    classification: str
+    stats: dict
+    seconds: float
+    created: float             # time.time() of the solve
+    sidecar: str               # .npz file name in <store>.arrays/, or None
+
+
+def _jsonable(value):
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    if isinstance(value, (tuple, set)):
+        return list(value)
+    raise TypeError(f"not JSON serializable: {type(value).__name__}")
+
+
+def _dumps(value):
+    # Canonical (sorted keys), so equal params give equal keys
+    return None if value is None else json.dumps(value, sort_keys=True, default=_jsonable)
+
+
+def _identify(problem):
+    """(name, hash) of a problems.Problem or of a plain name."""
+    if hasattr(problem, "fingerprint"):
+        return problem.name, problem.fingerprint()
+    return str(problem), ""
+
+
+def expression_hash(expr):
+    """problem_hash of a SymPy expression."""
+    import hashlib
+
+    import sympy as sp
+
+    return hashlib.sha1(sp.srepr(expr).encode()).hexdigest()
+
+
+class ResultStore:
+    """Results in one SQLite file; see the module docstring."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.arrays_dir = self.path.with_name(self.path.name + ".arrays")
+        self._db = sqlite3.connect(str(self.path), timeout=60.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, problem, kind, x=None, f=None, *, point=0, solver="", params=None,
+            multipliers=None, classification=None, stats=None, seconds=None, arrays=None,
+            problem_hash=None):
+        """Record one result, replacing an earlier one of the same solve; returns its id.
+
+        ``problem`` is a problems.Problem (hashed by its fingerprint) or a
+        name with an explicit ``problem_hash``. ``arrays`` (a dict of
+        arrays) is written to the sidecar.
+        """
+        name, default_hash = _identify(problem)
+        problem_hash = default_hash if problem_hash is None else problem_hash
+        params = _dumps(params or {})
+        sidecar = None
+        if arrays is not None:
+            import hashlib
+
+            key = f"{problem_hash}|{kind}|{point}|{solver}|{params}|{name}"
+            sidecar = hashlib.sha1(key.encode()).hexdigest() + ".npz"
+            self.arrays_dir.mkdir(exist_ok=True)
+            tmp = self.arrays_dir / f"{sidecar[:-4]}.{os.getpid()}.tmp.npz"
+            np.savez_compressed(tmp, **arrays)
+            os.replace(tmp, self.arrays_dir / sidecar)
+        f = None if f is None else float(f)
+        with self._db:
+            cursor = self._db.execute(
+                "INSERT OR REPLACE INTO results (problem, problem_hash, kind, point, solver, "
+                "params, x, f, multipliers, classification, stats, seconds, created, sidecar) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, problem_hash, kind, int(point), solver, params, _dumps(x), f,
+                 _dumps(multipliers), classification, _dumps(stats),
+                 None if seconds is None else float(seconds), time.time(), sidecar))
+        return cursor.lastrowid
+
+    def _select(self, columns, problem=None, kind=None, solver=None, problem_hash=None,
+                params=None, since=None, limit=None):
+        where, args = [], []
+        for column, value in (("problem", problem), ("kind", kind), ("solver", solver),
+                              ("problem_hash", problem_hash)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+        if params is not None:
+            where.append("params = ?")
+            args.append(_dumps(params))
+        if since is not None:
+            where.append("created >= ?")
+            args.append(float(since))
+        sql = f"SELECT {', '.join(columns)} FROM results"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY problem, kind, solver, params, point"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self._db.execute(sql, args).fetchall()
+
+    def query(self, **filters):
+        """Records matching the filters: problem, kind, solver, problem_hash,
+        params (a dict, matched exactly), since (a time.time()) and limit."""
+        names = [fl.name for fl in fields(Record)]
+        out = []
+        for row in self._select(names, **filters):
+            values = dict(zip(names, row))
+            for name in _JSON:
+                values[name] = None if values[name] is None else json.loads(values[name])
+            out.append(Record(**values))
+        return out
+
+    def latest(self, **filters):
+        """The most recently created matching record, or None."""
+        records = self.query(**filters)
+        return max(records, key=lambda r: r.created) if records else None
+
+    def columns(self, names=("problem", "kind", "solver", "f", "seconds"), **filters):
+        """Columns of the matching records as arrays (f, seconds, created,
+        point and id numeric; the rest as object arrays)."""
+        unknown = set(names) - {fl.name for fl in fields(Record)}
+        if unknown:
+            raise ValueError(f"unknown columns {sorted(unknown)}")
+        rows = self._select(names, **filters)
+        out = {}
+        for i, name in enumerate(names):
+            values = [row[i] for row in rows]
+            if name in ("f", "seconds", "created"):
+                out[name] = np.array([np.nan if v is None else v for v in values], dtype=float)
+            elif name in ("point", "id"):
+                out[name] = np.array(values, dtype=np.int64)
+            else:
+                out[name] = np.array(values, dtype=object)
+        return out
+
+    def arrays(self, record):
+        """The sidecar arrays of ``record`` as a dict (empty if it has none)."""
+        if record.sidecar is None:
+            return {}
+        with np.load(self.arrays_dir / record.sidecar) as data:
+            return {name: data[name] for name in data.files}
+
+
+_stores = {}
+
+
+def default_store():
+    """The store at settings.results_path(), one connection per process, or None."""
+    path = settings.results_path()
+    if path is None:
+        return None
+    key = (str(path), os.getpid())
+    if key not in _stores:
+        _stores[key] = ResultStore(path)
+    return _stores[key]
+
+
+def record(problem, kind, x=None, f=None, **kwargs):
+    """ResultStore.add on the default store; a no-op when recording is off."""
+    store = default_store()
+    if store is None:
+        return None
+    with span("store", kind=kind):
+        return store.add(problem, kind, x, f, **kwargs)
+
+
+def record_stationary(expr, symbols, points, classifications, solver, seconds=None,
+                      eigenvalues=None):
+    """Record the stationary points of a SymPy expression with their Hessian
+    classification (and eigenvalues, into stats); a no-op when recording is off."""
+    if default_store() is None:
+        return
+    problem_hash = expression_hash(expr)
+    for i, (point, classification) in enumerate(zip(points, classifications)):
+        x = [float(v) for v in point]
+        stats = None if eigenvalues is None else {"eigenvalues": eigenvalues[i]}
+        record(str(expr), "stationary", x, float(expr.subs(dict(zip(symbols, x)))), point=i,
+               solver=solver, classification=str(classification), stats=stats,
+               seconds=seconds, problem_hash=problem_hash)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", help="store file (default: settings.results_path())")
+    parser.add_argument("--problem")
+    parser.add_argument("--kind")
+    parser.add_argument("--solver")
+    parser.add_argument("--csv", help="write the matching records to this CSV file")
+    args = parser.parse_args(argv)
+
+    path = args.path or settings.results_path()
+    if path is None or not Path(path).exists():
+        parser.error("no result store (set OPTLAB_RESULTS or OPTLAB_CACHE_DIR, or pass --path)")
+    t0 = time.perf_counter()
+    with ResultStore(path) as store:
+        records = store.query(problem=args.problem, kind=args.kind, solver=args.solver)
+    seconds = time.perf_counter() - t0
+
+    if args.csv:
+        import csv
+
+        with open(args.csv, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow([fl.name for fl in fields(Record)])
+            for r in records:
+                writer.writerow([_dumps(v) if isinstance(v, (dict, list)) else v
+                                 for v in (getattr(r, fl.name) for fl in fields(Record))])
+
+    for r in records:
+        x = "" if r.x is None else "(" + ", ".join(f"{v:.6g}" for v in np.ravel(r.x)) + ")"
+        f = "" if r.f is None else f"{r.f:.10g}"
+        params = "" if not r.params else " " + ", ".join(f"{k}={v}" for k, v in r.params.items())
+        print(f"{r.problem:8s} {r.kind:11s} {r.solver:10s}{params} {x} {f} "
+              f"{r.classification or ''}".rstrip())
+    print(f"{len(records)} records in {seconds * 1e3:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
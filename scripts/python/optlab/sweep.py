@@ -0,0 +1,364 @@
+"""Parametric sweeps: optima of a problem family as its constraint constants vary.
+
+    f*(p) = min f(x)  subject to  g(x, p) <= 0,  h(x, p) = 0
+
+The families are in optlab.problems.FAMILIES (func1: radius, func2: rhs,
+func3: center and radius_sq). Parameter values are given per name as arrays
+that broadcast together; names left out stay at their defaults.
+
+Values are solved in chunks that are yielded as soon as they are done, so
+memory is bounded by the chunk size however long the sweep is. Every value
+is warm-started, point and multipliers, from solved neighbours in sweep
+order. A skeleton of every ``stride``-th value is solved one value at a
+time, each from the previous one, with steps halved where the solution
+moves too far to trust (see ``max_move``). The values in between are then filled in
+by bisection: each level is one batched solve, started by interpolating the
+two solved neighbours. A chunk continues from the last value of the previous
+chunk, and the first value of the sweep comes from a multi-start solve (or
+from ``x0``, to follow another branch).
+
+Sensitivities come from the envelope theorem. The objective does not depend
+on p, so at a solution
+
+    df*/dp = dL/dp = lam . dh/dp + mu . dg/dp
+
+which costs a central difference of the constraints in p instead of a solve.
+
+Continuation follows one branch of KKT points, which need not stay the
+global optimum: for func1 maxima the branch at (-r/sqrt 2, -r/sqrt 2) is
+only a local maximum once the radius passes about 2.04. ``converged`` means
+a KKT point of the followed branch was found, nothing more. Where the
+family is quadratic, the skeleton values are therefore checked against the
+exact optima of optlab.kkt: ``gap`` is how much worse the branch is than
+the global optimum there (NaN at values that were not checked). In a chunk
+where a skeleton value is off, every value is checked, and the command
+line reports where the branch leaves the global optimum.
+
+For the quadratic families ``exact_sweep`` gives the same chunks from
+optlab.kkt: global optima by active-set enumeration, with no warm starts
+and no branch following (``--exact`` on the command line).
+
+    python -m optlab.sweep func3 radius_sq=1:40:1000000 --output sweep.csv
+"""
+import sys
+import time
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from . import nlp
+from .problems import FAMILIES
+
+
+@dataclass
+class SweepChunk:
+    """Solutions for the sweep values offset, offset + 1, ..."""
+    offset: int
+    params: np.ndarray       # (k, p) in the order of family.params
+    x: np.ndarray            # (k, 2)
+    f: np.ndarray            # (k,)
+    lam: np.ndarray          # (k, n_eq) multipliers of the solved problem (-f when maximizing)
+    mu: np.ndarray           # (k, n_ineq)
+    sensitivity: np.ndarray  # (k, p) df*/dp
+    converged: np.ndarray    # (k,) a KKT point of the followed branch, not necessarily global
+    gap: np.ndarray          # (k,) |f - global optimum| where checked, else NaN
+
+
+def concatenate(chunks):
+    """One SweepChunk from consecutive chunks, for sweeps that fit in memory."""
+    chunks = list(chunks)
+    arrays = {fl.name: np.concatenate([getattr(c, fl.name) for c in chunks])
+              for fl in fields(SweepChunk) if fl.name != "offset"}
+    return SweepChunk(offset=chunks[0].offset, **arrays)
+
+
+class _Values:
+    """Broadcast parameter arrays in flat order, materialized a slice at a time."""
+
+    def __init__(self, family, values):
+        unknown = set(values) - set(family.params)
+        if unknown:
+            raise ValueError(f"{family.problem.name}: unknown parameters {sorted(unknown)}, "
+                             f"expected {family.params}")
+        self.arrays = [np.asarray(values.get(name, default), dtype=float)
+                       for name, default in zip(family.params, family.defaults)]
+        self.shape = np.broadcast_shapes(*(a.shape for a in self.arrays)) or (1,)
+        self.size = int(np.prod(self.shape))
+
+    def take(self, start, stop):
+        index = np.unravel_index(np.arange(start, stop), self.shape)
+        return np.stack([np.broadcast_to(a, self.shape)[index] for a in self.arrays], axis=-1)
+
+
+def _first(solve, problem, params, x0, starts, seed):
+    """Solution at the first value: from x0, or the best of a multi-start solve."""
+    if x0 is not None:
+        res = solve(params[:1], np.atleast_2d(np.asarray(x0, dtype=float)))
+    else:
+        res = solve(np.repeat(params[:1], starts, axis=0),
+                    nlp.sample_starts(problem.bounds, starts, seed)).unique()
+    if not res.converged[:1].any():
+        raise ValueError(f"{problem.name}: no converged solution at {params[0].tolist()}")
+    return res.x[:1], res.lam[:1], res.mu[:1]
+
+
+def _solve_chunk(solve, params, anchor, stride, max_move):
+    """Solve every value of ``params`` by continuation from ``anchor``."""
+    k = len(params)
+    x, lam, mu = (np.empty((k,) + a.shape[1:]) for a in anchor)
+    f = np.empty(k)
+    converged = np.zeros(k, dtype=bool)
+    solved = np.zeros(k, dtype=bool)
+
+    def store(index, res):
+        x[index], lam[index], mu[index] = res.x, res.lam, res.mu
+        f[index], converged[index], solved[index] = res.f, res.converged, True
+
+    # Skeleton, in order. A step that moves the solution by more than
+    # max_move is retried in halves, so the continuation does not hop to
+    # another branch of KKT points.
+    targets = list(range(0, k, stride))
+    if targets[-1] != k - 1:
+        targets.append(k - 1)
+    targets.reverse()
+    last, start = None, anchor
+    while targets:
+        i = targets[-1]
+        res = solve(params[i:i + 1], *start)
+        if last is not None and i - last > 1 \
+                and np.linalg.norm(res.x[0] - start[0][0]) > max_move:
+            targets.append((last + i) // 2)
+            continue
+        targets.pop()
+        store(slice(i, i + 1), res)
+        last, start = i, (res.x, res.lam, res.mu)
+
+    # Bisection of the gaps, one batched solve per level
+    while not solved.all():
+        done = np.flatnonzero(solved)
+        a, b = done[:-1], done[1:]
+        gap = b - a > 1
+        a, b = a[gap], b[gap]
+        mid = (a + b) // 2
+        w = ((mid - a) / (b - a))[:, None]
+        res = solve(params[mid], (1 - w) * x[a] + w * x[b],
+                    (1 - w) * lam[a] + w * lam[b], (1 - w) * mu[a] + w * mu[b])
+        store(mid, res)
+    return x, f, lam, mu, converged
+
+
+def _global_gap(family, params, f, sign, index):
+    """f minus the global optimum (the other way round when maximizing) at
+    ``params[index]``, from optlab.kkt; None if the family is not quadratic."""
+    from .kkt import solve_family_values
+
+    try:
+        res = solve_family_values(family.problem.objective, family.equalities,
+                                  family.inequalities, family.params, tuple(params[index].T))
+    except ValueError:
+        return None
+    best = res.f_max if sign < 0 else res.f_min
+    gap = np.full(len(f), np.nan)
+    gap[index] = np.maximum(sign * (f[index] - best), 0.0)
+    return gap
+
+
+def _sensitivity(family, x, lam, mu, params, step=1e-6):
+    """lam . dh/dp + mu . dg/dp by central differences in each parameter."""
+    out = np.zeros_like(params)
+    for j in range(params.shape[1]):
+        h = step * np.maximum(1.0, np.abs(params[:, j]))
+        up, down = params.copy(), params.copy()
+        up[:, j] += h
+        down[:, j] -= h
+        for funcs, multipliers in ((family.equalities, lam), (family.inequalities, mu)):
+            for i, fn in enumerate(funcs):
+                d = fn(x[:, 0], x[:, 1], *up.T) - fn(x[:, 0], x[:, 1], *down.T)
+                out[:, j] += multipliers[:, i] * d / (2 * h)
+    return out
+
+
+def sweep(family, values, chunk_size=4096, stride=256, max_move=None, maximize=False,
+          x0=None, starts=64, seed=0, check=True, **kwargs):
+    """Yield a SweepChunk for each ``chunk_size`` consecutive parameter values.
+
+    ``family`` is a problems.Family or its name, ``values`` maps parameter
+    names to arrays. ``max_move`` (default 1% of the plotting window's
+    diagonal) is the largest move of the solution per skeleton step. With
+    ``maximize`` the branch of maxima is followed. With ``check`` the
+    skeleton values (every ``stride``-th) are compared with the exact
+    optima of optlab.kkt when the family is quadratic (``gap``), and every
+    value of a chunk where one of them is off. Remaining
+    keyword arguments go to nlp.solve (tol, maxiter, ...).
+    """
+    if isinstance(family, str):
+        family = FAMILIES[family]
+    problem = family.problem
+    sign = -1.0 if maximize else 1.0
+    grid = _Values(family, values)
+    if max_move is None:
+        xmin, xmax, ymin, ymax = problem.bounds
+        max_move = 0.01 * np.hypot(xmax - xmin, ymax - ymin)
+
+    def objective(x, y, *params):
+        return sign * problem.objective(x, y)
+
+    kwargs.setdefault("gradient", nlp.objective_gradient(problem, sign))
+
+    def solve(params, start, lam0=None, mu0=None):
+        options = dict(kwargs)
+        if lam0 is not None:
+            # Warm multipliers are close: a stiff penalty only has to absorb the remainder
+            options.setdefault("rho0", 1e4)
+        return nlp.solve(objective, start, family.inequalities, family.equalities,
+                         args=tuple(params.T), lam0=lam0, mu0=mu0, **options)
+
+    anchor = None
+    for offset in range(0, grid.size, chunk_size):
+        params = grid.take(offset, min(offset + chunk_size, grid.size))
+        if anchor is None:
+            anchor = _first(solve, problem, params, x0, starts, seed)
+        x, f, lam, mu, converged = _solve_chunk(solve, params, anchor, stride, max_move)
+        anchor = x[-1:], lam[-1:], mu[-1:]
+        gap = None
+        if check:
+            skeleton = np.unique(np.append(np.arange(0, len(f), stride), len(f) - 1))
+            gap = _global_gap(family, params, sign * f, sign, skeleton)
+            check = gap is not None
+            if check and (gap[skeleton] > 1e-6 * (1.0 + np.abs(f[skeleton]))).any():
+                # Off the global optimum somewhere: check every value, to
+                # locate the branch switch
+                gap = _global_gap(family, params, sign * f, sign, slice(None))
+        yield SweepChunk(offset=offset, params=params, x=x, f=sign * f, lam=lam, mu=mu,
+                         sensitivity=sign * _sensitivity(family, x, lam, mu, params),
+                         converged=converged,
+                         gap=np.full(len(f), np.nan) if gap is None else gap)
+
+
+def exact_sweep(family, values, chunk_size=65536, maximize=False):
+    """``sweep`` with the global optimum of every value from optlab.kkt.
+
+    ``converged`` is True where the optimum is certified; where it does not
+    exist (f unbounded) x and f are NaN and +-inf. ``gap`` is 0 where f is
+    finite.
+    """
+    from .kkt import solve_family_values
+
+    if isinstance(family, str):
+        family = FAMILIES[family]
+    sign = -1.0 if maximize else 1.0
+    name = "max" if maximize else "min"
+    grid = _Values(family, values)
+    for offset in range(0, grid.size, chunk_size):
+        params = grid.take(offset, min(offset + chunk_size, grid.size))
+        res = solve_family_values(family.problem.objective, family.equalities,
+                                  family.inequalities, family.params, tuple(params.T))
+        x, f = getattr(res, f"x_{name}"), getattr(res, f"f_{name}")
+        # Multipliers of the solved problem (min sign * f), as in sweep
+        lam, mu = sign * getattr(res, f"lam_{name}"), sign * getattr(res, f"mu_{name}")
+        yield SweepChunk(offset=offset, params=params, x=x, f=f, lam=lam, mu=mu,
+                         sensitivity=sign * _sensitivity(family, x, lam, mu, params),
+                         converged=getattr(res, f"certified_{name}"),
+                         gap=np.where(np.isfinite(f), 0.0, np.nan))
+
+
+def _parse_value(text):
+    """``a:b:n`` for n values from a to b, otherwise one number."""
+    parts = text.split(":")
+    if len(parts) == 3:
+        return np.linspace(float(parts[0]), float(parts[1]), int(parts[2]))
+    return float(text)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("problem", choices=sorted(FAMILIES))
+    parser.add_argument("values", nargs="*", metavar="NAME=VALUE",
+                        help="a number or start:stop:count; ranges are zipped")
+    parser.add_argument("--maximize", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--stride", type=int, default=256)
+    parser.add_argument("--tol", type=float, default=1e-8)
+    parser.add_argument("--output", help="CSV file, written chunk by chunk")
+    parser.add_argument("--exact", action="store_true",
+                        help="global optima from optlab.kkt (quadratic families)")
+    parser.add_argument("--store", action="store_true",
+                        help="record the sweep in the result store (optlab.store); "
+                             "keeps all chunks in memory")
+    args = parser.parse_args(argv)
+
+    family = FAMILIES[args.problem]
+    values, spec = {}, {}
+    for item in args.values:
+        name, _, text = item.partition("=")
+        values[name] = _parse_value(text)
+        spec[name] = text
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    if out:
+        names = list(family.params)
+        header = names + ["x", "y", "f"]
+        header += [f"lam{i}" for i in range(len(family.equalities))]
+        header += [f"mu{i}" for i in range(len(family.inequalities))]
+        header += [f"df_d{name}" for name in names] + ["converged", "gap"]
+        out.write(",".join(header) + "\n")
+
+    t0 = time.perf_counter()
+    total = failed = off_global = 0
+    last = leaves = None
+    worst = 0.0
+    kept = []
+    try:
+        if args.exact:
+            chunks = exact_sweep(family, values, chunk_size=args.chunk_size,
+                                 maximize=args.maximize)
+        else:
+            chunks = sweep(family, values, chunk_size=args.chunk_size, stride=args.stride,
+                           maximize=args.maximize, tol=args.tol)
+        for chunk in chunks:
+            total += len(chunk.f)
+            failed += int((~chunk.converged).sum())
+            last = chunk
+            # Branch switches: checked values where the followed branch is
+            # not the global optimum
+            off = np.flatnonzero(chunk.gap > 1e-6 * (1.0 + np.abs(chunk.f)))
+            off_global += len(off)
+            if len(off):
+                worst = max(worst, float(np.nanmax(chunk.gap)))
+                if leaves is None:
+                    leaves = chunk.params[off[0]]
+            if args.store:
+                kept.append(chunk)
+            if out:
+                np.savetxt(out, np.column_stack([chunk.params, chunk.x, chunk.f, chunk.lam,
+                                                 chunk.mu, chunk.sensitivity, chunk.converged,
+                                                 chunk.gap]),
+                           delimiter=",", fmt="%.12g")
+    finally:
+        if out:
+            out.close()
+
+    seconds = time.perf_counter() - t0
+    print(f"{args.problem}: {total} values in {seconds:.1f} s, {failed} not converged")
+    if leaves is not None:
+        p = ", ".join(f"{n}={v:g}" for n, v in zip(family.params, leaves))
+        print(f"{off_global} values not the global optimum, first at {p} "
+              f"(gap up to {worst:.6g}); --exact gives the global optima")
+    if kept:
+        from .store import record
+
+        arrays = {fl.name: getattr(concatenate(kept), fl.name)
+                  for fl in fields(SweepChunk) if fl.name != "offset"}
+        record(family.problem, "sweep", solver="kkt" if args.exact else "continuation",
+               params=dict(spec, maximize=args.maximize), arrays=arrays,
+               stats={"values": total, "not_converged": failed}, seconds=seconds)
+    if last is not None:
+        p = ", ".join(f"{n}={v:g}" for n, v in zip(family.params, last.params[-1]))
+        print(f"last: {p}  x=({last.x[-1, 0]:.6g}, {last.x[-1, 1]:.6g})  f={last.f[-1]:.6g}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""Out-of-core grid evaluation for resolutions that do not fit in memory.
+
+The objective and the constraint residuals are evaluated one band of rows
+at a time and streamed into .npy files, which are then opened as read-only
+memory maps. The same pass keeps
+running reductions (min, max, argmin/argmax, a histogram for contour
+levels, and the extrema over the feasible band), plus a strided subgrid
+that plotting code uses as an ordinary Grid. Memory use depends on the
+band size, not on the resolution.
+
+Usage (from scripts/python):
+    python -m optlab.tiled func1 --resolution 20000 [--dtype float32]
+                           [--directory DIR] [--plot contour.png]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from . import lowmem, settings
+from .gridcache import Grid
+from .trace import span
+
+# Elements per band of rows (32 MB in float64)
+BAND_ELEMENTS = 1 << 22
+HIST_BINS = 1024
+
+
+@dataclass
+class ArrayStats:
+    """Reductions of one array over the whole grid (indices are (row, col))."""
+    min: float = np.inf
+    argmin: tuple = None
+    max: float = -np.inf
+    argmax: tuple = None
+    count: int = 0
+    edges: np.ndarray = None
+    counts: np.ndarray = None
+    below: int = 0      # values under edges[0]
+    above: int = 0      # values over edges[-1]
+
+    def update(self, values, row0):
+        """Fold in a band whose first row is ``row0`` (NaNs are ignored)."""
+        if values.size == 0:
+            return
+        valid = ~np.isnan(values)
+        if not valid.all():
+            if not valid.any():
+                return
+            lo_vals = np.where(valid, values, np.inf)
+            hi_vals = np.where(valid, values, -np.inf)
+        else:
+            lo_vals = hi_vals = values
+        i = int(np.argmin(lo_vals))
+        if lo_vals.flat[i] < self.min:
+            self.min = float(lo_vals.flat[i])
+            r, c = np.unravel_index(i, values.shape)
+            self.argmin = (row0 + int(r), int(c))
+        i = int(np.argmax(hi_vals))
+        if hi_vals.flat[i] > self.max:
+            self.max = float(hi_vals.flat[i])
+            r, c = np.unravel_index(i, values.shape)
+            self.argmax = (row0 + int(r), int(c))
+        if self.edges is not None:
+            v = values[valid] if not valid.all() else values.ravel()
+            self.counts += np.histogram(v, bins=self.edges)[0]
+            self.below += int(np.count_nonzero(v < self.edges[0]))
+            self.above += int(np.count_nonzero(v > self.edges[-1]))
+        self.count += int(np.count_nonzero(valid))
+
+    def quantile(self, q):
+        """Approximate quantile from the histogram (exact at the extremes)."""
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        # cum[k] = number of values below edges[k]; interpolate inside the bin
+        cum = self.below + np.concatenate(([0], np.cumsum(self.counts)))
+        target = q * self.count
+        k = int(np.clip(np.searchsorted(cum, target, side="right") - 1, 0, len(self.counts) - 1))
+        frac = np.clip((target - cum[k]) / max(self.counts[k], 1), 0.0, 1.0)
+        value = self.edges[k] + frac * (self.edges[k + 1] - self.edges[k])
+        return float(np.clip(value, self.min, self.max))
+
+    def contour_levels(self, n=30, spacing="linear"):
+        """``n`` contour levels: evenly spaced values, or equal-area (quantile) levels."""
+        if spacing == "quantile":
+            return np.unique([self.quantile(q) for q in np.linspace(0, 1, n + 2)[1:-1]])
+        return np.linspace(self.min, self.max, n + 2)[1:-1]
+
+    def to_dict(self):
+        out = {k: getattr(self, k) for k in ("min", "argmin", "max", "argmax",
+                                              "count", "below", "above")}
+        if self.edges is not None:
+            out["edges"] = self.edges.tolist()
+            out["counts"] = self.counts.tolist()
+        return out
+
+    @classmethod
+    def from_dict(cls, d):
+        d = dict(d)
+        for k in ("argmin", "argmax"):
+            d[k] = tuple(d[k]) if d[k] is not None else None
+        if "edges" in d:
+            d["edges"] = np.asarray(d["edges"])
+            d["counts"] = np.asarray(d["counts"], dtype=np.int64)
+        return cls(**d)
+
+
+@dataclass
+class TiledGrid:
+    """Memory-mapped objective and residuals with their reductions."""
+    problem: object
+    x: np.ndarray
+    y: np.ndarray
+    directory: str
+    arrays: dict = field(default_factory=dict)   # name -> read-only memmap
+    stats: dict = field(default_factory=dict)    # name -> ArrayStats
+    feasible: ArrayStats = None                  # F over the feasible band
+    view: Grid = None                            # strided subgrid for plotting
+
+    def point(self, index):
+        """(x, y) of a (row, col) index."""
+        row, col = index
+        return float(self.x[col]), float(self.y[row])
+
+
+def _names(problem):
+    return (["F"] + [f"g{i}" for i in range(len(problem.inequalities))]
+            + [f"h{i}" for i in range(len(problem.equalities))])
+
+
+def _key(problem, bounds, shape, dtype):
+    return {"fingerprint": problem.fingerprint(), "bounds": list(map(float, bounds)),
+            "shape": list(shape), "dtype": np.dtype(dtype).str}
+
+
+def _histogram_edges(problem, bounds, bins=HIST_BINS):
+    """Histogram range from a coarse grid, padded; outliers go to below/above."""
+    x = np.linspace(bounds[0], bounds[1], 257)
+    y = np.linspace(bounds[2], bounds[3], 257)
+    F = lowmem.evaluate(problem, x, y)
+    lo, hi = float(np.nanmin(F)), float(np.nanmax(F))
+    pad = 0.05 * (hi - lo) or 1.0
+    return np.linspace(lo - pad, hi + pad, bins + 1)
+
+
+def _stride(n, view_points):
+    return max(1, -(-n // view_points))
+
+
+def _load(directory, problem, key, view_points):
+    path = os.path.join(directory, "stats.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        meta = json.load(fh)
+    if meta["key"] != key:
+        return None
+    arrays = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+              for name in _names(problem)}
+    stats = {name: ArrayStats.from_dict(d) for name, d in meta["stats"].items()}
+    F = arrays["F"]
+    x = np.linspace(*key["bounds"][:2], key["shape"][1]).astype(F.dtype)
+    y = np.linspace(*key["bounds"][2:], key["shape"][0]).astype(F.dtype)
+    sy, sx = _stride(len(y), view_points), _stride(len(x), view_points)
+    view = Grid(x[::sx], y[::sy], np.array(F[::sy, ::sx]), problem)
+    return TiledGrid(problem, x, y, directory, arrays, stats,
+                     ArrayStats.from_dict(meta["feasible"]), view)
+
+
+def evaluate_tiled(problem, resolution, bounds=None, dtype=np.float64, directory=None,
+                   view_points=1000, band_elements=BAND_ELEMENTS, reuse=True):
+    """Evaluate ``problem`` on a resolution x resolution grid band by band.
+
+    Arrays are written to ``directory`` (default: <OPTLAB_CACHE_DIR>/tiled/...
+    or a new temporary directory). A completed store with the same problem,
+    bounds, shape and dtype is reused when ``reuse`` is set.
+    """
+    bounds = problem.bounds if bounds is None else bounds
+    nx, ny = (resolution, resolution) if np.isscalar(resolution) else resolution
+    key = _key(problem, bounds, (ny, nx), dtype)
+    if directory is None:
+        root = settings.cache_dir()
+        if root is None:
+            directory = tempfile.mkdtemp(prefix=f"optlab-{problem.name}-")
+        else:
+            directory = os.path.join(root, "tiled", f"{problem.name}-{nx}x{ny}-"
+                                     f"{np.dtype(dtype).name}-{key['fingerprint'][:12]}")
+    os.makedirs(directory, exist_ok=True)
+    if reuse:
+        done = _load(directory, problem, key, view_points)
+        if done is not None:
+            return done
+
+    x = np.linspace(bounds[0], bounds[1], nx).astype(dtype)
+    y = np.linspace(bounds[2], bounds[3], ny).astype(dtype)
+    names = _names(problem)
+    stale = os.path.join(directory, "stats.json")
+    if os.path.exists(stale):
+        os.remove(stale)
+    # Bands are computed into reused buffers and appended to the files with
+    # plain writes, so finished bands live in the page cache instead of
+    # counting against this process as dirty mapped pages.
+    files = {}
+    for name in names:
+        path = os.path.join(directory, name + ".npy")
+        files[name] = open(path, "wb")
+        np.lib.format.write_array_header_2_0(files[name], {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+            "fortran_order": False, "shape": (ny, nx)})
+    stats = {name: ArrayStats() for name in names}
+    edges = _histogram_edges(problem, bounds)
+    stats["F"].edges, stats["F"].counts = edges, np.zeros(len(edges) - 1, dtype=np.int64)
+    feasible = ArrayStats()
+
+    sy, sx = _stride(ny, view_points), _stride(nx, view_points)
+    view_rows = []
+    rows = max(1, band_elements // nx)
+    buffers = {name: np.empty((rows, nx), dtype=dtype) for name in names}
+    xr = x[np.newaxis, :]
+    try:
+        for r0 in range(0, ny, rows):
+            r1 = min(r0 + rows, ny)
+            yc = y[r0:r1, np.newaxis]
+            with span("eval", problem=problem.name, rows=f"{r0}:{r1}"):
+                F = lowmem.evaluate(problem, x, y[r0:r1], out=buffers["F"][:r1 - r0])
+            with span("mask", problem=problem.name):
+                mask = np.ones(F.shape, dtype=bool)
+                for i, g in enumerate(problem.inequalities):
+                    band = buffers[f"g{i}"][:r1 - r0]
+                    band[...] = g(xr, yc)
+                    stats[f"g{i}"].update(band, r0)
+                    mask &= band <= 0
+                for i, h in enumerate(problem.equalities):
+                    band = buffers[f"h{i}"][:r1 - r0]
+                    band[...] = h(xr, yc)
+                    stats[f"h{i}"].update(band, r0)
+                    mask &= np.abs(band) < problem.tol
+            stats["F"].update(F, r0)
+            feasible.update(np.where(mask, F, np.nan), r0)
+            view_rows.append(F[(-r0) % sy::sy, ::sx].copy())
+            for name in names:
+                buffers[name][:r1 - r0].tofile(files[name])
+    finally:
+        for fh in files.values():
+            fh.close()
+
+    with open(stale + ".tmp", "w", encoding="utf-8") as fh:
+        json.dump({"key": key, "stats": {k: v.to_dict() for k, v in stats.items()},
+                   "feasible": feasible.to_dict()}, fh)
+    os.replace(stale + ".tmp", stale)
+
+    arrays = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+              for name in names}
+    view = Grid(x[::sx], y[::sy], np.concatenate(view_rows), problem)
+    return TiledGrid(problem, x, y, directory, arrays, stats, feasible, view)
+
+
+def plot_contour(tiled, save_path, levels=30, spacing="quantile"):
+    """Contour of the downsampled view with levels from the full-resolution histogram."""
+    import matplotlib.pyplot as plt
+    from .render import figure_dpi
+
+    view = tiled.view
+    plt.figure(figsize=(8, 6))
+    plt.contour(view.x, view.y, view.F, tiled.stats["F"].contour_levels(levels, spacing),
+                linewidths=1.2)
+    plt.plot(*tiled.problem.feasible_path(), color='green', linewidth=5, alpha=0.35,
+             solid_capstyle='butt', label="Feasible set")
+    if tiled.feasible.argmin is not None:
+        plt.scatter(*tiled.point(tiled.feasible.argmin), s=80, c='purple',
+                    label="Feasible min (grid)")
+    plt.legend()
+    plt.axis("equal")
+    plt.title(f"{tiled.problem.name}: {len(tiled.x)} x {len(tiled.y)} grid")
+    plt.savefig(save_path, dpi=figure_dpi(), bbox_inches="tight")
+    plt.close()
+
+
+def main(argv=None):
+    from .problems import PROBLEMS
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("problem", choices=sorted(PROBLEMS))
+    parser.add_argument("--resolution", type=int, default=20000)
+    parser.add_argument("--dtype", default="float64", choices=("float32", "float64"))
+    parser.add_argument("--directory", help="where to keep the .npy files")
+    parser.add_argument("--plot", help="save a contour of the downsampled view here")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    tiled = evaluate_tiled(PROBLEMS[args.problem], args.resolution,
+                           dtype=np.dtype(args.dtype), directory=args.directory)
+    print(f"{args.problem}: {args.resolution}^2 grid in {time.perf_counter() - start:.1f}s "
+          f"-> {tiled.directory}")
+    for name, s in tiled.stats.items():
+        print(f"  {name}: min {s.min:.6g} at {tiled.point(s.argmin)}, "
+              f"max {s.max:.6g} at {tiled.point(s.argmax)}")
+    f = tiled.feasible
+    if f.count:
+        print(f"  feasible band ({f.count} points): min {f.min:.6g} at "
+              f"{tiled.point(f.argmin)}, max {f.max:.6g} at {tiled.point(f.argmax)}")
+    if args.plot:
+        import matplotlib
+        matplotlib.use("Agg")
+        plot_contour(tiled, args.plot)
+        print(f"[Saved] {args.plot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""Local HTTP server of contour, feasibility and optimum tiles.
+
+Tiles are computed on demand, so looking at a region at any zoom costs only
+the tiles on screen instead of a full 300-dpi re-render. Zoom z splits a
+problem's plotting window into 2^z x 2^z tiles of TILE_SIZE pixels. Tile
+x counts from the left and y from the top, as in web maps, and indices
+outside the window are allowed. There are three layers, meant to be
+stacked in this order:
+
+- contour: the objective coloured over the whole window's range, with
+  isolines whose spacing halves at every zoom level
+- feasible: the exact feasible set drawn as a band, and the infeasible
+  side of the inequalities shaded
+- optima: the constrained minimum and maximum from optlab.nlp
+
+Encoded tiles are kept in an LRU cache bounded by their total size in
+bytes. When several requests for the same missing tile arrive together,
+only the first renders it and the others wait for its result.
+
+    python -m optlab.tiles [--port 8765] [--cache-mb 256]
+
+Then open http://127.0.0.1:8765/ for a small viewer, or fetch
+/{problem}/{layer}/{z}/{x}/{y}.png directly; /stats reports the cache.
+"""
+import argparse
+import json
+import re
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from . import lowmem
+from .problems import PROBLEMS
+from .trace import span
+
+TILE_SIZE = 256
+MAX_ZOOM = 30
+LAYERS = ("contour", "feasible", "optima")
+# Isolines across the whole window at zoom 0
+LEVELS = 30
+# Half-widths in pixels
+CURVE_WIDTH = 2.5
+MARKER_RADIUS = 6.0
+
+_TILE_PATH = re.compile(r"^/(\w+)/(\w+)/(\d+)/(-?\d+)/(-?\d+)\.png$")
+
+
+def encode_png(rgba):
+    """PNG bytes of an (h, w, 4) uint8 image (no filtering, zlib only)."""
+    h, w, _ = rgba.shape
+    raw = np.zeros((h, 1 + 4 * w), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(h, 4 * w)
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data
+                + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+            + chunk(b"IEND", b""))
+
+
+class TileCache:
+    """LRU of encoded tiles bounded by total bytes, with coalesced misses."""
+
+    def __init__(self, max_bytes=256 << 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key, render):
+        """Cached bytes for ``key``, calling ``render()`` once on a miss."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            data = render()
+        except BaseException as exc:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            del self._pending[key]
+            self._put(key, data)
+        future.set_result(data)
+        return data
+
+    def _put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        self._entries[key] = data
+        self.nbytes += len(data)
+        while self.nbytes > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self.nbytes -= len(old)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {"tiles": len(self._entries), "bytes": self.nbytes,
+                    "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses,
+                    "coalesced": self.coalesced, "evictions": self.evictions}
+
+
+class TileService:
+    """Renders and caches the tiles of optlab.problems problems."""
+
+    def __init__(self, problems=None, max_bytes=256 << 20, tile_size=TILE_SIZE):
+        self.problems = PROBLEMS if problems is None else problems
+        self.tile_size = tile_size
+        self.cache = TileCache(max_bytes)
+        self._ranges = {}
+        self._solutions = {}
+        self._lock = threading.Lock()
+
+    def tile(self, name, layer, z, x, y):
+        """PNG bytes of one tile; ValueError for an unknown problem, layer or zoom."""
+        if name not in self.problems:
+            raise ValueError(f"unknown problem {name!r}, expected one of {sorted(self.problems)}")
+        if layer not in LAYERS:
+            raise ValueError(f"unknown layer {layer!r}, expected one of {LAYERS}")
+        if not 0 <= z <= MAX_ZOOM:
+            raise ValueError(f"zoom must be in [0, {MAX_ZOOM}]")
+        key = (name, layer, z, x, y)
+        return self.cache.get(key, lambda: self.render(*key))
+
+    def render(self, name, layer, z, x, y):
+        problem = self.problems[name]
+        with span("tile", problem=name, layer=layer, z=z):
+            rgba = getattr(self, f"_{layer}")(problem, *self._axes(problem, z, x, y, 1))
+            with span("encode"):
+                return encode_png(rgba)
+
+    def _axes(self, problem, z, tx, ty, extra=0):
+        """Pixel-centre coordinates of a tile, plus ``extra`` pixels right and below."""
+        xmin, xmax, ymin, ymax = problem.bounds
+        width, height = (xmax - xmin) / 2**z, (ymax - ymin) / 2**z
+        i = np.arange(self.tile_size + extra) + 0.5
+        x = xmin + tx * width + i * (width / self.tile_size)
+        y = ymax - ty * height - i * (height / self.tile_size)
+        return x, y, width / self.tile_size, z
+
+    # -- layers -----------------------------------------------------------
+    def _range(self, problem):
+        """(min, max) of the objective over the window, from a coarse grid."""
+        with self._lock:
+            if problem.name not in self._ranges:
+                xmin, xmax, ymin, ymax = problem.bounds
+                F = lowmem.evaluate(problem, np.linspace(xmin, xmax, 257),
+                                    np.linspace(ymin, ymax, 257))
+                self._ranges[problem.name] = (float(F.min()), float(F.max()))
+            return self._ranges[problem.name]
+
+    def _contour(self, problem, x, y, pixel, z):
+        n = self.tile_size
+        F = lowmem.evaluate(problem, x, y)
+        fmin, fmax = self._range(problem)
+        t = np.clip((F[:n, :n] - fmin) / ((fmax - fmin) or 1.0), 0.0, 1.0)
+        rgba = _colormap()[(t * 255).astype(np.intp)]
+        # Pale colours, so the other layers stand out
+        rgba[..., :3] = 255 - (255 - rgba[..., :3].astype(np.int16)) // 2
+
+        # A pixel is on an isoline where its level band differs from the
+        # pixel right of it or below it (hence the extra row and column)
+        band = np.floor(F / ((fmax - fmin) / LEVELS / 2**z or 1.0))
+        line = (band[:n, :n] != band[:n, 1:]) | (band[:n, :n] != band[1:, :n])
+        rgba[line, :3] = (40, 40, 40)
+        return rgba
+
+    def _feasible(self, problem, x, y, pixel, z):
+        n = self.tile_size
+        X, Y = lowmem.sparse_axes(x[:n], y[:n])
+        rgba = np.zeros((n, n, 4), dtype=np.uint8)
+        for g in problem.inequalities:
+            rgba[np.broadcast_to(g(X, Y) > 0, (n, n))] = (90, 90, 90, 70)
+        if problem.feasible_set is not None:
+            d = np.abs(problem.feasible_set.signed_distance(X, Y))
+            rgba[np.broadcast_to(d <= CURVE_WIDTH * pixel, (n, n))] = (0, 150, 0, 200)
+        return rgba
+
+    def _optima(self, problem, x, y, pixel, z):
+        n = self.tile_size
+        X, Y = lowmem.sparse_axes(x[:n], y[:n])
+        rgba = np.zeros((n, n, 4), dtype=np.uint8)
+        for (px, py), colour in self.optima(problem):
+            disc = np.hypot(X - px, Y - py) <= MARKER_RADIUS * pixel
+            rgba[disc] = colour
+        return rgba
+
+    def optima(self, problem):
+        """[((x, y), rgba)] for the best minimum (red) and maximum (blue), solved once."""
+        with self._lock:
+            if problem.name not in self._solutions:
+                from .nlp import solve_problem
+
+                out = []
+                for maximize, colour in ((False, (220, 30, 30, 255)), (True, (30, 60, 220, 255))):
+                    res = solve_problem(problem, maximize=maximize)
+                    if len(res.f):
+                        out.append((tuple(res.x[0]), colour))
+                self._solutions[problem.name] = out
+            return self._solutions[problem.name]
+
+
+_lut = None
+
+
+def _colormap():
+    """256 x 4 uint8 colour table (matplotlib's turbo, imported once)."""
+    global _lut
+    if _lut is None:
+        from matplotlib import colormaps
+
+        _lut = (colormaps["turbo"](np.linspace(0.0, 1.0, 256)) * 255).astype(np.uint8)
+    return _lut
+
+
+# -- HTTP -----------------------------------------------------------------
+VIEWER = """<!doctype html>
+<meta charset="utf-8"><title>optlab tiles</title>
+<style>
+  body { margin: 0; font: 14px sans-serif; }
+  #bar { position: fixed; z-index: 1; top: 0; left: 0; right: 0; padding: 6px;
+         background: rgba(255, 255, 255, 0.9); }
+  #map { position: fixed; top: 0; left: 0; right: 0; bottom: 0; overflow: hidden;
+         cursor: grab; }
+  #map img { position: absolute; width: SIZEpx; height: SIZEpx; user-select: none; }
+</style>
+<div id="bar">
+  <select id="problem">OPTIONS</select>
+  LAYERS
+  <span id="info"></span>
+</div>
+<div id="map"></div>
+<script>
+const size = SIZE, map = document.getElementById("map");
+let z = 0, cx = 0.5, cy = 0.5;   // view centre in window units at zoom 0
+function draw() {
+  const problem = document.getElementById("problem").value;
+  const layers = [...document.querySelectorAll("#bar input:checked")].map(e => e.value);
+  const n = 2 ** z, w = map.clientWidth, h = map.clientHeight;
+  const px = cx * n * size - w / 2, py = cy * n * size - h / 2;
+  map.replaceChildren();
+  for (let ty = Math.floor(py / size); ty * size < py + h; ty++)
+    for (let tx = Math.floor(px / size); tx * size < px + w; tx++)
+      for (const layer of layers) {
+        const img = document.createElement("img");
+        img.src = `/${problem}/${layer}/${z}/${tx}/${ty}.png`;
+        img.style.left = `${tx * size - px}px`;
+        img.style.top = `${ty * size - py}px`;
+        img.draggable = false;
+        map.appendChild(img);
+      }
+  document.getElementById("info").textContent = `zoom ${z}`;
+}
+map.onwheel = e => {
+  e.preventDefault();
+  z = Math.max(0, Math.min(MAXZOOM, z + (e.deltaY < 0 ? 1 : -1)));
+  draw();
+};
+map.onmousedown = e => {
+  const x0 = e.clientX, y0 = e.clientY, cx0 = cx, cy0 = cy;
+  map.onmousemove = m => {
+    cx = cx0 - (m.clientX - x0) / (2 ** z * size);
+    cy = cy0 - (m.clientY - y0) / (2 ** z * size);
+    draw();
+  };
+};
+onmouseup = () => { map.onmousemove = null; };
+document.getElementById("bar").onchange = draw;
+onresize = draw;
+draw();
+</script>
+"""
+
+
+def viewer_html(service):
+    options = "".join(f'<option>{name}</option>' for name in sorted(service.problems))
+    layers = "".join(f'<label><input type="checkbox" value="{layer}" checked>{layer}</label> '
+                     for layer in LAYERS)
+    return (VIEWER.replace("SIZE", str(service.tile_size)).replace("OPTIONS", options)
+            .replace("LAYERS", layers).replace("MAXZOOM", str(MAX_ZOOM)))
+
+
+def make_handler(service, verbose=False):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/":
+                return self._send(200, "text/html; charset=utf-8",
+                                  viewer_html(service).encode())
+            if path == "/stats":
+                return self._send(200, "application/json",
+                                  json.dumps(service.cache.stats()).encode())
+            match = _TILE_PATH.match(path)
+            if match is None:
+                return self._send(404, "text/plain", b"not found\n")
+            name, layer, z, x, y = match.groups()
+            try:
+                data = service.tile(name, layer, int(z), int(x), int(y))
+            except ValueError as exc:
+                return self._send(404, "text/plain", f"{exc}\n".encode())
+            self._send(200, "image/png", data, cache=True)
+
+        def _send(self, status, content_type, body, cache=False):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if cache:
+                self.send_header("Cache-Control", "max-age=3600")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            if verbose:
+                super().log_message(format, *args)
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8765, max_bytes=256 << 20, verbose=False):
+    service = TileService(max_bytes=max_bytes)
+    server = ThreadingHTTPServer((host, port), make_handler(service, verbose))
+    server.daemon_threads = True
+    return server, service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-mb", type=float, default=256.0,
+                        help="size limit of the tile cache in MB")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    server, _ = serve(args.host, args.port, int(args.cache_mb * (1 << 20)), args.verbose)
+    print(f"Serving tiles on http://{args.host}:{server.server_address[1]}/ (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Opt-in tracing of the pipeline stages.
+
+Set OPTLAB_TRACE to a file name (or to 1 for optlab-trace.json) and every
+span records its wall time, CPU time and allocated bytes. On exit the spans
+are written as a Chrome trace (open it in chrome://tracing or
+https://ui.perfetto.dev) and a summary table is printed to stderr. Without
+OPTLAB_TRACE, span() and traced() cost one attribute lookup.
+
+OPTLAB_TRACE_MEMORY selects how memory is measured:
+- malloc (default): bytes in use by malloc at both ends of a span, which
+  covers NumPy arrays and costs a few microseconds (glibc only)
+- peak: peak and net bytes per span from tracemalloc; exact, but slows
+  Python-heavy code such as savefig several times, so wall times suffer
+- off: no memory numbers
+
+Stages used across the project: grid, eval, mask, optimize, symbolic, draw
+(building the plot), encode (savefig: rasterizing and writing the file) and
+store (recording results in optlab.store).
+"""
+import _thread
+import atexit
+import functools
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+_setting = os.environ.get("OPTLAB_TRACE", "").strip()
+ENABLED = _setting not in ("", "0")
+TRACE_PATH = "optlab-trace.json" if _setting in ("1", "true") else _setting
+MEMORY = os.environ.get("OPTLAB_TRACE_MEMORY", "malloc").strip() or "malloc"
+
+_events = []
+_stack = []
+_registered = False
+
+
+def _mallinfo():
+    # ctypes is imported only when tracing starts; it is slow to import
+    import ctypes
+    import ctypes.util
+
+    class _MallInfo2(ctypes.Structure):
+        _fields_ = [(name, ctypes.c_size_t) for name in (
+            "arena", "ordblks", "smblks", "hblks", "hblkhd", "usmblks",
+            "fsmblks", "uordblks", "fordblks", "keepcost")]
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"))
+        libc.mallinfo2.restype = _MallInfo2
+    except (OSError, AttributeError, TypeError):
+        return None
+
+    def in_use():
+        info = libc.mallinfo2()
+        return info.uordblks + info.hblkhd
+    return in_use
+
+
+def _memory_probe():
+    """(current, peak) bytes; None when memory is not measured."""
+    if MEMORY == "peak":
+        import tracemalloc
+
+        return tracemalloc.get_traced_memory
+    if MEMORY == "malloc":
+        in_use = _mallinfo()
+        if in_use is not None:
+            return lambda: (in_use(),) * 2
+    return None
+
+
+_probe = None
+
+
+class _Frame:
+    __slots__ = ("start_mem", "peak", "child_wall", "child_cpu")
+
+    def __init__(self, start_mem):
+        self.start_mem = start_mem
+        self.peak = start_mem
+        self.child_wall = 0
+        self.child_cpu = 0
+
+
+def _register():
+    # Imported only when tracing starts, to keep importing optlab fast
+    import multiprocessing
+    import tracemalloc
+
+    global _registered, _probe
+    _registered = True
+    _probe = _memory_probe()
+    if MEMORY == "peak" and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    # Pool workers hand their events to the parent (see drain); only the
+    # main process writes the trace.
+    if multiprocessing.parent_process() is None:
+        atexit.register(write)
+
+
+@contextmanager
+def _span(name, args):
+    if not _registered:
+        _register()
+    mem, peak = _probe() if _probe else (0, 0)
+    # Peaks are tracked per span: fold the parent's peak so far into it
+    # before resetting the counter for the child.
+    if _stack:
+        _stack[-1].peak = max(_stack[-1].peak, peak)
+    if MEMORY == "peak":
+        import tracemalloc
+
+        tracemalloc.reset_peak()
+    frame = _Frame(mem)
+    _stack.append(frame)
+
+    ts = time.time_ns() // 1000
+    wall0, cpu0 = time.perf_counter_ns(), time.process_time_ns()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter_ns() - wall0
+        cpu = time.process_time_ns() - cpu0
+        mem, peak = _probe() if _probe else (0, 0)
+        frame.peak = max(frame.peak, peak)
+        _stack.pop()
+        if _stack:
+            parent = _stack[-1]
+            parent.peak = max(parent.peak, frame.peak)
+            parent.child_wall += wall
+            parent.child_cpu += cpu
+        if MEMORY == "peak":
+            import tracemalloc
+
+            tracemalloc.reset_peak()
+
+        stats = {
+            "cpu_ms": cpu / 1e6,
+            "self_wall_ms": (wall - frame.child_wall) / 1e6,
+            "self_cpu_ms": (cpu - frame.child_cpu) / 1e6,
+        }
+        if _probe:
+            stats["net_bytes"] = mem - frame.start_mem
+        if MEMORY == "peak":
+            stats["alloc_bytes"] = frame.peak - frame.start_mem
+        _events.append({
+            "name": name, "ph": "X", "ts": ts, "dur": wall / 1000,
+            "pid": os.getpid(), "tid": _thread.get_ident(),
+            "args": {**args, **stats},
+        })
+
+
+def span(name, **args):
+    """Context manager timing one stage; ``args`` are shown in the trace viewer."""
+    if not ENABLED:
+        return nullcontext()
+    return _span(name, {k: str(v) for k, v in args.items()})
+
+
+def traced(name):
+    """Decorator form of span()."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _span(name, {"function": fn.__qualname__}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def drain():
+    """Remove and return the events recorded so far (used by pool workers)."""
+    events = _events[:]
+    _events.clear()
+    return events
+
+
+def extend(events):
+    if not _registered:
+        _register()
+    _events.extend(events)
+
+
+def summary(events=None):
+    """Per-stage totals as a plain-text table, slowest (self time) first."""
+    rows = {}
+    for ev in _events if events is None else events:
+        a = ev["args"]
+        r = rows.setdefault(ev["name"], [0, 0.0, 0.0, 0.0, None, None])
+        r[0] += 1
+        r[1] += ev["dur"] / 1000
+        r[2] += a["self_wall_ms"]
+        r[3] += a["self_cpu_ms"]
+        if "alloc_bytes" in a:
+            r[4] = max(r[4] or 0, a["alloc_bytes"])
+        if "net_bytes" in a:
+            r[5] = (r[5] or 0) + a["net_bytes"]
+
+    def mb(nbytes):
+        return "-" if nbytes is None else f"{nbytes / 2**20:.1f}"
+
+    lines = [f"{'stage':12s} {'calls':>6s} {'wall ms':>10s} {'self ms':>10s} "
+             f"{'self cpu':>10s} {'peak MB':>9s} {'net MB':>8s}"]
+    for name, (calls, wall, self_wall, self_cpu, peak, net) in sorted(
+            rows.items(), key=lambda kv: -kv[1][2]):
+        lines.append(f"{name:12s} {calls:6d} {wall:10.1f} {self_wall:10.1f} "
+                     f"{self_cpu:10.1f} {mb(peak):>9s} {mb(net):>8s}")
+    return "\n".join(lines)
+
+
+def write(path=None):
+    """Write the Chrome trace and print the summary (runs at exit when enabled)."""
+    if not _events:
+        return
+    import json
+
+    path = path or TRACE_PATH
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"traceEvents": _events, "displayTimeUnit": "ms"}, fh)
+    print(f"\n[trace] {len(_events)} spans written to {path}", file=sys.stderr)
+    print(summary(), file=sys.stderr)
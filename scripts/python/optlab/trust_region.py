@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .trace import traced
+
+
+@dataclass
+class SphereExtrema:
+    """Global extrema of a quadratic on a sphere, one entry per instance.
+
+    The multipliers follow L = f + lam * (||x - center||^2 - radius^2).
+    """
+    x_min: np.ndarray
+    f_min: np.ndarray
+    lambda_min: np.ndarray
+    x_max: np.ndarray
+    f_max: np.ndarray
+    lambda_max: np.ndarray
+    iterations: int
+
+
+def _boundary_minimizer(H, g, r, rtol, maxiter):
+    """Minimize 1/2 z^T H z + g^T z on ||z|| = r (batched).
+
+    Returns z and the multiplier mu of (H + mu I) z = -g. The secular
+    equation 1/||z(mu)|| = 1/r is solved by Newton's method in the shifted
+    variable sigma = mu + d_min, started left of the root so the iteration
+    increases monotonically (Moré & Sorensen).
+    """
+    d, V = np.linalg.eigh(H)
+    gt = np.einsum("...ji,...j->...i", V, g)
+    shift = d - d[..., :1]
+    scale = np.maximum(np.abs(d).max(axis=-1), np.linalg.norm(g, axis=-1) / r)
+    scale = np.where(scale > 0, scale, 1.0)
+    low = shift <= rtol * scale[..., None]
+    shift = np.where(low, 0.0, shift)
+
+    g_low = np.sqrt(np.sum(np.where(low, gt**2, 0.0), axis=-1))
+    z_rest = np.where(low, 0.0, gt / np.where(low, 1.0, shift))
+    rest_norm = np.linalg.norm(z_rest, axis=-1)
+    hard = (g_low <= rtol * scale * r) & (rest_norm <= r)
+
+    # ||z(sigma)|| >= g_low / sigma, so sigma0 = g_low / r lies left of the root.
+    sigma = np.where(hard, 0.0, g_low / r)
+    active = ~hard
+    it = 0
+    for it in range(1, maxiter + 1):
+        if not active.any():
+            break
+        den = shift + sigma[..., None]
+        terms = np.divide(gt, den, out=np.zeros_like(gt), where=den > 0)
+        nz = np.linalg.norm(terms, axis=-1)
+        s3 = np.sum(terms**2 / np.where(den > 0, den, np.inf), axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = (nz - r) / r * nz**2 / s3
+        step = np.where(active & np.isfinite(step), step, 0.0)
+        sigma = sigma + np.maximum(step, 0.0)
+        active &= np.abs(step) > 4 * np.finfo(float).eps * np.maximum(sigma, scale)
+
+    den = shift + sigma[..., None]
+    zt = -np.divide(gt, den, out=np.zeros_like(gt), where=den > 0)
+    # Hard case: fill up the remaining length along the lowest eigenvector.
+    tau = np.sqrt(np.maximum(r**2 - np.sum(zt**2, axis=-1), 0.0))
+    zt[..., 0] = np.where(hard, tau, zt[..., 0])
+    z = np.einsum("...ij,...j->...i", V, zt)
+    z *= (r / np.linalg.norm(z, axis=-1))[..., None]
+    mu = sigma - d[..., 0]
+    return z, mu, it
+
+
+@traced("optimize")
+def solve_sphere_quadratic(Q, c, center, radius, k=0.0, rtol=1e-12, maxiter=100):
+    """Global min and max of x^T Q x + c^T x + k on ||x - center|| = radius.
+
+    All arguments broadcast over leading batch dimensions, so thousands of
+    (Q, c, center, radius) instances are solved in one call. Q has shape
+    (..., n, n); c and center have shape (..., n).
+    """
+    Q = np.asarray(Q, dtype=float)
+    Q = 0.5 * (Q + np.swapaxes(Q, -1, -2))
+    n = Q.shape[-1]
+    c = np.asarray(c, dtype=float)
+    center = np.asarray(center, dtype=float)
+    radius = np.asarray(radius, dtype=float)
+    k = np.asarray(k, dtype=float)
+
+    batch = np.broadcast_shapes(Q.shape[:-2], c.shape[:-1], center.shape[:-1],
+                                radius.shape, k.shape)
+    Q = np.broadcast_to(Q, batch + (n, n))
+    c = np.broadcast_to(c, batch + (n,))
+    center = np.broadcast_to(center, batch + (n,))
+    radius = np.broadcast_to(radius, batch)
+
+    # Shift to z = x - center: 1/2 z^T H z + g^T z + const
+    H = 2.0 * Q
+    g = np.einsum("...ij,...j->...i", H, center) + c
+
+    z_min, mu_min, it_min = _boundary_minimizer(H, g, radius, rtol, maxiter)
+    z_max, mu_max, it_max = _boundary_minimizer(-H, -g, radius, rtol, maxiter)
+
+    x_min = center + z_min
+    x_max = center + z_max
+
+    def value(x):
+        return np.einsum("...i,...ij,...j->...", x, Q, x) + np.sum(c * x, axis=-1) + k
+
+    return SphereExtrema(
+        x_min=x_min, f_min=value(x_min), lambda_min=0.5 * mu_min,
+        x_max=x_max, f_max=value(x_max), lambda_max=-0.5 * mu_max,
+        iterations=max(it_min, it_max),
+    )
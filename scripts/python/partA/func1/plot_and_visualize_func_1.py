@@ -1,64 +1,72 @@
 import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from optlab.gridcache import evaluate_grid
+from optlab.layers import base_layer, compose
+from optlab.pipeline import figure_jobs as make_figure_jobs
+from optlab.render import figure_dpi, plot_surface_lod
+from optlab.trace import span, traced
+from optlab.settings import FIGURES_DIR
+from optlab.problems import FUNC1
 
 # Objective function
 # f(x,y) = 2x^2 + y^2 - 2xy - 3x - 2y
+objective_function = FUNC1.objective
 
-def objective_function(X, Y):
-    return 2*X**2 + Y**2 - 2*X*Y - 3*X - 2*Y
-
-
-# Constraints
-# y - x <= 0        (g1)
-# x^2 + y^2 - 1 = 0 (circle boundary)
 
-def constraints(X, Y):
-    g1 = Y - X
-    h1 = X**2 + Y**2 - 1
-    feasible = (g1 <= 0) & (np.abs(h1) < 0.02)
-    return g1, h1, feasible
+# Base layer of the contour figures: contours, constraints and feasible set.
+# plot_optimal_points_func_1.py reuses the same raster under its optimum points.
+CONTOUR_GRID = 400
 
 
-# Contour plot with constraints
-def plot_contour(X, Y, F, feasible, save_path):
-    plt.figure(figsize=(8, 6))
-    plt.contour(X, Y, F, 30, linewidths=1.2)
-    plt.title("Contour Plot of f(x, y) with Constraints")
-    plt.xlabel("x")
-    plt.ylabel("y")
-    plt.grid(True)
+def draw_contour_base(ax):
+    grid = evaluate_grid(FUNC1, CONTOUR_GRID)
+    ax.contour(grid.X, grid.Y, grid.F, 30, linewidths=1.2)
+    ax.set_xlabel("x")
+    ax.set_ylabel("y")
+    ax.grid(True)
 
     # Constraint 1: y = x
-    plt.plot(X[0], X[0], 'r', linewidth=2, label="y = x")
+    ax.plot(grid.x, grid.x, 'r', linewidth=2, label="y = x")
 
     # Constraint 2: unit circle
     theta = np.linspace(0, 2*np.pi, 300)
     xc = np.cos(theta)
     yc = np.sin(theta)
-    plt.plot(xc, yc, 'b', linewidth=2, label="x² + y² = 1")
+    ax.plot(xc, yc, 'b', linewidth=2, label="x² + y² = 1")
 
-    # Feasible region shading
-    plt.scatter(
-        X[feasible], Y[feasible],
-        s=6, c='green', alpha=0.35, label="Feasible region"
-    )
+    # Feasible region (exact arc, drawn as one path)
+    ax.plot(*FUNC1.feasible_path(), color='green', linewidth=5, alpha=0.35, solid_capstyle='butt', label="Feasible region")
 
-    plt.legend()
-    plt.axis("equal")
+    ax.axis("equal")
 
-    # Save figure
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
-    plt.close()
+
+def contour_layer():
+    return base_layer((FUNC1.fingerprint(), FUNC1.bounds, CONTOUR_GRID), draw_contour_base)
+
+
+# Contour plot with constraints
+@traced("draw")
+def plot_contour(layer, save_path):
+    def overlay(ax):
+        ax.set_title("Contour Plot of f(x, y) with Constraints")
+        ax.legend()
+
+    compose(layer, overlay, save_path)
     print(f"[Saved] {save_path}")
 
 
 # Surface plot with constraints
+@traced("draw")
 def plot_surface(X, Y, F, save_path):
+    import matplotlib.pyplot as plt
+
     fig = plt.figure(figsize=(10, 7))
     ax = fig.add_subplot(111, projection='3d')
 
-    ax.plot_surface(X, Y, F, cmap='turbo', edgecolor='none', alpha=0.95)
+    plot_surface_lod(ax, X, Y, F, cmap='turbo', edgecolor='none', alpha=0.95)
 
     # Circle on surface
     theta = np.linspace(0, 2*np.pi, 300)
@@ -73,26 +81,41 @@ def plot_surface(X, Y, F, save_path):
     ax.set_zlabel("f(x,y)")
 
     # Save
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
+    with span("encode"):
+        plt.savefig(save_path, dpi=figure_dpi(), bbox_inches="tight")
     plt.close()
     print(f"[Saved] {save_path}")
 
 
-def main():
-    out_dir = "../../../../figures/python/func1"
-    os.makedirs(out_dir, exist_ok=True)
-    # Grid
-    x = np.linspace(-2, 2, 400)
-    y = np.linspace(-2, 2, 400)
-    X, Y = np.meshgrid(x, y)
-    F = objective_function(X, Y)
+OUT_DIR = os.path.join(FIGURES_DIR, "func1")
+
+
+# Figure renderers (also run in parallel by optlab.pipeline)
+def render_contour(save_path):
+    plot_contour(contour_layer(), save_path)
+
+
+def render_surface(save_path):
+    grid = evaluate_grid(FUNC1, 400)
+    plot_surface(grid.X, grid.Y, grid.F, save_path)
 
-    # Constraints
-    g1, h1, feasible = constraints(X, Y)
 
-    # Plots
-    plot_contour(X, Y, F, feasible, os.path.join(out_dir, "fig_contour.png"))
-    plot_surface(X, Y, F, os.path.join(out_dir, "fig_surface.png"))
+FIGURES = {
+    "fig_contour.png": (render_contour, ()),
+    "fig_surface.png": (render_surface, ()),
+}
+
+
+def figure_jobs():
+    return make_figure_jobs(__file__, OUT_DIR, FIGURES, prefix="func1")
+
+
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
+    # Grid, objective and feasibility mask come from the shared cache
+    for fname, (render, args) in FIGURES.items():
+        render(*args, os.path.join(OUT_DIR, fname))
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,58 +1,53 @@
 import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
 
-# Objective function
-def f(x, y):
-    return 2*x**2 + y**2 - 2*x*y - 3*x - 2*y
-
-
-# Feasible region
-def feasible_mask(X, Y):
-    g1 = Y - X                # inequality y <= x
-    h1 = X**2 + Y**2 - 1      # equality x^2 + y^2 = 1
-    return (g1 <= 0) & (np.abs(h1) < 0.02)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from optlab.gridcache import evaluate_grid
+from optlab.layers import compose, layer_figure
+from optlab.pipeline import figure_jobs as make_figure_jobs, load_script
+from optlab.render import figure_dpi, plot_surface_lod
+from optlab.trace import span, traced
+from optlab.settings import FIGURES_DIR
+from optlab.kkt import solve_problem
+from optlab.problems import FUNC1
 
+# Objective function
+f = FUNC1.objective
 
-# Plot contour + optimal points
-def plot_contour_with_points(X, Y, save_path, min_point, max_point):
-    F = f(X, Y)
-    feasible = feasible_mask(X, Y)
+# Contour base layer shared with the plain contour figure
+CONTOUR = load_script(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "plot_and_visualize_func_1.py"))
 
-    plt.figure(figsize=(8, 6))
-    plt.contour(X, Y, F, 30, linewidths=1.2)
-    plt.plot(X[0], X[0], 'r', linewidth=2, label="y = x")
 
-    theta = np.linspace(0, 2*np.pi, 300)
-    xc, yc = np.cos(theta), np.sin(theta)
-    plt.plot(xc, yc, 'b', linewidth=2, label="x² + y² = 1")
+# Contour figure: the base layer of plot_and_visualize_func_1.py (contours,
+# constraints, feasible arc) with the optimum points composited on top
+def optimum_overlay(min_point, max_point):
+    def overlay(ax):
+        ax.scatter(min_point[0], min_point[1], color='purple', s=80, label="Min point")
+        ax.scatter(max_point[0], max_point[1], color='orange', s=80, label="Max point")
+        ax.set_title("Contour Plot with Constraints and Optimum Points")
+        ax.legend()
+    return overlay
 
-    plt.scatter(X[feasible], Y[feasible], s=6, c='green', alpha=0.35)
 
-    # Optimal points
-    plt.scatter(min_point[0], min_point[1], color='purple', s=80, label="Min point")
-    plt.scatter(max_point[0], max_point[1], color='orange', s=80, label="Max point")
-
-    plt.legend()
-    plt.xlabel("x")
-    plt.ylabel("y")
-    plt.title("Contour Plot with Constraints and Optimum Points")
-    plt.axis('equal')
-    plt.grid(True)
-
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
-    plt.close()
+@traced("draw")
+def plot_contour_with_points(layer, save_path, min_point, max_point):
+    compose(layer, optimum_overlay(min_point, max_point), save_path)
     print(f"[Saved] {save_path}")
 
 
 # Plot surface + optimal points
-def plot_surface_with_points(X, Y, save_path, min_point, max_point):
-    F = f(X, Y)
+@traced("draw")
+def plot_surface_with_points(grid, save_path, min_point, max_point):
+    import matplotlib.pyplot as plt
+
+    X, Y, F = grid.X, grid.Y, grid.F
 
     fig = plt.figure(figsize=(10, 7))
     ax = fig.add_subplot(111, projection='3d')
 
-    ax.plot_surface(X, Y, F, cmap='turbo', edgecolor='none', alpha=0.92)
+    plot_surface_lod(ax, X, Y, F, cmap='turbo', edgecolor='none', alpha=0.92)
 
     # plot feasible curve (circle)
     theta = np.linspace(0, 2*np.pi, 300)
@@ -68,27 +63,54 @@ def plot_surface_with_points(X, Y, save_path, min_point, max_point):
     ax.set_ylabel("y")
     ax.set_zlabel("f(x,y)")
 
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
+    with span("encode"):
+        plt.savefig(save_path, dpi=figure_dpi(), bbox_inches="tight")
     plt.close()
     print(f"[Saved] {save_path}")
 
-def main():
-    out_dir = "../../../../figures/python/func1"
-    os.makedirs(out_dir, exist_ok=True)
+OUT_DIR = os.path.join(FIGURES_DIR, "func1")
 
-    x = np.linspace(-2, 2, 500)
-    y = np.linspace(-2, 2, 500)
-    X, Y = np.meshgrid(x, y)
 
-    min_point = (1/np.sqrt(2), 1/np.sqrt(2))
-    max_point = (-1/np.sqrt(2), -1/np.sqrt(2))
+# Optimum points on the feasible arc: global KKT points of the quadratic
+# problem, by active-set enumeration (optlab.kkt).
+# (Analytically (1/sqrt(2), 1/sqrt(2)) and (-1/sqrt(2), -1/sqrt(2)).)
+def find_optimal_points():
+    res = solve_problem(FUNC1)
+    return tuple(res.x_min.tolist()), tuple(res.x_max.tolist())
 
-    plot_contour_with_points(X, Y, f"{out_dir}/fig_contour_optimal.png",
-                             min_point, max_point)
 
-    plot_surface_with_points(X, Y, f"{out_dir}/fig_surface_optimal.png",
-                             min_point, max_point)
+# Figure renderers (also run in parallel by optlab.pipeline)
+def render_contour(save_path):
+    # Same base raster as fig_contour.png (rendered once per process, or
+    # shared through OPTLAB_CACHE_DIR)
+    plot_contour_with_points(CONTOUR.contour_layer(), save_path, *find_optimal_points())
+
+
+def render_surface(save_path):
+    grid = evaluate_grid(FUNC1, 500)
+    plot_surface_with_points(grid, save_path, *find_optimal_points())
+
+
+FIGURES = {
+    "fig_contour_optimal.png": (render_contour, ()),
+    "fig_surface_optimal.png": (render_surface, ()),
+}
+
+
+# Static background of the trajectory animation (python -m optlab.animate func1)
+def contour_figure():
+    return layer_figure(CONTOUR.draw_contour_base, optimum_overlay(*find_optimal_points()))
+
+
+def figure_jobs():
+    return make_figure_jobs(__file__, OUT_DIR, FIGURES, prefix="func1")
+
+
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
+    for fname, (render, args) in FIGURES.items():
+        render(*args, os.path.join(OUT_DIR, fname))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
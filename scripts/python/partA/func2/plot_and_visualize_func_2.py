@@ -1,54 +1,68 @@
 import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from optlab.gridcache import evaluate_grid
+from optlab.layers import base_layer, compose
+from optlab.pipeline import figure_jobs as make_figure_jobs
+from optlab.render import figure_dpi, plot_surface_lod
+from optlab.trace import span, traced
+from optlab.settings import FIGURES_DIR
+from optlab.problems import FUNC2
 
 # Objective function for FUNC2:
 # f(x, y) = 4x^2 + 3y^2 - 5xy - 8x
-def objective_function(X, Y):
-    return 4*X**2 + 3*Y**2 - 5*X*Y - 8*X
+objective_function = FUNC2.objective
 
 
-# Constraint: x + y = 4
-def constraint(X, Y, tol=0.05):
-    h1 = X + Y - 4
-    feasible = np.abs(h1) < tol
-    return h1, feasible
+# Base layer of the contour figures: contours, constraint line and feasible set.
+# plot_optimal_points_func_2.py reuses the same raster under its minimum.
+CONTOUR_GRID = 400
 
 
-# Contour plot with constraint
-def plot_contour(X, Y, F, feasible, save_path):
-    plt.figure(figsize=(8, 6))
-    plt.contour(X, Y, F, 30, linewidths=1.2)
-    plt.title("Contour Plot of f(x, y) with Constraint x + y = 4 (FUNC2)")
-    plt.xlabel("x")
-    plt.ylabel("y")
-    plt.grid(True)
+def draw_contour_base(ax):
+    grid = evaluate_grid(FUNC2, CONTOUR_GRID)
+    ax.contour(grid.X, grid.Y, grid.F, 30, linewidths=1.2)
+    ax.set_xlabel("x")
+    ax.set_ylabel("y")
+    ax.grid(True)
 
     # Constraint line: x + y = 4  ->  y = 4 - x
     x_line = np.linspace(-2, 6, 400)
     y_line = 4 - x_line
-    plt.plot(x_line, y_line, 'r', linewidth=2, label="x + y = 4")
+    ax.plot(x_line, y_line, 'r', linewidth=2, label="x + y = 4")
 
-    # Feasible on grid (just for visualization)
-    plt.scatter(
-        X[feasible], Y[feasible],
-        s=6, c='green', alpha=0.35, label="Points close to x + y = 4"
-    )
+    # Feasible set (exact segment inside the window)
+    ax.plot(*FUNC2.feasible_path(), color='green', linewidth=5, alpha=0.35, solid_capstyle='butt', label="Feasible set")
 
-    plt.legend()
-    plt.axis("equal")
+    ax.axis("equal")
 
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
-    plt.close()
+
+def contour_layer():
+    return base_layer((FUNC2.fingerprint(), FUNC2.bounds, CONTOUR_GRID), draw_contour_base)
+
+
+# Contour plot with constraint
+@traced("draw")
+def plot_contour(layer, save_path):
+    def overlay(ax):
+        ax.set_title("Contour Plot of f(x, y) with Constraint x + y = 4 (FUNC2)")
+        ax.legend()
+
+    compose(layer, overlay, save_path)
     print(f"[Saved] {save_path}")
 
 
 # Surface plot with constraint line
+@traced("draw")
 def plot_surface(X, Y, F, save_path):
+    import matplotlib.pyplot as plt
+
     fig = plt.figure(figsize=(10, 7))
     ax = fig.add_subplot(111, projection='3d')
 
-    ax.plot_surface(X, Y, F, cmap='turbo', edgecolor='none', alpha=0.95)
+    plot_surface_lod(ax, X, Y, F, cmap='turbo', edgecolor='none', alpha=0.95)
 
     # Constraint line on the surface: x + y = 4  -> parametrize in x
     x_line = np.linspace(-2, 6, 400)
@@ -61,28 +75,41 @@ def plot_surface(X, Y, F, save_path):
     ax.set_ylabel("y")
     ax.set_zlabel("f(x,y)")
 
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
+    with span("encode"):
+        plt.savefig(save_path, dpi=figure_dpi(), bbox_inches="tight")
     plt.close()
     print(f"[Saved] {save_path}")
 
 
-def main():
-    out_dir = "../../../../figures/python/func2"
-    os.makedirs(out_dir, exist_ok=True)
+OUT_DIR = os.path.join(FIGURES_DIR, "func2")
+
+
+# Figure renderers (also run in parallel by optlab.pipeline)
+def render_contour(save_path):
+    plot_contour(contour_layer(), save_path)
+
 
-    # Grid (choose a reasonable window)
-    x = np.linspace(-2, 6, 400)
-    y = np.linspace(-2, 6, 400)
-    X, Y = np.meshgrid(x, y)
-    F = objective_function(X, Y)
+def render_surface(save_path):
+    grid = evaluate_grid(FUNC2, 400)
+    plot_surface(grid.X, grid.Y, grid.F, save_path)
 
-    # Constraint mask
-    h1, feasible = constraint(X, Y)
 
-    # Plots
-    plot_contour(X, Y, F, feasible, os.path.join(out_dir, "fig_contour.png"))
-    plot_surface(X, Y, F, os.path.join(out_dir, "fig_surface.png"))
+FIGURES = {
+    "fig_contour.png": (render_contour, ()),
+    "fig_surface.png": (render_surface, ()),
+}
+
+
+def figure_jobs():
+    return make_figure_jobs(__file__, OUT_DIR, FIGURES, prefix="func2")
+
+
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
+    # Grid, objective and feasibility mask come from the shared cache
+    for fname, (render, args) in FIGURES.items():
+        render(*args, os.path.join(OUT_DIR, fname))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
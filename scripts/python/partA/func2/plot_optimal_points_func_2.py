@@ -1,78 +1,88 @@
 import os
+import sys
+import time
 import numpy as np
-import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from optlab.gridcache import evaluate_grid
+from optlab.layers import compose, layer_figure
+from optlab.pipeline import figure_jobs as make_figure_jobs, load_script
+from optlab.render import figure_dpi, plot_surface_lod
+from optlab.trace import span, traced
+from optlab.settings import FIGURES_DIR
+from optlab.linesearch import minimize_on_curve
+from optlab.problems import FUNC2
+from optlab.store import record
 
 # Objective function (FUNC2)
 # f(x, y) = 4x^2 + 3y^2 - 5xy - 8x
-def f(x, y):
-    return 4*x**2 + 3*y**2 - 5*x*y - 8*x
+f = FUNC2.objective
 
+# Contour base layer shared with the plain contour figure
+CONTOUR = load_script(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "plot_and_visualize_func_2.py"))
 
-# Feasible mask for visualization: points near x + y = 4
-def feasible_mask(X, Y, tol=0.05):
-    h1 = X + Y - 4
-    return np.abs(h1) < tol
 
+# Constraint line x + y = 4, parametrized as (x, y) = (t, 4 - t)
+def constraint_line(t):
+    return t, 4 - t
 
-# We parametrize y = 4 - x, fit a quadratic to f(x, 4-x), and use vertex formula x* = -b / (2a).
-def find_min_on_constraint(x_min=-10.0, x_max=10.0, num_samples=2000):
-    xs = np.linspace(x_min, x_max, num_samples)
-    ys = 4 - xs
-    vals = f(xs, ys)
 
-    # Fit a quadratic: vals ≈ a x^2 + b x + c
-    coeffs = np.polyfit(xs, vals, 2)
-    a, b, c = coeffs
+# Exact derivatives of f(t, 4 - t) from the quadratic form of f
+def line_derivatives(t):
+    Q, c, _ = (np.asarray(v, dtype=float) for v in FUNC2.quadratic)
+    d = np.array([1.0, -1.0])
+    z = np.stack(constraint_line(t), axis=-1)
+    return 2 * z @ Q @ d + c @ d, np.full_like(t, 2 * d @ Q @ d)
 
-    # If a > 0 -> convex -> global minimum
-    x_star = -b / (2.0 * a)
-    y_star = 4 - x_star
-    f_star = f(x_star, y_star)
 
-    return (x_star, y_star, f_star), a
+# We parametrize y = 4 - x and minimize f(t, 4 - t) with a bracketed
+# Brent/Newton line search; a is the quadratic coefficient of the restriction.
+def find_min_on_constraint(t0=0.0, t1=1.0):
+    start = time.perf_counter()
+    res = minimize_on_curve(f, constraint_line, t0, t1, derivative=line_derivatives)
+    # f(t, 4 - t) is quadratic in t, so a is half its (constant) second derivative
+    a = 0.5 * float(line_derivatives(res.t)[1])
 
+    # If a > 0 -> convex -> global minimum
+    x_star, y_star = constraint_line(float(res.t))
+    f_star = f(x_star, y_star)
 
-# Plot contour + optimal point
-def plot_contour_with_points(X, Y, save_path, min_point):
-    F = f(X, Y)
-    feasible = feasible_mask(X, Y)
+    # Kept in the result store (optlab.store) when recording is enabled
+    record(FUNC2, "minimum", (x_star, y_star), f_star, solver="linesearch",
+           classification="convex" if a > 0 else "concave" if a < 0 else "degenerate",
+           stats={"a": a, "nfev": int(res.nfev)}, seconds=time.perf_counter() - start)
+    return (x_star, y_star, f_star), a, int(res.nfev)
 
-    plt.figure(figsize=(8, 6))
-    plt.contour(X, Y, F, 30, linewidths=1.2)
 
-    # Constraint line
-    x_line = np.linspace(-2, 6, 400)
-    y_line = 4 - x_line
-    plt.plot(x_line, y_line, 'r', linewidth=2, label="x + y = 4")
+# Contour figure: the base layer of plot_and_visualize_func_2.py (contours,
+# constraint line, feasible set) with the minimum composited on top
+def minimum_overlay(min_point):
+    def overlay(ax):
+        ax.scatter(min_point[0], min_point[1],
+                   color='purple', s=80, label="Min point")
+        ax.set_title("Contour Plot with Constraint and Minimum (FUNC2)")
+        ax.legend()
+    return overlay
 
-    # Feasible tube
-    plt.scatter(X[feasible], Y[feasible], s=6, c='green',
-                alpha=0.35, label="Near x + y = 4")
 
-    # Optimal point (minimum)
-    plt.scatter(min_point[0], min_point[1],
-                color='purple', s=80, label="Min point")
-
-    plt.legend()
-    plt.xlabel("x")
-    plt.ylabel("y")
-    plt.title("Contour Plot with Constraint and Minimum (FUNC2)")
-    plt.axis('equal')
-    plt.grid(True)
-
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
-    plt.close()
+@traced("draw")
+def plot_contour_with_points(layer, save_path, min_point):
+    compose(layer, minimum_overlay(min_point), save_path)
     print(f"[Saved] {save_path}")
 
 
 # Plot surface + optimal point
-def plot_surface_with_points(X, Y, save_path, min_point):
-    F = f(X, Y)
+@traced("draw")
+def plot_surface_with_points(grid, save_path, min_point):
+    import matplotlib.pyplot as plt
+
+    X, Y, F = grid.X, grid.Y, grid.F
 
     fig = plt.figure(figsize=(10, 7))
     ax = fig.add_subplot(111, projection='3d')
 
-    ax.plot_surface(X, Y, F, cmap='turbo', edgecolor='none', alpha=0.9)
+    plot_surface_lod(ax, X, Y, F, cmap='turbo', edgecolor='none', alpha=0.9)
 
     # Constraint line on the surface
     x_line = np.linspace(-2, 6, 400)
@@ -89,23 +99,52 @@ def plot_surface_with_points(X, Y, save_path, min_point):
     ax.set_ylabel("y")
     ax.set_zlabel("f(x,y)")
 
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
+    with span("encode"):
+        plt.savefig(save_path, dpi=figure_dpi(), bbox_inches="tight")
     plt.close()
     print(f"[Saved] {save_path}")
 
 
-def main():
-    out_dir = "../../../../figures/python/func2"
-    os.makedirs(out_dir, exist_ok=True)
+OUT_DIR = os.path.join(FIGURES_DIR, "func2")
+
 
-    # Grid for visualization
-    x = np.linspace(-2, 6, 500)
-    y = np.linspace(-2, 6, 500)
-    X, Y = np.meshgrid(x, y)
+# Figure renderers (also run in parallel by optlab.pipeline)
+def render_contour(save_path):
+    # Same base raster as fig_contour.png (rendered once per process, or
+    # shared through OPTLAB_CACHE_DIR)
+    min_point, _, _ = find_min_on_constraint()
+    plot_contour_with_points(CONTOUR.contour_layer(), save_path, min_point)
 
-    min_point, a = find_min_on_constraint()
+
+def render_surface(save_path):
+    grid = evaluate_grid(FUNC2, 500)
+    min_point, _, _ = find_min_on_constraint()
+    plot_surface_with_points(grid, save_path, min_point)
+
+
+FIGURES = {
+    "fig_contour_optimal.png": (render_contour, ()),
+    "fig_surface_optimal.png": (render_surface, ()),
+}
+
+
+# Static background of the trajectory animation (python -m optlab.animate func2)
+def contour_figure():
+    min_point, _, _ = find_min_on_constraint()
+    return layer_figure(CONTOUR.draw_contour_base, minimum_overlay(min_point))
+
+
+def figure_jobs():
+    return make_figure_jobs(__file__, OUT_DIR, FIGURES, prefix="func2")
+
+
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
+
+    min_point, a, nfev = find_min_on_constraint()
 
     print("Quadratic coefficient a =", a)
+    print("Objective evaluations along the line:", nfev)
     if a > 0:
         print("Function along the line is convex -> global minimum exists.")
         print("Global minimum (on x + y = 4):")
@@ -118,18 +157,9 @@ def main():
     else:
         print("Degenerate case: the quadratic term vanished.")
 
-    plot_contour_with_points(
-        X, Y,
-        os.path.join(out_dir, "fig_contour_optimal.png"),
-        min_point
-    )
-
-    plot_surface_with_points(
-        X, Y,
-        os.path.join(out_dir, "fig_surface_optimal.png"),
-        min_point
-    )
+    for fname, (render, args) in FIGURES.items():
+        render(*args, os.path.join(OUT_DIR, fname))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
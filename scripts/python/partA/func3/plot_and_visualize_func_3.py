@@ -1,51 +1,67 @@
 import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from optlab.gridcache import evaluate_grid
+from optlab.layers import base_layer, compose
+from optlab.pipeline import figure_jobs as make_figure_jobs
+from optlab.render import figure_dpi, plot_surface_lod
+from optlab.trace import span, traced
+from optlab.settings import FIGURES_DIR
+from optlab.problems import FUNC3
 
 # Objective function FUNC3
 # f(x, y) = 9x^2 + 13y^2 + 18xy - 4
-def objective_function(X, Y):
-    return 9*X**2 + 13*Y**2 + 18*X*Y - 4
+objective_function = FUNC3.objective
 
 
-# Constraint: (x+1)^2 + y^2 = 17
-def constraint(X, Y, tol=0.05):
-    h1 = (X + 1)**2 + Y**2 - 17
-    feasible = np.abs(h1) < tol
-    return h1, feasible
+# Base layer of the contour figures: contours, constraint circle and feasible set.
+# plot_optimal_points_func_3.py reuses the same raster under its optimum points.
+CONTOUR_GRID = 600
 
 
-# Contour plot with constraint circle
-def plot_contour(X, Y, F, feasible, save_path):
-    plt.figure(figsize=(8, 6))
-    plt.contour(X, Y, F, 40, linewidths=1.2)
-    plt.title("Contour Plot of f(x, y) with Constraint (FUNC3)")
-    plt.xlabel("x")
-    plt.ylabel("y")
-    plt.grid(True)
+def draw_contour_base(ax):
+    grid = evaluate_grid(FUNC3, CONTOUR_GRID)
+    ax.contour(grid.X, grid.Y, grid.F, 40, linewidths=1.2)
+    ax.set_xlabel("x")
+    ax.set_ylabel("y")
+    ax.grid(True)
 
     # Constraint circle
     t = np.linspace(0, 2*np.pi, 400)
     xc = -1 + np.sqrt(17) * np.cos(t)
     yc = np.sqrt(17) * np.sin(t)
-    plt.plot(xc, yc, 'r', linewidth=2, label="(x+1)² + y² = 17")
-    plt.scatter(X[feasible], Y[feasible],
-                s=6, c='green', alpha=0.35)
+    ax.plot(xc, yc, 'r', linewidth=2, label="(x+1)² + y² = 17")
+    ax.plot(*FUNC3.feasible_path(), color='green', linewidth=5, alpha=0.35, solid_capstyle='butt')
 
-    plt.legend()
-    plt.axis("equal")
+    ax.axis("equal")
 
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
-    plt.close()
+
+def contour_layer():
+    return base_layer((FUNC3.fingerprint(), FUNC3.bounds, CONTOUR_GRID), draw_contour_base)
+
+
+# Contour plot with constraint circle
+@traced("draw")
+def plot_contour(layer, save_path):
+    def overlay(ax):
+        ax.set_title("Contour Plot of f(x, y) with Constraint (FUNC3)")
+        ax.legend()
+
+    compose(layer, overlay, save_path)
     print(f"[Saved] {save_path}")
 
 
 # Surface plot with constraint curve
+@traced("draw")
 def plot_surface(X, Y, F, save_path):
+    import matplotlib.pyplot as plt
+
     fig = plt.figure(figsize=(10, 7))
     ax = fig.add_subplot(111, projection='3d')
 
-    ax.plot_surface(X, Y, F, cmap='turbo', edgecolor='none', alpha=0.95)
+    plot_surface_lod(ax, X, Y, F, cmap='turbo', edgecolor='none', alpha=0.95)
 
     # constraint curve on surface
     t = np.linspace(0, 2*np.pi, 400)
@@ -59,27 +75,41 @@ def plot_surface(X, Y, F, save_path):
     ax.set_ylabel("y")
     ax.set_zlabel("f(x,y)")
 
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
+    with span("encode"):
+        plt.savefig(save_path, dpi=figure_dpi(), bbox_inches="tight")
     plt.close()
     print(f"[Saved] {save_path}")
 
 
-def main():
-    out_dir = "../../../../figures/python/func3"
-    os.makedirs(out_dir, exist_ok=True)
+OUT_DIR = os.path.join(FIGURES_DIR, "func3")
+
+
+# Figure renderers (also run in parallel by optlab.pipeline)
+def render_contour(save_path):
+    plot_contour(contour_layer(), save_path)
+
 
-    # grid
-    x = np.linspace(-10, 10, 600)
-    y = np.linspace(-10, 10, 600)
-    X, Y = np.meshgrid(x, y)
+def render_surface(save_path):
+    grid = evaluate_grid(FUNC3, 600)
+    plot_surface(grid.X, grid.Y, grid.F, save_path)
 
-    F = objective_function(X, Y)
 
-    h1, feasible = constraint(X, Y)
+FIGURES = {
+    "fig_contour.png": (render_contour, ()),
+    "fig_surface.png": (render_surface, ()),
+}
 
-    plot_contour(X, Y, F, feasible, os.path.join(out_dir, "fig_contour.png"))
-    plot_surface(X, Y, F, os.path.join(out_dir, "fig_surface.png"))
+
+def figure_jobs():
+    return make_figure_jobs(__file__, OUT_DIR, FIGURES, prefix="func3")
+
+
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
+    # Grid, objective and feasibility mask come from the shared cache
+    for fname, (render, args) in FIGURES.items():
+        render(*args, os.path.join(OUT_DIR, fname))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,12 +1,27 @@
 import os
+import sys
+import time
 import numpy as np
-import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from optlab.gridcache import evaluate_grid
+from optlab.layers import compose, layer_figure
+from optlab.pipeline import figure_jobs as make_figure_jobs, load_script
+from optlab.render import figure_dpi, plot_surface_lod
+from optlab.trace import span, traced
+from optlab.settings import FIGURES_DIR
+from optlab.problems import FUNC3
+from optlab.store import record
+from optlab.trust_region import solve_sphere_quadratic
 
 
 # FUNC3 objective function
 # f(x, y) = 9x^2 + 13y^2 + 18xy - 4
-def f(x, y):
-    return 9*x**2 + 13*y**2 + 18*x*y - 4
+f = FUNC3.objective
+
+# Contour base layer shared with the plain contour figure
+CONTOUR = load_script(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "plot_and_visualize_func_3.py"))
 
 
 # Parametric feasible curve (the circle)
@@ -19,53 +34,53 @@ def feasible_curve(num_points=20000):
     y = R * np.sin(t)
     return x, y
 
+# Exact extrema on the circle from the eigen-decomposition of Q and the
+# secular equation (no sampling of the curve).
 def find_optimal_points():
-    x, y = feasible_curve()
-    vals = f(x, y)
-
-    i_min = np.argmin(vals)
-    i_max = np.argmax(vals)
-
-    min_pt = (x[i_min], y[i_min], vals[i_min])
-    max_pt = (x[i_max], y[i_max], vals[i_max])
-
-    return min_pt, max_pt
-
-# Plot contour with min/max
-def plot_contour_with_points(X, Y, save_path, min_pt, max_pt):
-    F = f(X, Y)
-
-    plt.figure(figsize=(8, 6))
-    plt.contour(X, Y, F, 40, linewidths=1.2)
-
-    # constraint circle
-    xc, yc = feasible_curve()
-    plt.plot(xc, yc, 'r', linewidth=2, label="Constraint circle")
-
-    # min & max
-    plt.scatter(min_pt[0], min_pt[1], s=80, c='purple', label='Min point')
-    plt.scatter(max_pt[0], max_pt[1], s=80, c='orange', label='Max point')
-
-    plt.legend()
-    plt.title("Contour Plot with Optimal Points (FUNC3)")
-    plt.xlabel("x")
-    plt.ylabel("y")
-    plt.axis("equal")
-    plt.grid(True)
-
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
-    plt.close()
+    start = time.perf_counter()
+    Q, c, k = FUNC3.quadratic
+    sol = solve_sphere_quadratic(Q, c, center=(-1.0, 0.0), radius=np.sqrt(17), k=k)
+    seconds = time.perf_counter() - start
+
+    min_pt = (sol.x_min[0], sol.x_min[1], sol.f_min)
+    max_pt = (sol.x_max[0], sol.x_max[1], sol.f_max)
+
+    # Kept in the result store (optlab.store) when recording is enabled
+    for kind, x, f_value, lam in (("minimum", sol.x_min, sol.f_min, sol.lambda_min),
+                                  ("maximum", sol.x_max, sol.f_max, sol.lambda_max)):
+        record(FUNC3, kind, x, f_value, solver="trust_region", multipliers=[lam],
+               seconds=seconds)
+
+    return min_pt, max_pt, (sol.lambda_min, sol.lambda_max)
+
+# Contour figure: the base layer of plot_and_visualize_func_3.py (contours,
+# constraint circle, feasible set) with min/max composited on top
+def optimum_overlay(min_pt, max_pt):
+    def overlay(ax):
+        ax.scatter(min_pt[0], min_pt[1], s=80, c='purple', label='Min point')
+        ax.scatter(max_pt[0], max_pt[1], s=80, c='orange', label='Max point')
+        ax.set_title("Contour Plot with Optimal Points (FUNC3)")
+        ax.legend()
+    return overlay
+
+
+@traced("draw")
+def plot_contour_with_points(layer, save_path, min_pt, max_pt):
+    compose(layer, optimum_overlay(min_pt, max_pt), save_path)
     print(f"[Saved] {save_path}")
 
 
 # Surface with min/max
-def plot_surface_with_points(X, Y, save_path, min_pt, max_pt):
-    F = f(X, Y)
+@traced("draw")
+def plot_surface_with_points(grid, save_path, min_pt, max_pt):
+    import matplotlib.pyplot as plt
+
+    X, Y, F = grid.X, grid.Y, grid.F
 
     fig = plt.figure(figsize=(10, 7))
     ax = fig.add_subplot(111, projection='3d')
 
-    ax.plot_surface(X, Y, F, cmap='turbo', edgecolor='none', alpha=0.92)
+    plot_surface_lod(ax, X, Y, F, cmap='turbo', edgecolor='none', alpha=0.92)
 
     # constraint curve on surface
     xc, yc = feasible_curve()
@@ -81,40 +96,59 @@ def plot_surface_with_points(X, Y, save_path, min_pt, max_pt):
     ax.set_ylabel("y")
     ax.set_zlabel("f(x,y)")
 
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
+    with span("encode"):
+        plt.savefig(save_path, dpi=figure_dpi(), bbox_inches="tight")
     plt.close()
     print(f"[Saved] {save_path}")
 
 
-def main():
-    out_dir = "../../../../figures/python/func3"
-    os.makedirs(out_dir, exist_ok=True)
+OUT_DIR = os.path.join(FIGURES_DIR, "func3")
+
+
+# Figure renderers (also run in parallel by optlab.pipeline)
+def render_contour(save_path):
+    # Same base raster as fig_contour.png (rendered once per process, or
+    # shared through OPTLAB_CACHE_DIR)
+    min_pt, max_pt, _ = find_optimal_points()
+    plot_contour_with_points(CONTOUR.contour_layer(), save_path, min_pt, max_pt)
+
+
+def render_surface(save_path):
+    grid = evaluate_grid(FUNC3, 600)
+    min_pt, max_pt, _ = find_optimal_points()
+    plot_surface_with_points(grid, save_path, min_pt, max_pt)
+
+
+FIGURES = {
+    "fig_contour_optimal.png": (render_contour, ()),
+    "fig_surface_optimal.png": (render_surface, ()),
+}
 
-    # grid
-    x = np.linspace(-10, 10, 600)
-    y = np.linspace(-10, 10, 600)
-    X, Y = np.meshgrid(x, y)
+
+# Static background of the trajectory animation (python -m optlab.animate func3)
+def contour_figure():
+    min_pt, max_pt, _ = find_optimal_points()
+    return layer_figure(CONTOUR.draw_contour_base, optimum_overlay(min_pt, max_pt))
+
+
+def figure_jobs():
+    return make_figure_jobs(__file__, OUT_DIR, FIGURES, prefix="func3")
+
+
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
 
     # Compute optimal points numerically
-    min_pt, max_pt = find_optimal_points()
+    min_pt, max_pt, (lam_min, lam_max) = find_optimal_points()
 
     print("\n=== FUNC3 Optimal Points ===")
-    print("Min point:", min_pt)
-    print("Max point:", max_pt)
+    print("Min point:", min_pt, " lambda =", lam_min)
+    print("Max point:", max_pt, " lambda =", lam_max)
 
     # Draw plots
-    plot_contour_with_points(
-        X, Y,
-        os.path.join(out_dir, "fig_contour_optimal.png"),
-        min_pt, max_pt
-    )
-
-    plot_surface_with_points(
-        X, Y,
-        os.path.join(out_dir, "fig_surface_optimal.png"),
-        min_pt, max_pt
-    )
+    for fname, (render, args) in FIGURES.items():
+        render(*args, os.path.join(OUT_DIR, fname))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
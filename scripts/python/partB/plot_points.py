@@ -1,75 +1,109 @@
-import sympy as sp
 import numpy as np
-import matplotlib.pyplot as plt
 import os
+import sys
+import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from optlab.kernels import fused_kernel
+from optlab.pipeline import figure_jobs as make_figure_jobs
+from optlab.render import figure_dpi, plot_surface_lod
+from optlab.trace import span, traced
+from optlab.quadratic import quadratic_coefficients
+from optlab.stationary import analyze_quadratic, classify_points
+from optlab.store import record_stationary
 
-#  CLASSIFICATION
-def classify_stationary_point(H, f_xx):
-    D = H.det()
-
-    if D > 0 and f_xx > 0:
-        return "Local Minimum"
-    elif D > 0 and f_xx < 0:
-        return "Local Maximum"
-    elif D < 0:
-        return "Saddle Point"
-    else:
-        return "Degenerate / Inflection"
 
 #  SYMBOLIC ANALYSIS
-def analyze_function(f, x1, x2):
-    """Analytically find stationary points and classify them."""
+def analyze_function(f, *symbols):
+    """Find the stationary points of f(*symbols) and classify them by Hessian inertia.
+
+    Returns [(*point, classification)] for plotting.
+    """
+    import sympy as sp
+
     print("========================================")
     print("Function:", f)
     print("========================================")
 
-    # Gradient
-    f_x1 = sp.diff(f, x1)
-    f_x2 = sp.diff(f, x2)
-
-    # Solve ∇f = 0
-    stationary_points = sp.solve([f_x1, f_x2], (x1, x2), dict=True)
+    start = time.perf_counter()
+    # Fast path: quadratics are solved numerically from f = 1/2 x^T H x + b^T x + c
+    coeffs = quadratic_coefficients(f, symbols)
+    if coeffs is not None:
+        analysis = analyze_quadratic(*coeffs)
+        print_quadratic(analysis, coeffs, symbols)
+        solver = "quadratic"
+    else:
+        # Gradient
+        gradient = [sp.diff(f, s) for s in symbols]
+
+        # Solve ∇f = 0
+        with span("symbolic"):
+            stationary_points = sp.solve(gradient, symbols, dict=True)
+
+        print("\nStationary points:")
+        for p in stationary_points:
+            print("  →", p)
+
+        # Hessian
+        H = sp.hessian(f, symbols)
+        print("\nHessian matrix:")
+        sp.pprint(H)
+
+        # Classification of the isolated real points, all at once: the signs of
+        # the Hessian eigenvalues replace det(H) and f_xx
+        points = [p for p in stationary_points
+                  if all(s in p and p[s].is_number and p[s].is_real for s in symbols)]
+        if not points:
+            return []
+        analysis = classify_points(fused_kernel(f, symbols, order=2),
+                                   [[float(p[s]) for s in symbols] for p in points])
+        for p, w, label in zip(points, analysis.eigenvalues, analysis.labels):
+            print(f"\nAt {p}:")
+            print("eigenvalues(H) =", w.tolist())
+            print("classification =", label)
+        solver = "sympy"
+
+    record_stationary(f, symbols, analysis.points, analysis.labels, solver,
+                      time.perf_counter() - start, eigenvalues=analysis.eigenvalues)
+    return [(*x, label) for x, label in zip(analysis.points.tolist(), analysis.labels)]
+
+
+def print_quadratic(analysis, coeffs, symbols):
+    """Report the closed-form analysis of a quadratic (no sympy.solve)."""
+    H = coeffs[0]
+    points = [dict(zip(symbols, x)) for x in analysis.points.tolist()]
 
     print("\nStationary points:")
-    for p in stationary_points:
+    for p in points:
         print("  →", p)
-
-    # Hessian
-    f_x1x1 = sp.diff(f_x1, x1)
-    f_x1x2 = sp.diff(f_x1, x2)
-    f_x2x2 = sp.diff(f_x2, x2)
-
-    H = sp.Matrix([[f_x1x1, f_x1x2],
-                   [f_x1x2, f_x2x2]])
+    for directions in analysis.directions[~analysis.isolated]:
+        # Singular H with H x = -b consistent: a whole line (plane, ...) of points
+        print("    + span", directions.tolist(), "(not isolated)")
+    if not points:
+        print("  none: H is singular and H x = -b has no solution")
 
     print("\nHessian matrix:")
-    sp.pprint(H)
-    print("det(H) =", H.det())
-
-    # Classification
-    results = []
-    for p in stationary_points:
-        subs_H = H.subs({x1: p[x1], x2: p[x2]})
-        fxx_val = f_x1x1.subs({x1: p[x1], x2: p[x2]})
-        classification = classify_stationary_point(subs_H, fxx_val)
-        results.append((p[x1], p[x2], classification))
+    print(H)
+    print("eigenvalues(H) =", np.linalg.eigvalsh(H).tolist())
 
+    for p, label in zip(points, analysis.labels):
         print(f"\nAt {p}:")
-        print("H =", subs_H)
-        print("classification =", classification)
-
-    return results
+        print("H =", H.tolist())
+        print("classification =", label)
 
 
 #  NUMERIC FUNCTIONS FOR PLOTTING
 def f_numpy(func, X, Y, x1, x2):
-    """Convert symbolic f(x1,x2) to a numpy-evaluable lambda."""
-    f_lambda = sp.lambdify((x1, x2), func, "numpy")
-    return f_lambda(X, Y)
+    """Evaluate symbolic f(x1,x2) on numpy arrays (fused kernel, built once per expression)."""
+    kernel = fused_kernel(func, (x1, x2), order=0)
+    with span("eval", points=np.size(X)):
+        return kernel(X, Y)[0]
 
 
+@traced("draw")
 def plot_contour_and_point(f, stationary_list, save_path, x1, x2, title):
+    import matplotlib.pyplot as plt
+
     x = np.linspace(-5, 5, 500)
     y = np.linspace(-5, 5, 500)
     X, Y = np.meshgrid(x, y)
@@ -84,15 +118,19 @@ def plot_contour_and_point(f, stationary_list, save_path, x1, x2, title):
 
     # stationary points
     for (px, py, cls) in stationary_list:
-        plt.scatter(float(px), float(py), s=100, label=f"{cls}: ({px},{py})")
+        plt.scatter(float(px), float(py), s=100, label=f"{cls}: ({float(px):g},{float(py):g})")
 
     plt.legend()
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
+    with span("encode"):
+        plt.savefig(save_path, dpi=figure_dpi(), bbox_inches="tight")
     plt.close()
     print(f"[Saved] {save_path}")
 
 
+@traced("draw")
 def plot_surface_and_point(f, stationary_list, save_path, x1, x2, title):
+    import matplotlib.pyplot as plt
+
     x = np.linspace(-5, 5, 300)
     y = np.linspace(-5, 5, 300)
     X, Y = np.meshgrid(x, y)
@@ -100,11 +138,13 @@ def plot_surface_and_point(f, stationary_list, save_path, x1, x2, title):
 
     fig = plt.figure(figsize=(10, 7))
     ax = fig.add_subplot(111, projection="3d")
-    ax.plot_surface(X, Y, F, cmap="viridis", edgecolor="none", alpha=0.85)
+    plot_surface_lod(ax, X, Y, F, cmap="viridis", edgecolor="none", alpha=0.85)
 
-    for (px, py, cls) in stationary_list:
-        z = float(f_numpy(f, np.array([[px]]), np.array([[py]]), x1, x2))
-        ax.scatter(float(px), float(py), z, s=60, label=cls)
+    # evaluate f at all stationary points in one call
+    P = np.array([[float(px), float(py)] for (px, py, _) in stationary_list]).reshape(-1, 2)
+    Z = f_numpy(f, P[:, 0], P[:, 1], x1, x2)
+    for (px, py, z, (_, _, cls)) in zip(P[:, 0], P[:, 1], Z, stationary_list):
+        ax.scatter(px, py, z, s=60, label=cls)
 
     ax.set_title(title)
     ax.set_xlabel("x1")
@@ -112,62 +152,74 @@ def plot_surface_and_point(f, stationary_list, save_path, x1, x2, title):
     ax.set_zlabel("f(x1,x2)")
     ax.legend()
 
-    plt.savefig(save_path, dpi=300, bbox_inches="tight")
+    with span("encode"):
+        plt.savefig(save_path, dpi=figure_dpi(), bbox_inches="tight")
     plt.close()
     print(f"[Saved] {save_path}")
 
 
-#  WRAPPERS FOR FUNC1 AND FUNC2
-def run_func1(out_dir):
+#  FUNC1 AND FUNC2
+def func1():
+    import sympy as sp
+
+    x1, x2 = sp.symbols("x1 x2", real=True)
+    return 3*x1**2 + 2*x1*x2 + 2*x2**2 + 7, x1, x2
+
+
+def func2():
+    import sympy as sp
+
     x1, x2 = sp.symbols("x1 x2", real=True)
-    f1 = 3*x1**2 + 2*x1*x2 + 2*x2**2 + 7
+    return x1**2 + 4*x1*x2 + x2**2 + 3, x1, x2
+
+
+FUNCTIONS = {"func1": func1, "func2": func2}
+
+
+# Figure renderer (also run in parallel by optlab.pipeline)
+def render(name, kind, save_path):
+    f, x1, x2 = FUNCTIONS[name]()
+    results = analyze_function(f, x1, x2)
+    if kind == "contour":
+        plot_contour_and_point(f, results, save_path=save_path, x1=x1, x2=x2,
+                               title=f"{name.upper()} - Contour + Stationary Point")
+    else:
+        plot_surface_and_point(f, results, save_path=save_path, x1=x1, x2=x2,
+                               title=f"{name.upper()} - Surface + Stationary Point")
+
 
-    results = analyze_function(f1, x1, x2)
+OUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stationary_plots")
 
-    plot_contour_and_point(
-        f1, results,
-        save_path=os.path.join(out_dir, "func1_contour.png"),
-        x1=x1, x2=x2,
-        title="FUNC1 - Contour + Stationary Point"
-    )
+FIGURES = {
+    f"{name}_{kind}.png": (render, (name, kind))
+    for name in FUNCTIONS for kind in ("contour", "surface")
+}
 
-    plot_surface_and_point(
-        f1, results,
-        save_path=os.path.join(out_dir, "func1_surface.png"),
-        x1=x1, x2=x2,
-        title="FUNC1 - Surface + Stationary Point"
-    )
+
+def figure_jobs():
+    return make_figure_jobs(__file__, OUT_DIR, FIGURES, prefix="partB")
+
+
+#  WRAPPERS FOR FUNC1 AND FUNC2
+def run_func1(out_dir):
+    render("func1", "contour", os.path.join(out_dir, "func1_contour.png"))
+    render("func1", "surface", os.path.join(out_dir, "func1_surface.png"))
 
 
 def run_func2(out_dir):
-    x1, x2 = sp.symbols("x1 x2", real=True)
-    f2 = x1**2 + 4*x1*x2 + x2**2 + 3
-
-    results = analyze_function(f2, x1, x2)
-
-    plot_contour_and_point(
-        f2, results,
-        save_path=os.path.join(out_dir, "func2_contour.png"),
-        x1=x1, x2=x2,
-        title="FUNC2 - Contour + Stationary Point"
-    )
-
-    plot_surface_and_point(
-        f2, results,
-        save_path=os.path.join(out_dir, "func2_surface.png"),
-        x1=x1, x2=x2,
-        title="FUNC2 - Surface + Stationary Point"
-    )
+    render("func2", "contour", os.path.join(out_dir, "func2_contour.png"))
+    render("func2", "surface", os.path.join(out_dir, "func2_surface.png"))
+
+
 def main():
-    out_dir = "./stationary_plots"
-    os.makedirs(out_dir, exist_ok=True)
+    os.makedirs(OUT_DIR, exist_ok=True)
 
     print("\n===== RUNNING FUNC1 =====")
-    run_func1(out_dir)
+    run_func1(OUT_DIR)
 
     print("\n===== RUNNING FUNC2 =====")
-    run_func2(out_dir)
+    run_func2(OUT_DIR)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
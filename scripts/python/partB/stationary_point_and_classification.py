@@ -1,73 +1,116 @@
-import sympy as sp
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from optlab.kernels import fused_kernel
+from optlab.quadratic import quadratic_coefficients
+from optlab.stationary import analyze_quadratic, classify_points
+from optlab.store import record_stationary
+from optlab.trace import span
 
 #  GENERAL STATIONARY POINT SOLVER + HESSIAN CLASSIFIER
-def classify_stationary_point(H, f_xx):
-    D = H.det()
-
-    if D > 0 and f_xx > 0:
-        return "Local Minimum"
-    elif D > 0 and f_xx < 0:
-        return "Local Maximum"
-    elif D < 0:
-        return "Saddle Point"
-    else:
-        return "Degenerate / Inflection (D = 0)"
-
+def analyze_function(f, *symbols):
+    """Stationary points of f(*symbols) classified by Hessian inertia
+    (an optlab.stationary.StationaryAnalysis), printed as they are found."""
+    import sympy as sp
 
-def analyze_function(f, x1, x2):
     print("==============================================")
     print("Function:", f)
     print("==============================================")
 
-    # Gradient
-    f_x1 = sp.diff(f, x1)
-    f_x2 = sp.diff(f, x2)
+    start = time.perf_counter()
+    # Fast path: quadratics are solved numerically from f = 1/2 x^T H x + b^T x + c
+    coeffs = quadratic_coefficients(f, symbols)
+    if coeffs is not None:
+        analysis = analyze_quadratic(*coeffs)
+        print_quadratic(analysis, coeffs, symbols)
+        solver = "quadratic"
+    else:
+        # Gradient
+        gradient = [sp.diff(f, s) for s in symbols]
+
+        print("\nGradient components:")
+        for s, g in zip(symbols, gradient):
+            print(f"f_{s} =", g)
+
+        # Solve system: gradient = 0
+        with span("symbolic"):
+            stationary_points = sp.solve(gradient, symbols, dict=True)
+
+        print("\nStationary points found:")
+        for p in stationary_points:
+            print(" →", p)
+
+        # Hessian
+        H = sp.hessian(f, symbols)
+
+        print("\nHessian matrix:")
+        sp.pprint(H)
+
+        # Classification by the signs of the Hessian eigenvalues (inertia), for
+        # all isolated real points in one batch
+        print("\nClassification:")
+        points = [[float(p[s]) for s in symbols] for p in stationary_points
+                  if all(s in p and p[s].is_number and p[s].is_real for s in symbols)]
+        analysis = classify_points(fused_kernel(f, symbols, order=2),
+                                   np.reshape(points, (-1, len(symbols))))
+        for x, w, counts, label in zip(analysis.points, analysis.eigenvalues,
+                                       analysis.inertia, analysis.labels):
+            print(f"At point {dict(zip(symbols, x.tolist()))}:")
+            print(f" • Hessian eigenvalues = {w.tolist()}")
+            print(f" • inertia (+, -, 0) = {tuple(counts.tolist())}")
+            print(f" → {label}")
+        solver = "sympy"
+
+    # Kept in the result store (optlab.store) when recording is enabled
+    record_stationary(f, symbols, analysis.points, analysis.labels, solver,
+                      time.perf_counter() - start, eigenvalues=analysis.eigenvalues)
+    print("\n")
+    return analysis
+
 
-    print("\nGradient components:")
-    print("f_x1 =", f_x1)
-    print("f_x2 =", f_x2)
+def print_quadratic(analysis, coeffs, symbols):
+    """Report the closed-form analysis of a quadratic (no sympy.solve)."""
+    H, b, _ = coeffs
+    points = [dict(zip(symbols, x)) for x in analysis.points.tolist()]
 
-    # Solve system: gradient = 0
-    stationary_points = sp.solve([f_x1, f_x2], (x1, x2), dict=True)
+    print("\nGradient:")
+    print("∇f = H x + b, b =", b.tolist())
 
     print("\nStationary points found:")
-    for p in stationary_points:
+    for p in points:
         print(" →", p)
-
-    # Hessian
-    f_x1x1 = sp.diff(f_x1, x1)
-    f_x1x2 = sp.diff(f_x1, x2)
-    f_x2x2 = sp.diff(f_x2, x2)
-
-    H = sp.Matrix([[f_x1x1, f_x1x2],
-                   [f_x1x2, f_x2x2]])
+    for directions in analysis.directions[~analysis.isolated]:
+        # Singular H with H x = -b consistent: a whole line (plane, ...) of points
+        print("   + span", directions.tolist(), "(not isolated)")
+    if not points:
+        print(" none: H is singular and H x = -b has no solution")
 
     print("\nHessian matrix:")
-    sp.pprint(H)
-    print("det(H) =", H.det())
+    print(H)
+    print("eigenvalues(H) =", np.linalg.eigvalsh(H).tolist())
 
-    # Classification
+    # Classification (the Hessian of a quadratic is constant)
     print("\nClassification:")
-    for p in stationary_points:
-        subs_H = H.subs({x1: p[x1], x2: p[x2]})
-        fxx_val = f_x1x1.subs({x1: p[x1], x2: p[x2]})
-        det_val = subs_H.det()
-        classification = classify_stationary_point(subs_H, fxx_val)
-
+    for p, counts, label in zip(points, analysis.inertia, analysis.labels):
         print(f"At point {p}:")
-        print(f" • Hessian = {subs_H}")
-        print(f" • det(H) = {det_val}")
-        print(f" → {classification}")
-
-    print("\n")
+        print(f" • Hessian = {H.tolist()}")
+        print(f" • inertia (+, -, 0) = {tuple(counts.tolist())}")
+        print(f" → {label}")
 
 
 def run_func1():
+    import sympy as sp
+
     x1, x2 = sp.symbols('x1 x2', real=True)
     f1 = 3*x1**2 + 2*x1*x2 + 2*x2**2 + 7
     analyze_function(f1, x1, x2)
 
 def run_func2():
+    import sympy as sp
+
     x1, x2 = sp.symbols('x1 x2', real=True)
     f2 = x1**2 + 4*x1*x2 + x2**2 + 3
     analyze_function(f2, x1, x2)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+import sympy as sp
+
+from optlab.kernels import _build, generate_source, kernel_key
+
+x, y = sp.symbols("x y")
+EXPRESSIONS = [
+    (1 - x)**2 + 100*(y - x**2)**2,
+    sp.sin(x)*sp.cos(y) + sp.exp(x*y/4),
+    sp.log(1 + x**2 + y**2) - x*y,
+]
+
+
+def _kernel(expr, order, backend):
+    source = generate_source(expr, (x, y), order, backend)
+    return source, _build(source, backend, kernel_key(expr, (x, y), order))
+
+
+@pytest.mark.parametrize("order", [0, 1, 2])
+@pytest.mark.parametrize("expr", EXPRESSIONS)
+def test_numexpr_matches_numpy(expr, order):
+    pytest.importorskip("numexpr")
+    rng = np.random.default_rng(0)
+    X, Y = rng.uniform(-2, 2, (2, 1000))
+    _, reference = _kernel(expr, order, "numpy")
+    _, kernel = _kernel(expr, order, "numexpr")
+    for got, want in zip(kernel(X, Y), reference(X, Y)):
+        np.testing.assert_allclose(np.broadcast_to(got, X.shape), np.broadcast_to(want, X.shape),
+                                   rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("expr", EXPRESSIONS)
+def test_numexpr_one_evaluate_per_output(expr):
+    source = generate_source(expr, (x, y), 2, "numexpr")
+    outputs = [expr, *(expr.diff(s) for s in (x, y)),
+               *(expr.diff(a, b) for i, a in enumerate((x, y)) for b in (x, y)[i:])]
+    assert source.count("_evaluate(") == sum(1 for e in outputs if e.free_symbols)
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from optlab import kkt
+from optlab.problems import PROBLEMS
+
+RNG_SEED = 7
+
+
+def _instances(count):
+    rng = np.random.default_rng(RNG_SEED)
+    M = rng.normal(size=(count, 2, 2))
+    H = M + np.swapaxes(M, 1, 2)                        # indefinite as often as not
+    b = rng.normal(size=(count, 2)) * 2
+    center = rng.normal(size=(count, 2))
+    radius = rng.uniform(0.5, 2.0, size=count)
+    normal = rng.normal(size=(count, 2))
+    offset = np.einsum("ij,ij->i", normal, center) + rng.uniform(-0.5, 0.5, size=count)
+    return H, b, center, radius, normal, offset
+
+
+def _disk(center, radius):
+    """||x - center||^2 - radius^2 as (A, a, alpha)."""
+    A = np.broadcast_to(2 * np.eye(2), center.shape[:-1] + (2, 2))
+    return A, -2 * center, np.sum(center**2, axis=-1) - radius**2
+
+
+def _half_plane(normal, offset):
+    """normal . x - offset as (A, a, alpha)."""
+    return np.zeros(normal.shape[:-1] + (2, 2)), normal, -offset
+
+
+def _samples(center, radius, normal=None, offset=None, interior=True):
+    """Points of the circle, the disk (interior) and the chord of the line."""
+    theta = np.linspace(0, 2 * np.pi, 100_000, endpoint=False)
+    parts = [center + radius * np.stack([np.cos(theta), np.sin(theta)], axis=-1)]
+    if interior:
+        r, t = np.meshgrid(radius * np.sqrt(np.linspace(0, 1, 400)),
+                           np.linspace(0, 2 * np.pi, 1500, endpoint=False))
+        parts.append(center + np.stack([r * np.cos(t), r * np.sin(t)], axis=-1).reshape(-1, 2))
+    if normal is not None:
+        foot = normal * offset / (normal @ normal)
+        along = np.array([-normal[1], normal[0]]) / np.linalg.norm(normal)
+        s = np.linspace(-5 * radius - 5, 5 * radius + 5, 100_000)[:, None]
+        parts.append(foot + s * along)
+    X = np.concatenate(parts)
+    keep = np.sum((X - center)**2, axis=-1) <= radius**2 * (1 + 1e-12)
+    if normal is not None:
+        keep &= X @ normal - offset <= 1e-12
+    return X[keep]
+
+
+def _f(H, b, X):
+    return 0.5 * np.einsum("pi,ij,pj->p", X, H, X) + X @ b
+
+
+@pytest.mark.parametrize("case", ["circle", "disk", "disk and half-plane"])
+def test_solve_kkt_matches_brute_force(case):
+    H, b, center, radius, normal, offset = _instances(12)
+    if case == "circle":
+        res = kkt.solve_kkt(H, b, equalities=[_disk(center, radius)])
+    elif case == "disk":
+        res = kkt.solve_kkt(H, b, inequalities=[_disk(center, radius)])
+    else:
+        res = kkt.solve_kkt(H, b, inequalities=[_disk(center, radius),
+                                                _half_plane(normal, offset)])
+    for i in range(len(H)):
+        half = case == "disk and half-plane"
+        X = _samples(center[i], radius[i], normal[i] if half else None,
+                     offset[i] if half else None, interior=case != "circle")
+        values = _f(H[i], b[i], X)
+        scale = 1.0 + np.abs(values).max()
+        for f_exact, x_exact, brute in ((res.f_min[i], res.x_min[i], values.min()),
+                                        (-res.f_max[i], res.x_max[i], -values.max())):
+            # Never worse than a feasible sample, and no better than the grid allows
+            assert f_exact <= brute + 1e-9 * scale
+            assert f_exact >= brute - 1e-4 * scale
+            gap = np.sum((x_exact - center[i])**2) - radius[i]**2
+            assert abs(gap) <= 1e-9 * scale if case == "circle" else gap <= 1e-9 * scale
+        assert res.certified_min[i] and res.certified_max[i]
+
+
+@pytest.mark.parametrize("name, center, radius", [
+    ("func1", (0.0, 0.0), 1.0),              # unit circle with y <= x
+    ("func3", (-1.0, 0.0), np.sqrt(17.0)),
+])
+def test_problems_match_brute_force(name, center, radius):
+    problem = PROBLEMS[name]
+    theta = np.linspace(0, 2 * np.pi, 200_000, endpoint=False)
+    x, y = center[0] + radius * np.cos(theta), center[1] + radius * np.sin(theta)
+    keep = np.all([g(x, y) <= 1e-12 for g in problem.inequalities], axis=0)
+    values = problem.objective(x[keep], y[keep])
+    res = kkt.solve_problem(problem)
+    scale = 1.0 + np.abs(values).max()
+    assert values.min() - 1e-6 * scale <= res.f_min <= values.min() + 1e-9 * scale
+    assert values.max() - 1e-9 * scale <= res.f_max <= values.max() + 1e-6 * scale
+    assert problem.objective(*res.x_min) == pytest.approx(float(res.f_min))
+    assert problem.objective(*res.x_max) == pytest.approx(float(res.f_max))
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from optlab import layers, manifest  # noqa: E402
+from optlab.problems import FUNC1  # noqa: E402
+
+draws = []
+
+
+def draw(ax):
+    draws.append(1)
+    ax.plot(*FUNC1.feasible_path(), color="green", label="feasible")
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPTLAB_CACHE_DIR", str(tmp_path))
+    layers.clear()
+    draws.clear()
+    yield tmp_path
+    layers.clear()
+
+
+def _layer():
+    return layers.base_layer(("test",), draw, figsize=(2, 2), dpi=20)
+
+
+def test_layer_reused_from_disk(cache):
+    first = _layer()
+    layers.clear()
+    second = _layer()
+    assert len(draws) == 1
+    np.testing.assert_array_equal(first.rgba, second.rgba)
+    assert "geometry.py" in second.sources and "problems.py" in second.sources
+
+
+@pytest.mark.parametrize("module", ["geometry.py", "problems.py"])
+def test_layer_redrawn_when_a_module_it_used_changes(cache, monkeypatch, module):
+    _layer()
+    layers.clear()
+    file_hash = manifest.file_hash
+    monkeypatch.setattr(manifest, "file_hash", lambda path: "edited" if os.path.basename(path) == module
+                        else file_hash(path))
+    _layer()
+    assert len(draws) == 2
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from optlab import kkt
+from optlab.nlp import sample_starts, solve, solve_problem
+from optlab.problems import PROBLEMS
+
+
+def rosenbrock(x, y):
+    return (1 - x)**2 + 100 * (y - x**2)**2
+
+
+def test_unique_merges_copies_of_one_optimum():
+    # A curved valley: the starts end up spread along it unless polished
+    res = solve(rosenbrock, sample_starts((-2, 2, -1, 3), 64))
+    assert res.converged.all()
+    optima = res.unique()
+    assert optima.count.tolist() == [64]
+    np.testing.assert_allclose(optima.x[0], [1.0, 1.0], atol=1e-6)
+
+
+def test_unique_keeps_distinct_optima():
+    res = solve(rosenbrock, sample_starts((-2, 2, -1, 3), 64),
+                equalities=[lambda x, y: x + y - 1])
+    optima = res.unique()
+    assert len(optima.x) == 2 and optima.count.sum() == res.converged.sum()
+    np.testing.assert_allclose(optima.x.sum(axis=1), 1.0, atol=1e-9)
+    assert optima.stationarity.max() < 1e-8
+
+
+def test_active_inequality_is_polished():
+    res = solve(rosenbrock, sample_starts((-2, 2, -1, 3), 32),
+                inequalities=[lambda x, y: x**2 + y**2 - 1.5])
+    optima = res.unique()
+    assert optima.count.tolist() == [32]
+    x, y = optima.x[0]
+    assert x**2 + y**2 == pytest.approx(1.5, abs=1e-9) and optima.mu[0, 0] > 0
+
+
+@pytest.mark.parametrize("name", sorted(PROBLEMS))
+@pytest.mark.parametrize("maximize", [False, True])
+def test_best_optimum_matches_exact_kkt(name, maximize):
+    problem = PROBLEMS[name]
+    exact = kkt.solve_problem(problem)
+    f_exact = exact.f_max if maximize else exact.f_min
+    if not np.isfinite(f_exact):
+        pytest.skip(f"{name} has no {'maximum' if maximize else 'minimum'}")
+    res = solve_problem(problem, maximize=maximize)
+    best = res.f.max() if maximize else res.f.min()
+    assert best == pytest.approx(float(f_exact), rel=1e-7, abs=1e-7)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from optlab.quadratic import LOCAL_MIN
+from optlab.sparse import analyze_sparse, as_sparse, chain_quadratic, conjugate_gradient, minres
+
+
+def _lstsq(A, rhs):
+    return np.linalg.lstsq(A, rhs, rcond=None)[0]
+
+
+def _chain(H2, b2, n, linear=1.0):
+    H, b, c = chain_quadratic(np.array(H2, dtype=float), np.array(b2, dtype=float), 0.0, n)
+    return H, b + linear
+
+
+@pytest.mark.parametrize("diagonal, rhs", [
+    ((0, 1, 2, 3), (0, 1, 1, 1)),
+    ((0, 0, 1, -2), (0, 0, 1, 1)),
+])
+def test_minres_singular_consistent(diagonal, rhs):
+    A, rhs = np.diag(np.array(diagonal, dtype=float)), np.array(rhs, dtype=float)
+    res = minres(as_sparse(A), rhs)
+    assert res.converged and not res.inconsistent
+    np.testing.assert_allclose(res.x, _lstsq(A, rhs), atol=1e-12)
+
+
+@pytest.mark.parametrize("diagonal", [(0, 1, 2, 3, -1), (0, 1, 2, 3)])
+def test_minres_singular_inconsistent(diagonal):
+    A = np.diag(np.array(diagonal, dtype=float))
+    rhs = np.ones(len(diagonal))
+    res = minres(as_sparse(A), rhs)
+    assert res.inconsistent and not res.converged
+    # The minimum-norm least-squares point, not an iterate blown up by a breakdown
+    np.testing.assert_allclose(res.x, _lstsq(A, rhs), atol=1e-12)
+
+
+@pytest.mark.parametrize("n", [100, 1000])
+def test_minres_singular_chain_matches_lstsq(n):
+    # func2's chain is singular for n = 1 (mod 3), with -b outside the range of H
+    H, b = _chain([[2, 4], [4, 2]], [0, 0], n)
+    res = minres(H, -b)
+    expected = _lstsq(H.toarray(), -b)
+    assert res.inconsistent
+    np.testing.assert_allclose(res.x, expected, rtol=1e-8, atol=1e-8)
+    assert res.residual == pytest.approx(np.linalg.norm(H.toarray() @ expected + b), rel=1e-8)
+
+
+@pytest.mark.parametrize("n", [101, 1001])
+def test_minres_indefinite_chain(n):
+    H, b = _chain([[2, 4], [4, 2]], [0, 0], n)
+    res = minres(H, -b)
+    assert res.converged and not res.inconsistent
+    np.testing.assert_allclose(res.x, np.linalg.solve(H.toarray(), -b), rtol=1e-8, atol=1e-10)
+
+
+def test_conjugate_gradient_definite_chain():
+    H, b = _chain([[6, 2], [2, 4]], [0, 0], 500)
+    res = conjugate_gradient(H, -b)
+    assert res.converged
+    np.testing.assert_allclose(res.x, np.linalg.solve(H.toarray(), -b), rtol=1e-8)
+
+
+def test_analyze_sparse_minimum():
+    H, b = _chain([[6, 2], [2, 4]], [1, -1], 300)
+    res = analyze_sparse(H, b, 2.0)
+    x = np.linalg.solve(H.toarray(), -b)
+    assert res.classification == LOCAL_MIN and res.method == "cg" and res.converged
+    np.testing.assert_allclose(res.point, x, rtol=1e-8)
+    assert res.value == pytest.approx(2.0 + 0.5 * b @ x)
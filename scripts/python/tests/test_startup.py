@@ -0,0 +1,30 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from optlab import settings, startup
+
+
+@pytest.fixture(scope="module")
+def cache_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("pyc")
+
+
+@pytest.mark.parametrize("check", startup.CHECKS, ids=lambda c: c.name)
+def test_import_budget(check, cache_dir):
+    seconds, numpy_seconds, loaded = startup.measure(check, repeat=3, cache_dir=cache_dir)
+    assert not loaded, f"{check.name} imported {loaded}"
+    budget = check.budget * numpy_seconds
+    assert seconds <= budget, (f"{check.name}: {seconds * 1e3:.1f} ms, budget {budget * 1e3:.1f} ms "
+                               f"({check.budget:g} x import numpy)")
+
+
+def test_core_imports_no_heavy_library():
+    code = ("import json, sys\n"
+            f"import {', '.join(startup.CORE + startup.TOOLS)}\n"
+            f"print(json.dumps([m for m in {startup.HEAVY!r} if m in sys.modules]))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=settings.SCRIPTS_DIR,
+                         capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout) == []
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from optlab import settings
+from optlab.pipeline import load_script
+from optlab.quadratic import DEGENERATE, LOCAL_MIN, SADDLE, analyze_quadratics
+from optlab.stationary import analyze, analyze_quadratic
+
+sp = pytest.importorskip("sympy")
+
+
+def test_unique_point():
+    res = analyze_quadratic([[6.0, 2.0], [2.0, 4.0]], [1.0, -2.0], 7.0)
+    x = np.linalg.solve([[6.0, 2.0], [2.0, 4.0]], [-1.0, 2.0])
+    np.testing.assert_allclose(res.points, [x])
+    assert res.labels == [LOCAL_MIN] and res.isolated.tolist() == [True]
+    assert res.directions.shape == (1, 0, 2)
+
+
+def test_singular_consistent_is_a_set():
+    # (x + y)^2 - 1: the stationary points are the line x + y = 0
+    res = analyze_quadratic([[2.0, 2.0], [2.0, 2.0]], [0.0, 0.0], -1.0)
+    np.testing.assert_allclose(res.points, [[0.0, 0.0]], atol=1e-15)
+    assert res.isolated.tolist() == [False]
+    assert res.labels == [f"{DEGENERATE} (non-isolated set)"]
+    d = res.directions[0]
+    assert d.shape == (1, 2) and abs(d[0] @ [1.0, 1.0]) < 1e-12
+    assert res.values.tolist() == [-1.0]
+
+
+def test_singular_inconsistent_has_no_point():
+    # (x + y)^2 - x: the gradient never vanishes
+    res = analyze_quadratic([[2.0, 2.0], [2.0, 2.0]], [-1.0, 0.0])
+    assert res.points.shape == (0, 2) and res.labels == []
+
+
+def test_batched_sets_match_lstsq():
+    rng = np.random.default_rng(0)
+    V = np.linalg.qr(rng.normal(size=(200, 3, 3)))[0]
+    w = rng.normal(size=(200, 3))
+    w[:, 0] = 0.0                                       # every H is singular
+    H = np.einsum("mij,mj,mkj->mik", V, w, V)
+    b = np.einsum("mij,mj->mi", H, rng.normal(size=(200, 3)))
+    inconsistent = np.arange(200) % 2 == 1
+    b[inconsistent] += V[inconsistent, :, 0]            # push -b out of the range of H
+    res = analyze_quadratics(H, b, 0.0)
+    assert not res.unique.any()
+    assert (res.degenerate == ~inconsistent).all()
+    expected = np.stack([np.linalg.lstsq(Hi, -bi, rcond=None)[0] for Hi, bi in zip(H, b)])
+    np.testing.assert_allclose(res.points[~inconsistent], expected[~inconsistent], atol=1e-9)
+    assert np.isnan(res.points[inconsistent]).all()
+
+
+def test_non_quadratic_search():
+    x, y = sp.symbols("x y", real=True)
+    res = analyze(x**4 - x**2 + y**2, (x, y))
+    order = np.argsort(res.points[:, 0])
+    np.testing.assert_allclose(res.points[order], [[-np.sqrt(0.5), 0], [0, 0], [np.sqrt(0.5), 0]],
+                               atol=1e-8)
+    assert [res.labels[i] for i in order] == [LOCAL_MIN, SADDLE, LOCAL_MIN]
+
+
+@pytest.mark.parametrize("script", ["plot_points.py", "stationary_point_and_classification.py"])
+def test_part_b_scripts_share_the_analysis(script):
+    module = load_script(str(settings.SCRIPTS_DIR / "partB" / script))
+    x1, x2 = sp.symbols("x1 x2", real=True)
+    for f in ((x1 + x2)**2 - 1, (x1 + x2)**2 - x1, x1**2 + 4*x1*x2 + x2**2 + 3):
+        expected = analyze(f, (x1, x2))
+        result = module.analyze_function(f, x1, x2)
+        if script == "plot_points.py":
+            assert result == [(*x, label) for x, label in zip(expected.points.tolist(),
+                                                              expected.labels)]
+        else:
+            np.testing.assert_array_equal(result.points, expected.points)
+            assert result.labels == expected.labels
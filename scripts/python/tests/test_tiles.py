@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from optlab.tiles import TileCache, TileService
+
+
+def test_concurrent_misses_render_once():
+    cache = TileCache()
+    release = threading.Event()
+    renders = []
+
+    def render():
+        renders.append(1)
+        release.wait(5)
+        return b"tile"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", render)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    # Wait until every thread is either rendering or waiting on the render
+    deadline = time.monotonic() + 5
+    while cache.misses + cache.coalesced < 8 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert results == [b"tile"] * 8 and len(renders) == 1
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 7, 0)
+    assert cache.get("k", render) == b"tile" and cache.hits == 1 and len(renders) == 1
+
+
+def test_failed_render_reaches_waiters_and_is_not_cached():
+    cache = TileCache()
+    started, release = threading.Event(), threading.Event()
+
+    def render():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    raised = []
+
+    def request():
+        raised.append(_raises(lambda: cache.get("k", render)))
+
+    owner = threading.Thread(target=request)
+    owner.start()
+    started.wait(5)
+    waiter = threading.Thread(target=request)
+    waiter.start()
+    while cache.coalesced < 1:
+        time.sleep(0.001)
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+    assert raised == [True, True]
+    assert cache.stats()["tiles"] == 0
+    assert cache.get("k", lambda: b"ok") == b"ok" and cache.misses == 2
+
+
+def _raises(fn):
+    try:
+        fn()
+    except RuntimeError:
+        return True
+    return False
+
+
+def test_lru_bound_in_bytes():
+    cache = TileCache(max_bytes=10)
+    for key in "abc":
+        cache.get(key, lambda: b"1234")
+    assert cache.nbytes == 8 and cache.evictions == 1
+    cache.get("b", lambda: b"xxxx")          # hit: "b" becomes the newest
+    cache.get("d", lambda: b"1234")          # evicts "c", the oldest
+    assert cache.get("b", lambda: b"new") == b"1234"
+    assert cache.get("c", lambda: b"new") == b"new"
+    assert cache.get("big", lambda: b"x" * 11) == b"x" * 11
+    assert "big" not in cache._entries
+
+
+def test_service_renders_png_tiles():
+    service = TileService(tile_size=32)
+    tiles = {layer: service.tile("func1", layer, 1, 0, 1)
+             for layer in ("contour", "feasible", "optima")}
+    assert all(data.startswith(b"\x89PNG\r\n\x1a\n") for data in tiles.values())
+    assert service.tile("func1", "contour", 1, 0, 1) == tiles["contour"]
+    assert (service.cache.misses, service.cache.hits) == (3, 1)
+    with pytest.raises(ValueError):
+        service.tile("nope", "contour", 0, 0, 0)
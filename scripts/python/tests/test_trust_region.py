@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from optlab.trust_region import solve_sphere_quadratic
+
+
+def _instances(count, n, seed=3):
+    rng = np.random.default_rng(seed)
+    M = rng.normal(size=(count, n, n))
+    return (M + np.swapaxes(M, 1, 2), rng.normal(size=(count, n)),
+            rng.normal(size=(count, n)), rng.uniform(0.5, 3.0, size=count))
+
+
+def _check(Q, c, center, radius, res):
+    n = Q.shape[-1]
+    for x, lam, sign in ((res.x_min, res.lambda_min, 1.0), (res.x_max, res.lambda_max, -1.0)):
+        # L = f + lam (||x - center||^2 - radius^2)
+        grad_L = (2 * np.einsum("...ij,...j->...i", Q, x) + c
+                  + 2 * lam[..., None] * (x - center))
+        scale = 1.0 + np.abs(Q).max(axis=(-1, -2)) * radius + np.abs(c).max(axis=-1)
+        np.testing.assert_allclose(np.linalg.norm(x - center, axis=-1), radius, rtol=1e-12)
+        assert np.all(np.abs(grad_L).max(axis=-1) <= 1e-9 * scale)
+        # Global optimality on the sphere: sign * (Q + lam I) is positive semidefinite
+        w = np.linalg.eigvalsh(sign * (Q + lam[..., None, None] * np.eye(n)))
+        assert np.all(w[..., 0] >= -1e-9 * scale)
+
+
+@pytest.mark.parametrize("n", [2, 3, 5])
+def test_sphere_extrema_satisfy_kkt(n):
+    Q, c, center, radius = _instances(500, n)
+    _check(Q, c, center, radius, solve_sphere_quadratic(Q, c, center, radius))
+
+
+def test_hard_case():
+    # c orthogonal to the lowest eigenvector at the center: mu sits at -d_min
+    Q = np.diag([-1.0, 2.0, 3.0])
+    c = np.array([0.0, 0.5, -0.3])
+    center, radius = np.zeros(3), np.array(2.0)
+    res = solve_sphere_quadratic(Q, c, center, radius)
+    _check(Q, c, center, radius, res)
+    assert res.lambda_min == pytest.approx(1.0)